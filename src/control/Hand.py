@@ -1,8 +1,15 @@
 import time
 import sys
 import DynamixelSDKWrapper as dynamixel
+from telemetry import TelemetryPoller
+from clock_sync import ClockSync
+from joint_mapping import JointMapper
+from hand_state import HandState, COMMANDED_FIELDS
+from bus_arbiter import BusArbiter, MOTION, SAFETY, CONFIG
 import logging
 import json
+import os
+import numpy as np
 
 class Hand:
     
@@ -11,46 +18,213 @@ class Hand:
         format="%(asctime)s [%(levelname)s] : %(message)s",
         datefmt="[%X]")
     
-    # dxl = dynamixel.DynamixelSDKWrapper(port='/dev/ttyUSB0', baudrate=115200)
-    dxl = dynamixel.DynamixelSDKWrapper(port='COM4', baudrate=115200)
+    # port = '/dev/ttyUSB0'
+    port = 'COM4'
+    baudrate = 115200 # must match the BAUD_RATE of the servos, see migrate_baudrate()
     fingers = {}
     states = {}
+    telemetry = None
+    clock_sync = None
     finger_names = ['thumb', 'index', 'middle', 'ring', 'pinky', 'abduction', 'wrist']
 
     param_file_path = './params/finger_params.json'
+    shadow_file_path = './params/servo_shadow.json'
     finger_parameters = {}
 
-    def __init__(self) -> None:
-        self.load_hand_params(self.param_file_path) 
-        # Instantiate fingers and abduction/adduction
-        self.fingers['thumb'] = Finger(finger_name='thumb', finger_params=self.finger_parameters["thumb"], servos=self.dxl)
-        self.fingers['index'] = Finger(finger_name='index', finger_params=self.finger_parameters["index"], servos=self.dxl)
-        self.fingers['middle'] = Finger(finger_name='middle', finger_params=self.finger_parameters["middle"], servos=self.dxl)
-        self.fingers['ring'] = Finger(finger_name='ring', finger_params=self.finger_parameters["ring"], servos=self.dxl)
-        self.fingers['pinky'] = Finger(finger_name='pinky', finger_params=self.finger_parameters["pinky"], servos=self.dxl)
-        self.fingers['abduction'] = Finger(finger_name='abduction', finger_params=self.finger_parameters["abduction"], servos=self.dxl)
-        self.fingers['wrist'] = Finger(finger_name='wrist', finger_params=self.finger_parameters["wrist"], servos=self.dxl)
-        self.states = self.get_joint_states()
+    # ports: {port: [finger names]} to split the hand across several adapters, e.g.
+    # {'COM4': ['thumb', 'index', 'middle'], 'COM5': ['ring', 'pinky', 'abduction', 'wrist']}.
+    # Fingers not listed stay on the first port. Defaults to every finger on Hand.port.
+    def __init__(self, ports: dict=None) -> None:
+        if ports is None:
+            ports = {self.port: list(self.finger_names)}
         self.logger = logging.getLogger(__name__)
+        self.load_hand_params(self.param_file_path)
+
+        # One wrapper per port, every transaction of a bus goes through its arbiter's owner thread
+        self.buses = {port: BusArbiter(dynamixel.DynamixelSDKWrapper(port=port, baudrate=self.baudrate)) for port in ports.keys()}
+        self.finger_ports = {finger_name: next(iter(ports.keys())) for finger_name in self.finger_names}
+        for port, finger_names in ports.items():
+            for finger_name in finger_names:
+                self.finger_ports[finger_name] = port
+        # Buses of the first port, kept for single-bus callers
+        self.bus = next(iter(self.buses.values()))
+        self.dxl = self.bus.dxl
+
+        # Instantiate fingers and abduction/adduction, sharing one compiled mapping of every joint
+        # and one state array, both indexed in self.mapper.joints order
+        self.mapper = JointMapper({finger_name: self.finger_parameters[finger_name] for finger_name in self.finger_names})
+        self.state = HandState(self.mapper.joints, self.mapper.ids)
+        for finger_name in self.finger_names:
+            self.fingers[finger_name] = Finger(finger_name=finger_name, finger_params=self.finger_parameters[finger_name],
+                                               servos=self.buses[self.finger_ports[finger_name]], register=False,
+                                               mapper=self.mapper, state=self.state)
+
+        servos = {port: {f'{finger_name}#{joint_name}': servo for finger_name in self.fingers.keys() if self.finger_ports[finger_name] == port
+                         for joint_name, servo in self.fingers[finger_name].servo_params.items()}
+                  for port in self.buses.keys()}
+
+        # Enumerate each bus with one broadcast ping, servos missing, sharing an ID or of another model
+        # are left out of the configuration instead of timing out in it
+        self.inventory = self.on_buses(CONFIG, 'check_inventory', {port: (servos[port],) for port in self.buses.keys()})
+        # No servo answering at Hand.baudrate, e.g. migrated by an earlier run: look for them at every rate
+        lost = {port: ([servo['id'] for servo in servos[port].values()],) for port, inventory in self.inventory.items()
+                if len(servos[port]) > 0 and set(inventory['missing']) == {servo['id'] for servo in servos[port].values()}}
+        if len(lost) > 0:
+            self.on_buses(CONFIG, 'discover_baudrate', lost)
+            for port in lost.keys():
+                self.logger.warning(f"[{port}] No servo at {self.baudrate}, continuing at {self.buses[port].dxl.baudrate} (see Hand.baudrate)")
+            self.inventory.update(self.on_buses(CONFIG, 'check_inventory', {port: (servos[port],) for port in lost.keys()}))
+        self.unconfigured = {}
+        for port, inventory in self.inventory.items():
+            skipped = set(inventory['missing'] + inventory['duplicate'] + inventory['wrong_model'])
+            if len(skipped) > 0:
+                self.logger.warning(f"[{port}] Not configuring IDs {sorted(skipped)}")
+            self.unconfigured[port] = skipped
+            servos[port] = {name: servo for name, servo in servos[port].items() if servo['id'] not in skipped}
+
+        # Configure the servos of each bus in one batch, all buses at the same time,
+        # skipping EEPROM writes the shadow proves unnecessary
+        for port, bus in self.buses.items():
+            bus.dxl.load_shadow(self.get_shadow_file_path(port))
+        self.on_buses(CONFIG, 'add_servo_batch', {port: (servos[port],) for port in self.buses.keys()})
+        self.states = self.get_joint_states()
 
     def __del__(self):    
-        self.dxl.close_port()
+        self.stop_telemetry()
+        for bus in self.buses.values():
+            bus.stop()
+            bus.dxl.close_port()
+
+    # With several buses each one keeps its own shadow file, e.g. servo_shadow_COM5.json
+    def get_shadow_file_path(self, port: str):
+        if len(self.buses) == 1:
+            return self.shadow_file_path
+        root, ext = os.path.splitext(self.shadow_file_path)
+        return f"{root}_{os.path.basename(port)}{ext}"
+
+    # Run one wrapper call per bus concurrently and wait until all of them completed.
+    # calls: {port: args}, returns {port: result}
+    def on_buses(self, priority: int, method: str, calls: dict):
+        futures = {port: self.buses[port].submit(priority, method, *args) for port, args in calls.items()}
+        return {port: future.result() for port, future in futures.items()}
 
+    # Sync read position/velocity/current of every servo and map them back to joint angles, all joints
+    # at once into self.state (measured_angle, measured_pos, velocity, current, timestamp; a joint whose
+    # servo did not respond keeps its previous measurement)
     def get_joint_states(self):
-        pass
+        readings = {}
+        for result in self.on_buses(SAFETY, 'read_states_sync', {port: () for port in self.buses.keys()}).values():
+            readings.update(result)
+        positions = self.mapper.servo_vector(readings)
+        self.state.update_measured(self.mapper.to_joint(positions), positions - self.mapper.offset,
+                                   self.mapper.servo_vector(readings, 'PRESENT_VELOCITY'),
+                                   self.mapper.servo_vector(readings, 'PRESENT_CURRENT'), time.monotonic())
+        self.states = {finger_name: self.fingers[finger_name].get_measured_state(readings, self.state.measured_angle) for finger_name in self.fingers.keys()}
+        return self.states
+
+    # Commanded angle of every joint, in self.mapper.joints order
+    def get_commanded_angles(self):
+        return self.state.joint_angle.copy()
+
+    # Commanded and measured angle of every joint side by side, measured as of the last get_joint_states().
+    # Returns {finger: {joint: {'commanded', 'measured', 'error'}}}, error = measured - commanded (in deg)
+    def get_tracking_state(self):
+        commanded, measured = self.state.joint_angle.tolist(), self.state.measured_angle.tolist()
+        tracking = {finger_name: {} for finger_name in self.fingers.keys()}
+        for i, (finger_name, joint_name) in enumerate(self.state.joints):
+            tracking[finger_name][joint_name] = {'commanded': commanded[i], 'measured': measured[i],
+                                                 'error': measured[i] - commanded[i]}
+        return tracking
+
+    # Poll position/velocity/current/temperature/voltage of every servo in the background, buffer rows in self.state order.
+    # With clock_sync, samples are stamped with the servos' REALTIME_TICK converted into host time (time.monotonic()).
+    def start_telemetry(self, rate_hz: float=20.0, capacity: int=1000, clock_sync: bool=True):
+        if self.telemetry is None:
+            if clock_sync:
+                self.clock_sync = ClockSync(list(self.buses.values()))
+                self.clock_sync.sync()
+                self.clock_sync.start()
+            self.telemetry = TelemetryPoller(list(self.buses.values()), ids=self.state.ids.tolist(), rate_hz=rate_hz,
+                                             capacity=capacity, clock=self.clock_sync)
+            self.telemetry.start()
+        return self.telemetry.buffer
+
+    def stop_telemetry(self):
+        if self.telemetry is not None:
+            self.telemetry.stop()
+            self.telemetry.join()
+            self.telemetry = None
+        if self.clock_sync is not None:
+            self.clock_sync.stop()
+            self.clock_sync.join()
+            self.clock_sync = None
+
+    # Move every servo and the host to a faster baud rate (e.g. 1000000, 2000000, 4000000).
+    # The servos keep the new rate across power cycles: update Hand.baudrate in the code too
+    # (a Hand opened at another rate searches every rate, which takes a few seconds).
+    def migrate_baudrate(self, target_baudrate: int):
+        self.stop_telemetry()
+        results = self.on_buses(CONFIG, 'migrate_baudrate', {port: (target_baudrate,) for port in self.buses.keys()})
+        if all(results.values()):
+            self.baudrate = target_baudrate
+        return all(results.values())
 
     def update_finger_joint(self, finger_name: str, param: dict):
         if finger_name in self.fingers.keys():
             self.fingers[finger_name].update_finger_state(param)
 
+    # Set every joint from one angle vector in self.mapper.joints order (NaN leaves a joint unchanged),
+    # all servo positions computed in one vectorized mapping
+    def update_hand_joints(self, joint_angles):
+        joint_angles = np.asarray(joint_angles, dtype=float)
+        servo_pos = self.mapper.to_servo(np.nan_to_num(joint_angles), offset=False)
+        update = ~np.isnan(joint_angles)
+        self.state.joint_angle[update] = joint_angles[update]
+        self.state.servo_pos[update] = servo_pos[update]
+
 
     def move_finger(self, finger_name, t_exec: int=1000):
         
         if isinstance(finger_name, str):
             finger_name = [finger_name]
-        for finger in finger_name:
-            if finger in self.fingers.keys():
-                self.fingers[finger].move_finger(t_exec)
+        return self.move_hand(finger_name, t_exec)
+
+    # Send the changed goals of several fingers as one PROFILE_VELOCITY + one GOAL_POSITION sync write
+    # per bus, the buses being written at the same time
+    def move_hand(self, finger_names=None, t_exec: int=1000) -> bool:
+        if finger_names is None:
+            finger_names = self.fingers.keys()
+        finger_names = [finger for finger in finger_names if finger in self.fingers.keys()]
+
+        commands = {}
+        for finger in finger_names:
+            finger_ids, finger_goals, finger_t = self.fingers[finger].get_goal_commands(t_exec)
+            # Servos left unconfigured at startup are not addressed
+            unconfigured = self.unconfigured.get(self.finger_ports[finger])
+            if unconfigured:
+                kept = [i for i, id_ in enumerate(finger_ids) if id_ not in unconfigured]
+                finger_ids, finger_goals, finger_t = ([values[i] for i in kept] for values in (finger_ids, finger_goals, finger_t))
+            ids, goal_pos, t = commands.setdefault(self.finger_ports[finger], ([], [], []))
+            ids += finger_ids
+            goal_pos += finger_goals
+            t += finger_t
+
+        # Nothing changed since the last acknowledged command: skip the bus
+        commands = {port: command for port, command in commands.items() if len(command[0]) > 0}
+        if len(commands) == 0:
+            return True
+        results = self.on_buses(MOTION, 'send_goal_pos_sync', commands)
+
+        # Only the goals written are acknowledged, the others stay dirty and are sent again
+        written = {}
+        for port, (ids, goal_pos, _) in commands.items():
+            sent = set(results[port])
+            written[port] = ([id_ for id_ in ids if id_ in sent], [goal for id_, goal in zip(ids, goal_pos) if id_ in sent])
+        for finger in finger_names:
+            port = self.finger_ports[finger]
+            if port in written:
+                self.fingers[finger].acknowledge_goals(*written[port])
+        return all(len(written[port][0]) == len(command[0]) for port, command in commands.items())
 
 
     def move_finger_joint(self, finger_name: str, joint_name: str, val: int, t_exec: int=1000):
@@ -59,14 +233,19 @@ class Hand:
         else:
             return False
     
-    # Set torque for all fingers
+    # Set torque for all fingers, one sync write per bus
     def set_torque(self, enable=False):
+        ids = {port: [] for port in self.buses.keys()}
         for finger in self.fingers.keys():
-            # print(f'[{finger}] Set torque: {enable}')
-            self.fingers[finger].set_torque(enable)
+            ids[self.finger_ports[finger]] += [servo['id'] for servo in self.fingers[finger].servo_params.values()]
+            # Servos may have been moved by hand while torque was off
+            self.fingers[finger].mark_all_dirty()
+        results = self.on_buses(SAFETY, 'set_torque', {port: (port_ids, enable) for port, port_ids in ids.items() if len(port_ids) > 0})
+        return all(results.values())
     
+    # Dict views of the commanded state, {finger: {joint: {'joint_angle', 'servo_pos'}}}, writing through to self.state
     def get_hand_states(self):
-        self.states = {finger_name: self.fingers[finger_name].finger_state for finger_name in self.fingers.keys()}
+        self.states = self.state.as_dict()
         return self.states
     
     def get_hand_params(self):
@@ -103,21 +282,46 @@ class Hand:
 
 class Finger:
 
-    def __init__(self, finger_name: str, finger_params: dict, servos) -> None:
+    # mapper, state: the JointMapper and HandState of the hand, by default ones for this finger alone
+    def __init__(self, finger_name: str, finger_params: dict, servos, register: bool=True, mapper: JointMapper=None,
+                 state: HandState=None) -> None:
         self.params = finger_params
         self.finger_name = finger_name 
         self.servos = servos
+        self.mapper = JointMapper({finger_name: finger_params}) if mapper is None else mapper
+        self.state = HandState(self.mapper.joints, self.mapper.ids) if state is None else state
+        # Column of each joint in the state arrays
+        self.columns = {joint_name: self.state.index[(finger_name, joint_name)] for joint_name in finger_params.keys()}
         self.finger_state = {joint_name: {'joint_angle': finger_params[joint_name]['min_deg'], 'servo_pos': finger_params[joint_name]['min']} for joint_name in finger_params.keys()}
         self.servo_params = {
             joint_name: {
                 'id': self.params[joint_name]['id'], 
-                'model': 'XC330', 
+                'model': self.params[joint_name].get('model', 'XC330'),
                 'op_mode': 'extended_pos', 
                 'reverse_mode': self.params[joint_name]['reverse']
             } for joint_name in finger_params.keys()
         }
 
-        self.servos.add_servo(self.servo_params)
+        # Last goal (servo_pos + offset) acknowledged by each servo, NaN until first sent
+        self.mark_all_dirty()
+
+        # Hand registers all fingers at once with add_servo_batch
+        if register:
+            self.servos.add_servo(self.servo_params)
+
+    # {joint: {'joint_angle', 'servo_pos'}} view of the commanded state, assigning it copies the values into the state
+    @property
+    def finger_state(self):
+        return self.state.finger(self.finger_name)
+
+    @finger_state.setter
+    def finger_state(self, finger_state: dict):
+        view = self.state.finger(self.finger_name)
+        for joint, values in finger_state.items():
+            if joint in view:
+                for key in COMMANDED_FIELDS:
+                    if key in values:
+                        view[joint][key] = values[key]
         
 
     def map_to_servo(self, joint_name: str, joint_angle: int): # 0 when 180 for the servo
@@ -128,42 +332,80 @@ class Finger:
         # Extension: -ve
         # Right (from palmar side): +ve
 
-        # Linear mapping
-        m = (self.params[joint_name]['max'] - self.params[joint_name]['min']) / (self.params[joint_name]['max_deg'] - self.params[joint_name]['min_deg']) 
-        c = self.params[joint_name]['max'] - m * self.params[joint_name]['max_deg']
-        val = m * joint_angle + c
-        print(val)
-        if val > max(self.params[joint_name]['max'], self.params[joint_name]['min']): val = max(self.params[joint_name]['max'], self.params[joint_name]['min']) 
-        if val < min(self.params[joint_name]['max'], self.params[joint_name]['min']): val = min(self.params[joint_name]['max'], self.params[joint_name]['min'])
-        return int(val)
+        # Linear mapping, slope/intercept/limits precompiled in the JointMapper
+        return self.mapper.joint_to_servo(self.finger_name, joint_name, joint_angle)
+
 
+    # Inverse of map_to_servo
+    def map_to_joint(self, joint_name: str, servo_pos: int):
+        return self.mapper.servo_to_joint(self.finger_name, joint_name, servo_pos)
+
+    # Build the measured state of the finger from {id: {register: value}} sync read results,
+    # joint_angles: the angles of the whole hand already mapped by JointMapper.to_joint(), if any
+    def get_measured_state(self, readings: dict, joint_angles=None):
+        state = {}
+        for joint in self.finger_state.keys():
+            id_ = self.params[joint]['id']
+            if id_ not in readings.keys():
+                continue
+            servo_pos = readings[id_]['PRESENT_POSITION'] - self.params[joint]['offset']
+            state[joint] = {
+                'joint_angle': self.map_to_joint(joint, servo_pos) if joint_angles is None
+                               else float(joint_angles[self.mapper.index[(self.finger_name, joint)]]),
+                'servo_pos': servo_pos,
+                'velocity': readings[id_]['PRESENT_VELOCITY'],
+                'current': readings[id_]['PRESENT_CURRENT'],
+            }
+        return state
 
     def move_joint(self, joint='dip', t_exec=1000):
         if joint not in self.finger_state.keys():
             return False
         
-        pos = self.finger_state[joint]['servo_pos'] + self.params[joint]['offset']
+        pos = self.get_goal(joint)
         self.servos.set_torque(self.params[joint]['id'], 1)
-        return self.servos.set_goal_pos(self.params[joint]['id'], goal_pos=pos, duration_ms=t_exec)
+        success = self.servos.set_goal_pos(self.params[joint]['id'], goal_pos=pos, duration_ms=t_exec)
+        if success:
+            self.state.goal[self.columns[joint]] = pos
+        return success
     
     def move_finger(self, t_exec) -> bool:
-        success = True
+        ids, goal_pos, t = self.get_goal_commands(t_exec)
+        if len(ids) == 0:
+            return True
+        sent = set(self.servos.send_goal_pos_sync(ids, goal_pos, t))
+        self.acknowledge_goals([id_ for id_ in ids if id_ in sent], [goal for id_, goal in zip(ids, goal_pos) if id_ in sent])
+        return len(sent) == len(ids)
+
+    def get_goal(self, joint):
+        return self.finger_state[joint]['servo_pos'] + self.params[joint]['offset']
+
+    # Joints whose pending goal differs from the last acknowledged one
+    def get_dirty_joints(self):
+        return [joint for joint, i in self.columns.items() if self.get_goal(joint) != self.state.goal[i]]
+
+    # Collect (ids, goal positions, durations) for the dirty joints of the finger
+    def get_goal_commands(self, t_exec):
         ids, goal_pos, t = [], [], []
-        for joint in self.finger_state.keys():
-            if joint not in self.finger_state.keys():
-                return False
-            # print(joint, self.finger_state[joint])
+        for joint in self.get_dirty_joints():
             ids.append(self.params[joint]['id'])
-            goal_pos.append(self.finger_state[joint]['servo_pos'] + self.params[joint]['offset'])
+            goal_pos.append(self.get_goal(joint))
             t.append(t_exec)
-            # success &= self.move_joint(joint, self.finger_state[joint], t_exec)
-        self.servos.set_goal_pos_sync(ids, goal_pos, t)
-        print(ids, goal_pos, t)
-        return success
+        return ids, goal_pos, t
+
+    # Record the goals sent successfully, ids of other fingers are ignored
+    def acknowledge_goals(self, ids, goal_pos):
+        sent = dict(zip(ids, goal_pos))
+        for joint, i in self.columns.items():
+            if self.params[joint]['id'] in sent:
+                self.state.goal[i] = sent[self.params[joint]['id']]
+
+    # Forget acknowledged goals so the next move sends every joint
+    def mark_all_dirty(self):
+        self.state.goal[list(self.columns.values())] = np.nan
 
     def update_finger_state(self, joint_angle: dict={'mcp':None, 'mcp_abd':None, 'pip':None, 'dip':None, 'thumb_abd': None, 'pinky_abd': None}):
         for joint in joint_angle.keys():
-            print(f'{joint}: {joint_angle[joint]}')
             if joint in self.finger_state.keys() and joint_angle[joint] is not None:
                 self.finger_state[joint]['joint_angle'] = joint_angle[joint]
                 self.finger_state[joint]['servo_pos'] = self.map_to_servo(joint, joint_angle[joint])
@@ -174,9 +416,12 @@ class Finger:
         for servo in self.servo_params.keys():
             ids.append(self.servo_params[servo]['id'])
         self.servos.set_torque(ids, enable)
+        # Servos may have been moved by hand while torque was off
+        self.mark_all_dirty()
 
     def set_calibration_offset(self, joint_name: str, servo_offset: int):
         self.params[joint_name]['offset'] = servo_offset
+        self.mapper.set_offset(self.finger_name, joint_name, servo_offset)
 
 
 
@@ -209,14 +209,12 @@ class Hand_GUI:
     
     def _record_data(self):
         try: 
-            data = self.hand.get_hand_states()
-            joint_positions = [] # increment counts
+            # One cell per joint in hand.state order, the columns written by _create_recording
+            state = self.hand.state
+            joint_positions = [{'joint_angle': joint_angle, 'servo_pos': int(servo_pos)}
+                               for joint_angle, servo_pos in zip(state.joint_angle.tolist(), state.servo_pos.tolist())]
             self.current_waypoint += 1
 
-            for finger, joints in data.items():
-                for joint in joints.keys():
-                    joint_positions.append(data[finger][joint])
-
             file_exists = os.path.isfile(self.recording_file)
             if not file_exists: 
                 print("no recording file")
@@ -245,14 +243,8 @@ class Hand_GUI:
 
             # Create an empty CSV file
             if not os.path.exists(self.recording_file):
-                data = self.hand.get_hand_states()
-
                 with open(self.recording_file, 'w', newline='') as file:
-                    data = self.hand.get_hand_states()
-                    joint_names = []
-                    for finger, joints in data.items():
-                        for joint in joints.keys():
-                            joint_names.append(f"{finger}#{joint}") 
+                    joint_names = self.hand.state.names
 
                     writer = csv.writer(file)
                     writer.writerow(joint_names)
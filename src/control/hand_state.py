@@ -0,0 +1,175 @@
+
+"""
+This module keeps the state of every joint of the hand in fixed-order NumPy arrays: commanded
+angle and servo position, acknowledged goal, measured angle, position, velocity and current, and
+when they were measured. Joints are indexed as in the JointMapper, the same order used by the
+recordings and the telemetry buffer, and per-finger dict views keep the nested-dict API working.
+"""
+
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+# Rows of HandState.data
+FIELDS = (
+    'joint_angle',     # commanded joint angle (deg)
+    'servo_pos',       # commanded servo position, calibration offset excluded
+    'goal',            # last goal position acknowledged by the servo, offset included (NaN: to be sent)
+    'measured_angle',  # measured joint angle (deg)
+    'measured_pos',    # measured servo position, calibration offset excluded
+    'velocity',        # PRESENT_VELOCITY (0.229 rev/min)
+    'current',         # PRESENT_CURRENT (mA)
+    'timestamp',       # time of the measurement (time.monotonic())
+)
+
+# Entries of the per-joint dict views, as stored in the recordings
+COMMANDED_FIELDS = ('joint_angle', 'servo_pos')
+_INT_FIELDS = {'servo_pos'}
+_ROWS = {field: i for i, field in enumerate(FIELDS)}
+
+
+class HandState:
+    """
+    State of every joint, one row of `data` per field of FIELDS and one column per joint. Each field
+    is also an attribute viewing its row (e.g. `state.current[i]`), so a snapshot of the whole hand
+    is a single array copy.
+
+    Attributes:
+        joints (List[Tuple[str, str]]): The (finger name, joint name) of each column.
+        names (List[str]): The 'finger#joint' name of each column, as in the recorded CSV columns.
+        index (Dict[Tuple[str, str], int]): The column of each (finger name, joint name).
+        ids (np.ndarray): The servo ID of each column.
+        data (np.ndarray): The state, of shape (len(FIELDS), len(joints)), NaN where unknown.
+    """
+
+    def __init__(self, joints: List[Tuple[str, str]], ids):
+        """
+        Initializes the HandState.
+
+        Args:
+            joints (List[Tuple[str, str]]): The (finger name, joint name) of each joint, e.g. JointMapper.joints.
+            ids (array_like): The servo ID of each joint.
+        """
+        self.joints: List[Tuple[str, str]] = list(joints)
+        self.names: List[str] = [f'{finger_name}#{joint_name}' for finger_name, joint_name in self.joints]
+        self.index: Dict[Tuple[str, str], int] = {joint: i for i, joint in enumerate(self.joints)}
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.data = np.full((len(FIELDS), len(self.joints)), np.nan)
+        (self.joint_angle, self.servo_pos, self.goal, self.measured_angle, self.measured_pos,
+         self.velocity, self.current, self.timestamp) = self.data
+
+        finger_names = dict.fromkeys(finger_name for finger_name, _ in self.joints)
+        self._fingers = {finger_name: FingerStateView(self, finger_name) for finger_name in finger_names}
+
+    def __len__(self):
+        return len(self.joints)
+
+    def field(self, name: str) -> np.ndarray:
+        """
+        Returns the row of a field.
+
+        Args:
+            name (str): The field, one of FIELDS.
+
+        Returns:
+            np.ndarray: A view of the row, one value per joint.
+        """
+        return self.data[_ROWS[name]]
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Copies the whole state.
+
+        Returns:
+            np.ndarray: A copy of `data`, rows in FIELDS order.
+        """
+        return self.data.copy()
+
+    def finger(self, finger_name: str) -> 'FingerStateView':
+        """
+        Returns the dict view of one finger, {joint name: {'joint_angle', 'servo_pos'}}.
+
+        Args:
+            finger_name (str): The finger name.
+
+        Returns:
+            FingerStateView: The view, writing through to the arrays.
+        """
+        return self._fingers[finger_name]
+
+    def as_dict(self) -> Dict[str, 'FingerStateView']:
+        """
+        Returns the dict views of every finger, as Hand.get_hand_states() always has.
+
+        Returns:
+            Dict[str, FingerStateView]: {finger name: {joint name: {'joint_angle', 'servo_pos'}}}.
+        """
+        return dict(self._fingers)
+
+    def update_measured(self, angles, positions, velocity, current, timestamp) -> None:
+        """
+        Stores a measurement of every joint; NaN values leave the previous measurement of a joint.
+
+        Args:
+            angles (array_like): The measured joint angles, one per joint.
+            positions (array_like): The measured servo positions, calibration offset excluded.
+            velocity (array_like): PRESENT_VELOCITY of each joint.
+            current (array_like): PRESENT_CURRENT of each joint.
+            timestamp (float or array_like): The time of the measurement (time.monotonic()).
+        """
+        measured = ~np.isnan(np.asarray(positions, dtype=float))
+        rows = slice(_ROWS['measured_angle'], _ROWS['timestamp'] + 1)
+        values = np.array(np.broadcast_arrays(angles, positions, velocity, current, timestamp), dtype=float)
+        self.data[rows, measured] = values[:, measured]
+
+
+class JointStateView(MutableMapping):
+    """Dict view of the commanded state of one joint, {'joint_angle', 'servo_pos'}, backed by a HandState."""
+
+    def __init__(self, state: HandState, column: int):
+        self._state = state
+        self._column = column
+
+    def __getitem__(self, key):
+        if key not in COMMANDED_FIELDS:
+            raise KeyError(key)
+        value = self._state.field(key)[self._column]
+        return int(value) if key in _INT_FIELDS else float(value)
+
+    def __setitem__(self, key, value):
+        if key not in COMMANDED_FIELDS:
+            raise KeyError(key)
+        self._state.field(key)[self._column] = value
+
+    def __delitem__(self, key):
+        raise TypeError("Joint state entries cannot be removed")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(COMMANDED_FIELDS)
+
+    def __len__(self):
+        return len(COMMANDED_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class FingerStateView(Mapping):
+    """Dict view of the commanded state of one finger, {joint name: JointStateView}, backed by a HandState."""
+
+    def __init__(self, state: HandState, finger_name: str):
+        self._joints = {joint_name: JointStateView(state, i) for i, (finger, joint_name) in enumerate(state.joints)
+                        if finger == finger_name}
+
+    def __getitem__(self, joint_name) -> JointStateView:
+        return self._joints[joint_name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._joints)
+
+    def __len__(self):
+        return len(self._joints)
+
+    def __repr__(self):
+        return repr({joint_name: dict(view) for joint_name, view in self._joints.items()})
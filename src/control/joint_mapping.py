@@ -0,0 +1,353 @@
+
+"""
+This module compiles the joint angle to servo position mapping of the whole hand: the slope,
+intercept, limits and calibration offset of every joint are laid out once in arrays, so a full
+hand pose, or a whole trajectory of them, is converted in one vectorized operation. Joints with
+a nonlinear calibration curve are sampled into dense lookup tables, interpolated in O(1).
+"""
+
+import logging
+from collections.abc import Mapping
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Samples of each calibration curve lookup table (forward and inverse)
+LUT_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+def calibration_points(name: str, param: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collects the calibration points of a joint: (min_deg, min), (max_deg, max), the intermediate
+    point (int_deg, int) and the extra samples of 'curve' ([[deg, servo position], ...]).
+
+    The intermediate point, the servo position at int_deg (0 deg by default), is only used when it lies
+    strictly inside both ranges; 'int' equal to min or max, or -1, means the joint has none.
+
+    Args:
+        name (str): The joint name, for messages.
+        param (dict): The joint parameters.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (angles, servo positions), in increasing angle order.
+
+    Raises:
+        ValueError: If the servo positions are not strictly monotonic in the angle.
+    """
+    points = {float(param['min_deg']): float(param['min']), float(param['max_deg']): float(param['max'])}
+    low_deg, high_deg = sorted(points.keys())
+    low, high = sorted(points.values())
+
+    intermediate, int_deg = param.get('int', -1), float(param.get('int_deg', 0.0))
+    if low < intermediate < high and low_deg < int_deg < high_deg:
+        points[int_deg] = float(intermediate)
+    elif intermediate not in (-1, param['min'], param['max']):
+        logger.warning(f"{name}: intermediate point {intermediate} @ {int_deg} deg outside the joint range, ignored")
+    for deg, servo_pos in param.get('curve', []):
+        points[float(deg)] = float(servo_pos)
+
+    angles = np.array(sorted(points.keys()))
+    positions = np.array([points[deg] for deg in angles])
+    steps = np.diff(positions)
+    if not (np.all(steps > 0) or np.all(steps < 0)):
+        raise ValueError(f"{name}: calibration points are not monotonic: {list(zip(angles, positions))}")
+    return angles, positions
+
+
+def pchip_slopes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Derivatives of the monotone piecewise cubic (PCHIP, Fritsch-Carlson) through the points (x, y).
+
+    Args:
+        x (np.ndarray): The strictly increasing abscissas.
+        y (np.ndarray): The ordinates.
+
+    Returns:
+        np.ndarray: The derivative at each point.
+    """
+    h = np.diff(x)
+    delta = np.diff(y) / h
+    if len(x) == 2:
+        return np.full(2, delta[0])
+
+    d = np.zeros(len(x))
+    # Weighted harmonic mean of the neighbouring secants, 0 at local extrema
+    w1, w2 = 2 * h[1:] + h[:-1], h[1:] + 2 * h[:-1]
+    same_sign = delta[:-1] * delta[1:] > 0
+    d[1:-1][same_sign] = ((w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:]))[same_sign]
+
+    # One-sided three-point estimates at the ends, kept shape-preserving
+    for end, (h0, h1, d0, d1) in ((0, (h[0], h[1], delta[0], delta[1])), (-1, (h[-1], h[-2], delta[-1], delta[-2]))):
+        slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        if np.sign(slope) != np.sign(d0):
+            slope = 0.0
+        elif np.sign(d0) != np.sign(d1) and abs(slope) > abs(3 * d0):
+            slope = 3 * d0
+        d[end] = slope
+    return d
+
+
+def evaluate_curve(x: np.ndarray, y: np.ndarray, t, interpolation: str = 'linear') -> np.ndarray:
+    """
+    Evaluates the calibration curve through the points (x, y), constant beyond the end points.
+
+    Args:
+        x (np.ndarray): The strictly increasing abscissas.
+        y (np.ndarray): The ordinates.
+        t (array_like): Where to evaluate the curve.
+        interpolation (str, optional): 'linear' (piecewise linear) or 'pchip' (monotone cubic). Defaults to 'linear'.
+
+    Returns:
+        np.ndarray: The curve values.
+
+    Raises:
+        ValueError: If the interpolation is unknown.
+    """
+    t = np.clip(np.asarray(t, dtype=float), x[0], x[-1])
+    if interpolation == 'linear':
+        return np.interp(t, x, y)
+    if interpolation != 'pchip':
+        raise ValueError(f"Unknown interpolation {interpolation}, expected 'linear' or 'pchip'")
+
+    d = pchip_slopes(x, y)
+    k = np.clip(np.searchsorted(x, t, side='right') - 1, 0, len(x) - 2)
+    h = x[k + 1] - x[k]
+    s = (t - x[k]) / h
+    return ((1 + 2 * s) * (1 - s) ** 2 * y[k] + s * (1 - s) ** 2 * h * d[k]
+            + s ** 2 * (3 - 2 * s) * y[k + 1] + s ** 2 * (s - 1) * h * d[k + 1])
+
+
+def _lookup(table: Tuple[np.ndarray, ...], x: np.ndarray, extrapolate: bool, rows=slice(None)) -> np.ndarray:
+    # Linear interpolation in uniformly sampled tables, one table per column of x
+    # (np.minimum/np.maximum rather than np.clip, a few times faster on small arrays)
+    samples, base, start, step = table
+    u = (x - start[rows]) / step[rows]
+    i = np.minimum(np.fmax(np.floor(u), 0.0), LUT_SIZE - 2).astype(np.int64)  # fmax: NaN -> 0, kept in frac
+    frac = u - i
+    if not extrapolate:
+        frac = np.minimum(np.maximum(frac, 0.0), 1.0)
+    i += base[rows]
+    lo = samples.take(i)
+    return lo + (samples.take(i + 1) - lo) * frac
+
+
+class JointMapper:
+    """
+    Joint angle (deg) to servo position (pulse) mapping of every joint, through the points
+    (min_deg, min) and (max_deg, max) of its finger parameters and clamped to [min, max].
+
+    The mapping is linear unless the joint has an intermediate point or extra 'curve' samples (see
+    calibration_points()). Such joints follow a piecewise-linear curve, or a monotone cubic with
+    'interpolation': 'pchip'. The curve is sampled once into forward and inverse lookup tables
+    of LUT_SIZE points each.
+
+    Joints are ordered as in the finger parameters, finger by finger; angle vectors and the columns
+    of trajectories follow that order. The 'reverse' parameter is applied by the servo itself
+    (drive mode), so present positions are read in the same frame as the goals are sent.
+
+    Attributes:
+        joints (List[Tuple[str, str]]): The (finger name, joint name) of each joint, in vector order.
+        names (List[str]): The 'finger#joint' name of each joint, as in the recorded CSV columns.
+        index (Dict[Tuple[str, str], int]): The position of each (finger name, joint name) in the vector.
+        ids (np.ndarray): The servo ID of each joint.
+        slope (np.ndarray): Servo pulses per degree of each joint.
+        intercept (np.ndarray): Servo position of each joint at 0 deg, calibration offset excluded.
+        low (np.ndarray): Lowest servo position of each joint, calibration offset excluded.
+        high (np.ndarray): Highest servo position of each joint, calibration offset excluded.
+        offset (np.ndarray): Calibration offset of each joint, added to the servo positions sent.
+        curved (np.ndarray): The vector positions of the joints mapped through lookup tables.
+    """
+
+    def __init__(self, finger_parameters: Dict[str, dict]):
+        """
+        Initializes the JointMapper.
+
+        Args:
+            finger_parameters (Dict[str, dict]): {finger name: {joint name: joint params}}, as in finger_params.json.
+        """
+        self.compile(finger_parameters)
+
+    def __len__(self):
+        return len(self.joints)
+
+    def compile(self, finger_parameters: Dict[str, dict]) -> None:
+        """
+        Precomputes the mapping arrays, again whenever the finger parameters are loaded or edited.
+
+        Args:
+            finger_parameters (Dict[str, dict]): {finger name: {joint name: joint params}}.
+        """
+        self.joints: List[Tuple[str, str]] = [(finger_name, joint_name) for finger_name, joints in finger_parameters.items()
+                                              for joint_name in joints.keys()]
+        self.names: List[str] = [f'{finger_name}#{joint_name}' for finger_name, joint_name in self.joints]
+        self.index: Dict[Tuple[str, str], int] = {joint: i for i, joint in enumerate(self.joints)}
+
+        params = [finger_parameters[finger_name][joint_name] for finger_name, joint_name in self.joints]
+        column = lambda key: np.array([float(param[key]) for param in params])
+        servo_min, servo_max, min_deg, max_deg = column('min'), column('max'), column('min_deg'), column('max_deg')
+
+        self.ids = np.array([param['id'] for param in params], dtype=np.int64)
+        self._id_list: List[int] = self.ids.tolist()
+        self.slope = (servo_max - servo_min) / (max_deg - min_deg)
+        self.intercept = servo_max - self.slope * max_deg
+        self.low = np.minimum(servo_min, servo_max)
+        self.high = np.maximum(servo_min, servo_max)
+        self.offset = np.array([param['offset'] for param in params], dtype=np.int64)
+
+        # Nonlinear joints: forward (angle -> position) and inverse lookup tables, one row per joint
+        curves = {}
+        for i, ((finger_name, joint_name), param) in enumerate(zip(self.joints, params)):
+            angles, positions = calibration_points(f'{finger_name}#{joint_name}', param)
+            if len(angles) > 2:
+                curves[i] = (angles, positions, param.get('interpolation', 'linear'))
+        self.curved = np.array(sorted(curves.keys()), dtype=np.int64)
+        self._curve_rows: Dict[int, int] = {i: row for row, i in enumerate(self.curved.tolist())}
+        self._forward = self._tables(curves, inverse=False)
+        self._inverse = self._tables(curves, inverse=True)
+
+    @staticmethod
+    def _tables(curves: dict, inverse: bool) -> Tuple[np.ndarray, ...]:
+        # (samples of every table back to back, index of the first sample, start, step) of each curve
+        tables, starts, steps = np.zeros((len(curves), LUT_SIZE)), np.zeros(len(curves)), np.ones(len(curves))
+        for row, i in enumerate(sorted(curves.keys())):
+            angles, positions, interpolation = curves[i]
+            if not inverse:
+                grid = np.linspace(angles[0], angles[-1], LUT_SIZE)
+                tables[row] = evaluate_curve(angles, positions, grid, interpolation)
+            else:
+                # Invert a finer sampling of the monotone curve
+                fine = np.linspace(angles[0], angles[-1], 8 * LUT_SIZE)
+                fine_positions = evaluate_curve(angles, positions, fine, interpolation)
+                if fine_positions[-1] < fine_positions[0]:
+                    fine, fine_positions = fine[::-1], fine_positions[::-1]
+                grid = np.linspace(fine_positions[0], fine_positions[-1], LUT_SIZE)
+                tables[row] = np.interp(grid, fine_positions, fine)
+            starts[row], steps[row] = grid[0], grid[1] - grid[0]
+        return tables.ravel(), np.arange(len(curves), dtype=np.int64) * LUT_SIZE, starts, steps
+
+    def set_offset(self, finger_name: str, joint_name: str, servo_offset: int) -> None:
+        """
+        Updates the calibration offset of one joint.
+
+        Args:
+            finger_name (str): The finger name.
+            joint_name (str): The joint name.
+            servo_offset (int): The offset (in pulses).
+        """
+        self.offset[self.index[(finger_name, joint_name)]] = servo_offset
+
+    def to_servo(self, angles, offset: bool = True) -> np.ndarray:
+        """
+        Converts joint angles into servo positions.
+
+        Args:
+            angles (array_like): One angle per joint (in deg) in vector order, shape (J,) for a pose
+                or (N, J) for a trajectory of N poses.
+            offset (bool, optional): Add the calibration offsets, giving the goal positions sent to
+                the servos. Defaults to True.
+
+        Returns:
+            np.ndarray: The servo positions (int64), of the same shape as angles.
+        """
+        angles = np.asarray(angles, dtype=float)
+        positions = np.minimum(np.maximum(self.slope * angles + self.intercept, self.low), self.high)
+        if len(self.curved) > 0:
+            positions[..., self.curved] = _lookup(self._forward, angles[..., self.curved], extrapolate=False)
+        # Truncated towards zero like int(), as the goals have always been
+        positions = np.trunc(positions).astype(np.int64)
+        if offset:
+            positions += self.offset
+        return positions
+
+    def joint_to_servo(self, finger_name: str, joint_name: str, joint_angle: float) -> int:
+        """
+        Converts the angle of one joint into its servo position, calibration offset excluded.
+
+        Args:
+            finger_name (str): The finger name.
+            joint_name (str): The joint name.
+            joint_angle (float): The joint angle (in deg).
+
+        Returns:
+            int: The servo position.
+        """
+        i = self.index[(finger_name, joint_name)]
+        row = self._curve_rows.get(i)
+        if row is not None:
+            return int(_lookup(self._forward, np.array([joint_angle], dtype=float), extrapolate=False, rows=[row])[0])
+        return int(min(max(self.slope[i] * joint_angle + self.intercept[i], self.low[i]), self.high[i]))
+
+    def to_joint(self, positions, offset: bool = True) -> np.ndarray:
+        """
+        Converts servo positions into joint angles, the inverse of to_servo(). Positions beyond the
+        joint limits are not clamped but extrapolated from the end of the curve, so the angles show
+        how far a joint actually went.
+
+        Args:
+            positions (array_like): One position per joint in vector order, shape (J,) or (N, J); NaN where unknown.
+            offset (bool, optional): The positions include the calibration offsets, e.g. PRESENT_POSITION. Defaults to True.
+
+        Returns:
+            np.ndarray: The joint angles (in deg), of the same shape as positions.
+        """
+        positions = np.asarray(positions, dtype=float)
+        if offset:
+            positions = positions - self.offset
+        angles = (positions - self.intercept) / self.slope
+        if len(self.curved) > 0:
+            angles[..., self.curved] = _lookup(self._inverse, positions[..., self.curved], extrapolate=True)
+        return angles
+
+    def servo_to_joint(self, finger_name: str, joint_name: str, servo_pos: float) -> float:
+        """
+        Converts the servo position of one joint into its angle, calibration offset excluded.
+
+        Args:
+            finger_name (str): The finger name.
+            joint_name (str): The joint name.
+            servo_pos (float): The servo position.
+
+        Returns:
+            float: The joint angle (in deg).
+        """
+        i = self.index[(finger_name, joint_name)]
+        row = self._curve_rows.get(i)
+        if row is not None:
+            return float(_lookup(self._inverse, np.array([servo_pos], dtype=float), extrapolate=True, rows=[row])[0])
+        return float((servo_pos - self.intercept[i]) / self.slope[i])
+
+    def servo_vector(self, readings: Dict[int, Dict[str, int]], key: str = 'PRESENT_POSITION') -> np.ndarray:
+        """
+        Gathers one register of each joint's servo from sync read results into a vector.
+
+        Args:
+            readings (Dict[int, Dict[str, int]]): {id: {register: value}}, as returned by read_states_sync().
+            key (str, optional): The register. Defaults to 'PRESENT_POSITION'.
+
+        Returns:
+            np.ndarray: One value per joint, in vector order; NaN for servos that did not respond.
+        """
+        return np.array([readings[id_].get(key, np.nan) if id_ in readings else np.nan for id_ in self._id_list], dtype=float)
+
+    def vector(self, values: Dict[str, dict], key: str = 'joint_angle', default: float = np.nan) -> np.ndarray:
+        """
+        Gathers per-joint values of {finger name: {joint name: ...}} dicts, e.g. Hand.get_hand_states(), into a vector.
+
+        Args:
+            values (Dict[str, dict]): {finger name: {joint name: value or {key: value}}}.
+            key (str, optional): The entry taken from dict values. Defaults to 'joint_angle'.
+            default (float, optional): The value of joints missing from values. Defaults to NaN.
+
+        Returns:
+            np.ndarray: One value per joint, in vector order.
+        """
+        vector = np.full(len(self.joints), default, dtype=float)
+        for i, (finger_name, joint_name) in enumerate(self.joints):
+            value = values.get(finger_name, {}).get(joint_name)
+            if isinstance(value, Mapping):
+                value = value.get(key)
+            if value is not None:
+                vector[i] = value
+        return vector
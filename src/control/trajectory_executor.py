@@ -0,0 +1,218 @@
+
+"""
+This module streams joint setpoints to the hand at a fixed rate: a background thread wakes at
+each deadline of a fixed schedule, takes the setpoint due from a trajectory or a live stream,
+and sends it with one sync write per bus. Late ticks skip ahead to the setpoint due instead of
+replaying stale ones, and the loop timing is recorded as period, jitter and missed deadlines.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+
+class TrajectoryExecutor(threading.Thread):
+    """
+    Fixed-rate executor of whole-hand setpoints (joint angles in hand.mapper.joints order, NaN
+    leaving a joint unchanged). Each setpoint is sent with a time profile of one period, so the
+    servos interpolate between consecutive setpoints.
+
+    The deadline of tick k is start + k * period. A tick woken later than a full period skips the
+    setpoints whose deadlines passed (counted as missed) rather than sending them in a burst.
+
+    Attributes:
+        hand (Hand): The hand driven.
+        rate_hz (float): The setpoint rate.
+        period (float): The time between two setpoints (in s).
+    """
+
+    def __init__(self, hand, rate_hz: float = 100.0):
+        """
+        Initializes the TrajectoryExecutor.
+
+        Args:
+            hand (Hand): The hand driven.
+            rate_hz (float, optional): The setpoint rate, typically 50 to 200 Hz. Defaults to 100 Hz.
+
+        Raises:
+            ValueError: If the rate is not positive.
+        """
+        super().__init__(daemon=True)
+        if rate_hz <= 0:
+            raise ValueError(f"Invalid rate {rate_hz} Hz")
+        self.hand = hand
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.t_exec = max(1, round(self.period * 1000))  # time profile of each setpoint (in ms)
+
+        self._lock = threading.Lock()
+        self._source: Union[np.ndarray, Iterator, None] = None
+        self._start_tick = 0
+        self._setpoint: Optional[np.ndarray] = None
+        self._tick = -1  # last tick whose setpoint was taken
+        self.done_event = threading.Event()
+        self.done_event.set()
+        self.stop_event = threading.Event()
+        self.logger = logging.getLogger(__name__)
+        self.reset_stats()
+
+    def play(self, trajectory: Union[np.ndarray, Iterable]) -> None:
+        """
+        Starts executing a trajectory from the next tick, replacing the current one.
+
+        Args:
+            trajectory (np.ndarray or Iterable): Setpoints of shape (N, joints), one per tick, or an iterable
+                yielding one setpoint per tick (e.g. a policy), consumed until exhausted.
+        """
+        if isinstance(trajectory, np.ndarray):
+            trajectory = np.atleast_2d(np.asarray(trajectory, dtype=float))
+        else:
+            trajectory = iter(trajectory)
+        with self._lock:
+            self._source = trajectory
+            # The tick in flight already took its setpoint
+            self._start_tick = self._tick + 1
+            self._setpoint = None
+            self.done_event.clear()
+
+    def stream(self, setpoint) -> None:
+        """
+        Sets the setpoint sent from the next tick on, e.g. from teleoperation; stops a playing trajectory.
+
+        Args:
+            setpoint (array_like): The joint angles, one per joint.
+        """
+        with self._lock:
+            self._source = None
+            self._setpoint = np.asarray(setpoint, dtype=float)
+        self.done_event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the trajectory playing has been sent entirely.
+
+        Args:
+            timeout (float, optional): The maximum time to wait (in s). Defaults to no limit.
+
+        Returns:
+            bool: True if the trajectory completed.
+        """
+        return self.done_event.wait(timeout)
+
+    def stats(self) -> dict:
+        """
+        Returns the loop timing since start or the last reset_stats().
+
+        Returns:
+            dict: {'ticks', 'missed', 'overruns', 'failed', 'mean_period_ms', 'jitter_ms' (standard deviation of the
+                period), 'min_period_ms', 'max_period_ms', 'mean_lateness_ms', 'max_lateness_ms' (wake-up after the
+                deadline), 'mean_send_ms', 'max_send_ms'}
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        periods = stats.pop('periods')
+        mean_period = stats.pop('period_sum') / periods if periods else 0.0
+        variance = stats.pop('period_sq_sum') / periods - mean_period ** 2 if periods else 0.0
+        ticks = stats['ticks']
+        stats.update({
+            'mean_period_ms': mean_period * 1000.0,
+            'jitter_ms': math.sqrt(max(variance, 0.0)) * 1000.0,
+            'mean_lateness_ms': stats.pop('lateness_sum') / ticks * 1000.0 if ticks else 0.0,
+            'mean_send_ms': stats.pop('send_sum') / ticks * 1000.0 if ticks else 0.0,
+        })
+        for key in ('min_period', 'max_period', 'max_lateness', 'max_send'):
+            value = stats.pop(key)
+            stats[key + '_ms'] = value * 1000.0 if math.isfinite(value) else 0.0
+        return stats
+
+    def reset_stats(self) -> None:
+        """Clears the loop timing statistics."""
+        with self._lock:
+            self._stats = {'ticks': 0, 'missed': 0, 'overruns': 0, 'failed': 0, 'periods': 0,
+                           'period_sum': 0.0, 'period_sq_sum': 0.0, 'min_period': math.inf, 'max_period': 0.0,
+                           'lateness_sum': 0.0, 'max_lateness': 0.0, 'send_sum': 0.0, 'max_send': 0.0}
+            self._last_wake = None
+
+    def _due_setpoint(self, tick: int) -> Optional[np.ndarray]:
+        # The setpoint of tick, advancing the trajectory past the ticks skipped
+        with self._lock:
+            self._tick = tick
+            source = self._source
+            if isinstance(source, np.ndarray):
+                index = tick - self._start_tick
+                if index >= len(source):
+                    self._source = None
+                    self.done_event.set()
+                    return None
+                self._setpoint = source[index]
+            elif source is not None:
+                try:
+                    for _ in range(tick - self._start_tick + 1):
+                        self._setpoint = np.asarray(next(source), dtype=float)
+                    self._start_tick = tick + 1
+                except StopIteration:
+                    self._source = None
+                    self.done_event.set()
+                    return None
+            return self._setpoint
+
+    def _send(self, setpoint: np.ndarray) -> bool:
+        self.hand.update_hand_joints(setpoint)
+        return self.hand.move_hand(t_exec=self.t_exec)
+
+    def _record(self, wake: float, lateness: float, send_time: float, missed: int, success: bool) -> None:
+        with self._lock:
+            stats = self._stats
+            stats['ticks'] += 1
+            stats['missed'] += missed
+            stats['overruns'] += send_time > self.period
+            stats['failed'] += not success
+            stats['lateness_sum'] += lateness
+            stats['max_lateness'] = max(stats['max_lateness'], lateness)
+            stats['send_sum'] += send_time
+            stats['max_send'] = max(stats['max_send'], send_time)
+            if self._last_wake is not None:
+                period = wake - self._last_wake
+                stats['periods'] += 1
+                stats['period_sum'] += period
+                stats['period_sq_sum'] += period * period
+                stats['min_period'] = min(stats['min_period'], period)
+                stats['max_period'] = max(stats['max_period'], period)
+            self._last_wake = wake
+
+    def run(self):
+        self.logger.info(f"Trajectory executor started @ {self.rate_hz} Hz")
+        start = time.monotonic()
+        tick = 0
+
+        while not self.stop_event.is_set():
+            deadline = start + tick * self.period
+            delay = deadline - time.monotonic()
+            if delay > 0 and self.stop_event.wait(delay):
+                break
+
+            wake = time.monotonic()
+            lateness = wake - deadline
+            # Late by whole periods: skip ahead to the setpoint due now
+            missed = int(lateness // self.period)
+            tick += missed
+
+            success = True
+            setpoint = self._due_setpoint(tick)
+            if setpoint is not None:
+                try:
+                    success = self._send(setpoint)
+                except Exception as e:
+                    success = False
+                    self.logger.error(f"Trajectory executor send failed: {e}")
+            self._record(wake, lateness, time.monotonic() - wake, missed, success)
+            tick += 1
+
+        self.logger.info("Trajectory executor stopped")
+
+    def stop(self):
+        self.stop_event.set()  # Signal thread to stop
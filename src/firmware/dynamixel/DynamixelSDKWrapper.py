@@ -13,6 +13,19 @@ from dynamixel_sdk import (
     GroupSyncWrite,
     GroupSyncRead,
     COMM_SUCCESS,
+    ERRBIT_ALERT,
+    PKT_ID,
+    PKT_ERROR,
+    PKT_LENGTH_L,
+    PKT_LENGTH_H,
+    PKT_INSTRUCTION,
+    PKT_PARAMETER0,
+    BROADCAST_ID,
+    MAX_ID,
+    INST_PING,
+    COMM_RX_TIMEOUT,
+    COMM_RX_CORRUPT,
+    DXL_MAKEWORD,
     DXL_LOWORD,
     DXL_HIWORD,
     DXL_LOBYTE,
@@ -21,9 +34,16 @@ from dynamixel_sdk import (
     # reboot,
 )
 import control_table
+from bus_stats import BusStats, BusStatsReporter
+from sync_write_plan import SyncWritePlan
+from register_block import RegisterBlock, RECORDS
 import logging
+import json
 import time
-from typing import Dict, List, Union, Optional
+import functools
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Tuple, Union, Optional
+import numpy as np
 from dataclasses import dataclass, field
 
 @dataclass
@@ -42,6 +62,11 @@ class Servo:
         drive_mode (str): The drive mode of the servo.
         secondary_id (int): The secondary (shadow) ID of the servo.
         torque_status (Optional[bool]): The current torque status of the servo.
+        indirect (dict): The registers mapped to each indirect data block, {block: {register: {'ADDR', 'LEN'}}}.
+        shadow (dict): The last known value of each SHADOW_REGISTERS register, {register: value}.
+        failures (int): The number of consecutive failed transactions.
+        total_failures (int): The number of failed transactions since the servo was added.
+        quarantined_until (float): Until when (time.monotonic()) the servo is left out of group packets.
     """
     id_: int
     model: str
@@ -54,6 +79,11 @@ class Servo:
     drive_mode: str = 'time'
     secondary_id: int = 255
     torque_status: bool = False
+    indirect: dict = field(default_factory=dict)
+    shadow: dict = field(default_factory=dict)
+    failures: int = 0
+    total_failures: int = 0
+    quarantined_until: float = 0.0
 
     def __repr__(self):
         repr = f"Servo ID: {self.id_}\n"
@@ -67,9 +97,80 @@ class Servo:
         repr += f"Drive Mode: {self.drive_mode}\n"
         repr += f"Secondary ID: {self.secondary_id}\n"
         repr += f"Torque Status: {self.torque_status}\n"
+        repr += f"Indirect Blocks: {list(self.indirect.keys())}\n"
+        repr += f"Failures: {self.failures} ({self.total_failures} total)\n"
         return repr
 
 
+@dataclass
+class RetryPolicy:
+    """
+    How a transaction failing to communicate is repeated.
+
+    Attributes:
+        attempts (int): The maximum number of tries, 1 for no retry.
+        deadline_ms (Optional[float]): Give up once this much time has passed since the first try.
+        backoff_ms (float): The pause between two tries.
+    """
+    attempts: int = 1
+    deadline_ms: Optional[float] = None
+    backoff_ms: float = 0.0
+
+    def retry(self, attempt: int, start: float) -> bool:
+        """
+        Decides whether another try is allowed, waiting for the backoff if it is.
+
+        Args:
+            attempt (int): The number of tries made so far.
+            start (float): The time of the first try (time.monotonic()).
+
+        Returns:
+            bool: True if the transaction should be tried again.
+        """
+        if attempt >= self.attempts:
+            return False
+        if self.deadline_ms is not None and (time.monotonic() - start) * 1000.0 + self.backoff_ms >= self.deadline_ms:
+            return False
+        if self.backoff_ms > 0:
+            time.sleep(self.backoff_ms / 1000.0)
+        return True
+
+
+def retry_class(name: str):
+    """
+    Decorator running the transactions of a wrapper method under the retry policy of a command class
+    (see DynamixelSDKWrapper.RETRY_POLICIES), unless a caller already chose one, e.g. with retry_as().
+
+    Args:
+        name (str): The command class, a key of RETRY_POLICIES.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._retry_class is not None:
+                return method(self, *args, **kwargs)
+            with self.retry_as(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@dataclass
+class BulkReadPlan:
+    """
+    Prepared read of a fixed set of registers per servo, see DynamixelSDKWrapper.bulk_read().
+
+    Attributes:
+        cmds (Dict[int, List[dict]]): The register entries ({'ADDR', 'LEN'}) read from each servo.
+        spans (Dict[int, Tuple[int, int]]): The address span (first address, number of bytes) read from each servo.
+        group (Optional[GroupBulkRead]): The bulk read holding the parameters of every span, None when
+            the span is the same on every servo (read with a sync read instead).
+    """
+    cmds: Dict[int, List[dict]]
+    spans: Dict[int, Tuple[int, int]]
+    group: Optional[GroupBulkRead] = None
+
+
 class DynamixelSDKWrapper:
     """
     A wrapper class for the Dynamixel SDK to manage communication with multiple servos.
@@ -82,33 +183,124 @@ class DynamixelSDKWrapper:
    
     CONTROL_TABLES = {
         'XC330': control_table.CONTROL_TABLE_XC_330,
+        'XL330': control_table.CONTROL_TABLE_XL_330,
+        'XM430': control_table.CONTROL_TABLE_XM_430,
+        'XH430': control_table.CONTROL_TABLE_XH_430,
+        'XM540': control_table.CONTROL_TABLE_XM_540,
         # Add more models as needed
     } 
 
+    # MODEL_NUMBER register value of each model variant, key of CONTROL_TABLES
+    MODEL_NUMBERS = {
+        1190: 'XL330',  # XL330-M077
+        1200: 'XL330',  # XL330-M288
+        1210: 'XC330',  # XC330-T181
+        1220: 'XC330',  # XC330-T288
+        1230: 'XC330',  # XC330-M181
+        1240: 'XC330',  # XC330-M288
+        1000: 'XH430',  # XH430-W350
+        1010: 'XH430',  # XH430-W210
+        1040: 'XH430',  # XH430-V350
+        1050: 'XH430',  # XH430-V210
+        1020: 'XM430',  # XM430-W350
+        1030: 'XM430',  # XM430-W210
+        1120: 'XM540',  # XM540-W270
+        1130: 'XM540',  # XM540-W150
+    }
+
+    # Indirect and register block layouts, per model. A model gets the XC330 layouts only when it shares
+    # the XC330 control table (e.g. XL330); the other models are read and written register by register
+    INDIRECT_MAPS = {model: control_table.INDIRECT_MAP_XC_330 for model, table in CONTROL_TABLES.items()
+                     if table is control_table.CONTROL_TABLE_XC_330}
+    REGISTER_BLOCKS = {model: control_table.REGISTER_BLOCKS_XC_330 for model, table in CONTROL_TABLES.items()
+                       if table is control_table.CONTROL_TABLE_XC_330}
+
+    # Oldest firmware answering Fast Sync Read (one status packet for all servos), per model.
+    # Models left out are read with a regular sync read
+    FAST_SYNC_READ_MIN_FW = {
+        'XC330': 46,
+        'XL330': 46,
+    }
+
+    # BAUD_RATE register value for each supported baud rate
+    BAUD_RATE_CODES = {
+        9600: 0,
+        57600: 1,
+        115200: 2,
+        1000000: 3,
+        2000000: 4,
+        3000000: 5,
+        4000000: 6,
+        4500000: 7,
+    }
+
+    # OPERATING_MODE register value for each operating mode
+    OPERATING_MODES = {
+        'current': 0,
+        'velocity': 1,
+        'position': 3,
+        'extended_pos': 4,
+        'current_pos': 5,
+        'pwm': 16
+    }
+
+    # Retry policy of each command class. Each method declares its class with @retry_class, methods without one
+    # are 'config'; through a BusArbiter the class follows the request's priority instead
+    RETRY_POLICIES = {
+        'motion': RetryPolicy(attempts=3, deadline_ms=10.0),       # a late goal is worse than a dropped one
+        'safety': RetryPolicy(attempts=3, deadline_ms=50.0),
+        'telemetry': RetryPolicy(attempts=1),                      # drop, the next sample follows
+        'config': RetryPolicy(attempts=5, backoff_ms=10.0),
+        'once': RetryPolicy(attempts=1),                           # writes that must not be repeated, e.g. BAUD_RATE
+    }
+
+    # Unicast pings confirming an ID whose answer to the broadcast ping arrived corrupted before calling it shared
+    DUPLICATE_CONFIRM_PINGS = 3
+
+    # Consecutive failures after which a servo is left out of group packets, and for how long (in s)
+    QUARANTINE_AFTER = 3
+    QUARANTINE_S = 2.0
+
+    INST_FAST_SYNC_READ = 0x8A  # not defined by the SDK
+
     SUPPRESS_ERROR_MSG = True # by default don't show error from SDK
     INVALID_INT_VAL = -1
 
-    def __init__(self, port: str, protocol: float = 2.0, baudrate: int = 115200):
+    def __init__(self, port: str, protocol: float = 2.0, baudrate: int = 115200, port_handler: Optional[PortHandler] = None):
         """
         Initializes the DynamixelSDKWrapper.
 
         Args:
-            port (str): The serial port to which the servos are connected.
+            port (str): The serial port to which the servos are connected, or 'sim://<name>' for a simulated bus (see sim_bus).
             protocol (float, optional): The communication protocol version. Defaults to 2.0.
             baudrate (int, optional): The baud rate for communication. Defaults to 57600.
+            port_handler (PortHandler, optional): The port handler to use instead of opening `port`.
         """
         self.port: str = port
         self.protocol: float = protocol
         self.baudrate: int = baudrate
-        self.port_handler: PortHandler = PortHandler(port)
+        if port_handler is None and port.startswith('sim://'):
+            import sim_bus  # imports this module, only needed without hardware
+            port_handler = sim_bus.SimulatedPortHandler(port, sim_bus.get_bus(port, baudrate=baudrate))
+        self.port_handler: PortHandler = PortHandler(port) if port_handler is None else port_handler
         self.packet_handler: PacketHandler = PacketHandler(protocol)
         self.protocol_handler: Protocol2PacketHandler = Protocol2PacketHandler()
         self.groupBulkWrite: GroupBulkWrite = GroupBulkWrite(self.port_handler, self.packet_handler)
         self.groupBulkRead: GroupBulkRead = GroupBulkRead(self.port_handler, self.packet_handler)
         self._groupSyncWrite: GroupSyncWrite = GroupSyncWrite(self.port_handler, self.packet_handler, 0, 0)
         self._groupSyncRead: GroupSyncRead = GroupSyncRead(self.port_handler, self.packet_handler, 0, 0)
+        self._groupBulkWrite: GroupBulkWrite = GroupBulkWrite(self.port_handler, self.packet_handler)
+        self._groupBulkRead: GroupBulkRead = GroupBulkRead(self.port_handler, self.packet_handler)
         self.servos = {}
         self.protocol_version = 2
+        self.shadow_path: Optional[str] = None
+        self._persisted_shadow = {}
+        self.stats: Optional[BusStats] = None  # see enable_stats()
+        self._retry_class: Optional[str] = None  # command class of the call in progress, see retry_as()
+        self.use_fast_sync_read: bool = True  # where the firmware supports it, see FAST_SYNC_READ_MIN_FW
+        self._stats_reporter: Optional[BusStatsReporter] = None
+        self._plans: Dict[tuple, object] = {}  # compiled write and bulk read plans, see _write_plan() and bulk_read()
+        self._register_blocks: Dict[Tuple[str, str], RegisterBlock] = {}  # see _register_block()
 
         # Instantiate logger
         # logging.basicConfig(level=logging.INFO)
@@ -129,6 +321,7 @@ class DynamixelSDKWrapper:
         """Closes the port when the instance is destroyed."""
         self.close_port()
 
+    @retry_class('config')
     def add_servo(self, servos: dict) -> None:
         """
         Adds and configures servos based on the provided dictionary.
@@ -176,12 +369,13 @@ class DynamixelSDKWrapper:
             if success:
                 control_table = self.CONTROL_TABLES[model.upper()] 
                 self.servos[id_] = Servo(id_, model, control_table) 
+                self._plans.clear()
                 # print(self.servos.keys()) 
             # If no reponse, ignore ID
             fw = self.read_FW_version(id_)
             if fw != self.INVALID_INT_VAL and success:
                 self.logger.info(f'- FW Version: {fw}')
-                self.firmware_ver = fw
+                self.servos[id_].firmware_ver = fw
             else: 
                 self.logger.error(f"- Device does not exist")
                 success &= False
@@ -238,6 +432,14 @@ class DynamixelSDKWrapper:
                 success &= False
 
 
+            # --------------- Map indirect blocks ---------------
+            if model.upper() in self.INDIRECT_MAPS and success:
+                if self.configure_indirect(id_, self.INDIRECT_MAPS[model.upper()]):
+                    self.logger.info(f"- Indirect Blocks: {list(self.INDIRECT_MAPS[model.upper()].keys())}")
+                else:
+                    self.logger.error(f"- Set indirect addresses failed")
+                    success &= False
+
             # # --------------- Disable torque ---------------
             # if self.set_torque(id, enable=0) and success:
             #     print(f"- Torque: Off")
@@ -265,6 +467,155 @@ class DynamixelSDKWrapper:
 
         print(f'------------------------------------------------')
 
+    @retry_class('config')
+    def add_servo_batch(self, servos: dict) -> List[int]:
+        """
+        Adds and configures many servos at once. Same result as add_servo, but the configuration
+        registers of all servos are read with sync reads and written with sync writes, so the number
+        of transactions does not grow with the number of servos.
+
+        Args:
+            servos (dict): A dictionary containing servo configurations, same format as add_servo.
+
+        Returns:
+            List[int]: The IDs that were configured successfully.
+        """
+        # Unsuppress error messages
+        self.suppress_error_msg(suppress=False)
+
+        # --------------- Register servos ---------------
+        specs = {}
+        for key in servos.keys():
+            id_, model = servos[key]['id'], servos[key]['model']
+            if self._is_servo_registered(id_) or id_ in specs:
+                self.logger.error(f'- (ID: {id_}) Already exists')
+                continue
+            if model.upper() not in self.CONTROL_TABLES:
+                self.logger.error(f"- (ID: {id_}) Unsupported model ({model.upper()})")
+                continue
+            specs[id_] = servos[key]
+            self.servos[id_] = Servo(id_, model, self.CONTROL_TABLES[model.upper()])
+            self._plans.clear()
+
+        if len(specs) == 0:
+            return []
+
+        # --------------- Read current configuration (FW version .. startup configuration) ---------------
+        config = self._sync_read(['FIRMWARE_VERSION', 'DRIVE_MODE', 'OPERATING_MODE', 'SECONDARY_ID', 'STARTUP_CONFIGURATION'], list(specs.keys()))
+
+        for id_ in list(specs.keys()):
+            if id_ not in config:
+                self.logger.error(f"- (ID: {id_}) Device does not exist")
+                del self.servos[id_]
+                del specs[id_]
+        ids = list(specs.keys())
+        if len(ids) == 0:
+            return []
+
+        # The read above refreshed the shadow, compare it with the one persisted by the last run
+        verified = [id_ for id_ in ids if self._shadow_verified(id_)]
+        if len(verified) > 0:
+            self.logger.info(f"- Shadow verified for {verified}")
+
+        # --------------- Compute new configuration ---------------
+        STARTUP_TORQUE_ON, RAM_RESTORE = 0, 1
+        NORMAL_REVERSE_MODE, PROFILE_CONFIG = 0, 2
+
+        # Servos without an operating mode default to position mode, like in add_servo
+        op_modes = {id_: specs[id_].get('op_mode', 'position') for id_ in ids}
+
+        startup_targets, startup_values, mode_values = {}, {}, {}
+        for id_ in ids:
+            servo = self._get_servo(id_)
+            servo.firmware_ver = config[id_]['FIRMWARE_VERSION']
+
+            startup_config = config[id_]['STARTUP_CONFIGURATION']
+            startup_config = (startup_config | (1 << RAM_RESTORE)) & ~(1 << STARTUP_TORQUE_ON)
+            startup_targets[id_] = startup_config
+            if not self._shadow_matches(id_, 'STARTUP_CONFIGURATION', startup_config):
+                startup_values[id_] = startup_config
+
+            drive_mode = config[id_]['DRIVE_MODE'] | (1 << PROFILE_CONFIG)
+            if 'reverse_mode' in specs[id_].keys():
+                if specs[id_]['reverse_mode']:
+                    drive_mode |= (1 << NORMAL_REVERSE_MODE)
+                else:
+                    drive_mode &= ~(1 << NORMAL_REVERSE_MODE)
+            mode_values[id_] = [drive_mode, self.OPERATING_MODES[op_modes[id_]], 252]
+
+        # Only servos whose EEPROM differs from the requested configuration are written
+        mode_names = ['DRIVE_MODE', 'OPERATING_MODE', 'SECONDARY_ID']
+        mode_writes = {id_: vals for id_, vals in mode_values.items()
+                       if not all(self._shadow_matches(id_, name, val) for name, val in zip(mode_names, vals))}
+        written = sorted(set(startup_values.keys()) | set(mode_writes.keys()))
+
+        # --------------- Write new configuration (EEPROM: torque off first) ---------------
+        if len(written) > 0:
+            self.logger.info(f"- Writing EEPROM of {written}")
+            self.set_torque(written, 0)
+            # Sync writes are not acknowledged: the read back below is what checks them and refreshes the shadow
+            if len(startup_values) > 0:
+                result = self._sync_write_span(['STARTUP_CONFIGURATION'], {id_: [val] for id_, val in startup_values.items()})
+                if result != COMM_SUCCESS:
+                    self.logger.error(f"- Writing STARTUP_CONFIGURATION failed: {self.packet_handler.getTxRxResult(result)}")
+            if len(mode_writes) > 0:
+                result = self._sync_write_span(mode_names, mode_writes)
+                if result != COMM_SUCCESS:
+                    self.logger.error(f"- Writing {mode_names} failed: {self.packet_handler.getTxRxResult(result)}")
+
+        unlimited = set()
+        for id_ in ids:
+            if op_modes[id_] != 'extended_pos':
+                if 'pos_limit' not in specs[id_]:
+                    self.logger.error(f"- (ID: {id_}) No position limits (pos_limit) for {op_modes[id_]} mode")
+                    unlimited.add(id_)
+                    continue
+                min_pos, max_pos = specs[id_]['pos_limit'][0], specs[id_]['pos_limit'][1]
+                if not self.set_pos_limits(id_, min_pos, max_pos):
+                    self.logger.error(f"- (ID: {id_}) Set Position failed: {min_pos} <-> {max_pos}")
+
+        # --------------- Map indirect blocks (one layout per model, one packet) ---------------
+        layouts = {}
+        for id_ in ids:
+            model = self._get_servo(id_).model.upper()
+            if model in self.INDIRECT_MAPS:
+                layouts[id_] = self._indirect_layout(self.CONTROL_TABLES[model], self.INDIRECT_MAPS[model])
+        if len(layouts) > 0:
+            result = self._sync_write('INDIRECT_ADDRESS_1', {id_: address_data for id_, (address_data, _) in layouts.items()})
+            if result == COMM_SUCCESS:
+                for id_, (_, blocks) in layouts.items():
+                    self._apply_indirect(self._get_servo(id_), blocks)
+                self._plans.clear()
+
+        # --------------- Verify written servos and check temperature ---------------
+        verify_names = mode_names + ['STARTUP_CONFIGURATION']
+        verify = self._sync_read(verify_names, written) if len(written) > 0 else {}
+        temperatures = self._sync_read(['PRESENT_TEMPERATURE'], ids)
+
+        configured = []
+        self.logger.info(f'------------------------------------------------')
+        for id_ in ids:
+            servo = self._get_servo(id_)
+            expected = dict(zip(mode_names, mode_values[id_]), STARTUP_CONFIGURATION=startup_targets[id_])
+            readback = verify.get(id_) if id_ in written else {name: servo.shadow.get(name) for name in verify_names}
+            if readback != expected or id_ not in temperatures or id_ in unlimited:
+                self.logger.error(f'ID: {id_} - CONFIGURATION FAILED (read back {readback})')
+                del self.servos[id_]
+                continue
+
+            servo.operating_mode = op_modes[id_]
+            servo.drive_mode = 'time'
+            servo.secondary_id = 252
+            servo.torque_status = False
+            configured.append(id_)
+            self.logger.info(f"ID: {id_} - {servo.model} FW {servo.firmware_ver} - {servo.operating_mode} - "
+                             f"Reverse: {specs[id_].get('reverse_mode', False)} - {temperatures[id_]['PRESENT_TEMPERATURE']} °C - CONFIGURED")
+        self.logger.info(f'------------------------------------------------')
+
+        if self.shadow_path is not None:
+            self.save_shadow(self.shadow_path)
+        return configured
+
     def servo_set_pos_limits(self, id_: int, min_pos: int=0, max_pos: int=4095) -> bool:
         """
         Sets the position limits of the servo.
@@ -293,6 +644,7 @@ class DynamixelSDKWrapper:
         else: 
             return False
 
+    @retry_class('safety')
     def read_current_pos(self, id_) -> int:
         """
         Reads the current position of the servo.
@@ -336,6 +688,7 @@ class DynamixelSDKWrapper:
             return fw_version
         return self.INVALID_INT_VAL 
 
+    @retry_class('safety')
     def read_voltage(self, id_):
         """
         Reads the current input voltage of the servo.
@@ -420,6 +773,7 @@ class DynamixelSDKWrapper:
 
         return False
 
+    @retry_class('safety')
     def read_temperature(self, ids: Union[int, List[int]]) -> Dict[int, int]:
         """
         Reads the current temperature of the servo(s).
@@ -468,6 +822,193 @@ class DynamixelSDKWrapper:
             self.logger.error(f"Port {self.port} Failed to set baudrate to {self.baudrate}")
             quit()
 
+    @retry_class('config')
+    def discover_baudrate(self, ids: List[int], baudrates: Optional[List[int]] = None) -> int:
+        """
+        Finds the baud rate the servos currently use, starting with the current host baud rate.
+        When the servos answer at different rates, e.g. a chain left split by an interrupted migration,
+        the ones at other rates are moved to the rate most of them use.
+        The host is left at the rate most servos answered at (or at its original rate if none did).
+
+        Args:
+            ids (List[int]): The servo IDs that must respond.
+            baudrates (List[int], optional): The rates to try. Defaults to all BAUD_RATE_CODES.
+
+        Returns:
+            int: The baud rate at which every servo responds, or INVALID_INT_VAL.
+        """
+        if baudrates is None:
+            baudrates = list(self.BAUD_RATE_CODES.keys())
+        baudrates = [self.baudrate] + [baud for baud in baudrates if baud != self.baudrate]
+        original = self.baudrate
+
+        # Rate and model number of each servo, until all of them are located
+        located = {}
+        for baud in baudrates:
+            if not self._set_host_baudrate(baud):
+                continue
+            for id_ in ids:
+                if id_ in located:
+                    continue
+                token = self.stats.begin() if self.stats else None
+                model_number, result, error = self.protocol_handler.ping(self.port_handler, id_)
+                if token: self.stats.record('PING', token, result, error, id_)
+                if result == COMM_SUCCESS:
+                    located[id_] = (baud, model_number)
+            if len(located) == len(ids):
+                break
+
+        if len(located) == 0:
+            self._set_host_baudrate(original)
+            return self.INVALID_INT_VAL
+
+        rates = [baud for baud, _ in located.values()]
+        baudrate = max(baudrates, key=rates.count)  # most servos, the earliest tried on a tie
+        stragglers = {id_: entry for id_, entry in located.items() if entry[0] != baudrate}
+        if len(stragglers) > 0:
+            self.logger.warning(f"Port {self.port} Servos at other rates: "
+                                f"{ {id_: baud for id_, (baud, _) in stragglers.items()} }, moving them to {baudrate}")
+            self._gather_baudrate(stragglers, baudrate)
+
+        self._set_host_baudrate(baudrate)
+        missing = self._missing_ids(ids)
+        if len(missing) > 0:
+            self.logger.error(f"Port {self.port} Servos missing at {baudrate}: {missing}")
+            return self.INVALID_INT_VAL
+        self.logger.info(f"Port {self.port} Servos found at {baudrate}")
+        return baudrate
+
+    def _gather_baudrate(self, located: Dict[int, Tuple[int, int]], baudrate: int) -> None:
+        """
+        Moves servos answering at other rates to one baud rate. The servos need not be registered,
+        their control table is chosen from the model number they answered the ping with.
+
+        Args:
+            located (Dict[int, Tuple[int, int]]): {id: (current baud rate, model number)}
+            baudrate (int): The baud rate to move them to.
+        """
+        for current in sorted({baud for baud, _ in located.values()}):
+            if not self._set_host_baudrate(current):
+                continue
+            for id_, (baud, model_number) in located.items():
+                if baud != current:
+                    continue
+                table = self.CONTROL_TABLES.get(self.MODEL_NUMBERS.get(model_number), control_table.CONTROL_TABLE_XC_330)
+                # BAUD_RATE is in the EEPROM area, torque must be off
+                for cmd_name, val in (('TORQUE_ENABLE', 0), ('BAUD_RATE', self.BAUD_RATE_CODES[baudrate])):
+                    with self.retry_as('once' if cmd_name == 'BAUD_RATE' else 'config'):
+                        dxl_comm_result, dxl_error = self._writeTxRx(id_, table[cmd_name], val)
+                    self._check_communication(id_, cmd_name, dxl_comm_result, dxl_error, val=val)
+                    if self._is_servo_registered(id_):
+                        self._shadow_update(id_, cmd_name, val, dxl_comm_result, dxl_error)
+
+    @retry_class('config')
+    def migrate_baudrate(self, target_baudrate: int, ids: Optional[List[int]] = None) -> bool:
+        """
+        Moves the whole servo chain and the host to a new baud rate. The servos are first discovered
+        at their current rate, then BAUD_RATE is written on each of them, the port is reopened at the
+        target rate and every ID is verified. If any servo goes missing, all servos are rolled back.
+
+        Args:
+            target_baudrate (int): The new baud rate, one of BAUD_RATE_CODES (e.g. 1000000, 2000000, 4000000).
+            ids (List[int], optional): The servo IDs to migrate. Defaults to every registered servo.
+
+        Returns:
+            bool: True if every servo responds at the target rate, False otherwise (after rollback).
+        """
+        if ids is None:
+            ids = list(self.servos.keys())
+        ids = [id_ for id_ in ids if self._is_servo_registered(id_)]
+        if len(ids) == 0 or target_baudrate not in self.BAUD_RATE_CODES:
+            self.logger.error(f"Unsupported baudrate {target_baudrate}")
+            return False
+        if self.port_handler.getCFlagBaud(target_baudrate) <= 0:
+            self.logger.error(f"Port {self.port} Host does not support baudrate {target_baudrate}")
+            return False
+
+        # --------------- Discover servos at their current rate ---------------
+        original = self.discover_baudrate(ids)
+        if original == self.INVALID_INT_VAL:
+            self.logger.error(f"Port {self.port} Could not find all servos {ids}")
+            return False
+        if original == target_baudrate:
+            return True
+
+        # --------------- Switch servos (EEPROM: torque must be off) ---------------
+        self.logger.info(f"Port {self.port} Migrating {ids}: {original} -> {target_baudrate}")
+        self.set_torque(ids, 0)
+        self._write_baudrate(ids, self.BAUD_RATE_CODES[target_baudrate])
+
+        # --------------- Verify at the new rate ---------------
+        self._set_host_baudrate(target_baudrate)
+        missing = self._missing_ids(ids)
+        if len(missing) == 0:
+            self.logger.info(f"Port {self.port} Baudrate migrated to {target_baudrate}")
+            return True
+
+        # --------------- Roll back ---------------
+        self.logger.error(f"Port {self.port} Missing after migration: {missing}, rolling back to {original}")
+        migrated = [id_ for id_ in ids if id_ not in missing]
+        self._write_baudrate(migrated, self.BAUD_RATE_CODES[original])
+        self._set_host_baudrate(original)
+        missing = self._missing_ids(ids)
+        if len(missing) > 0:
+            self.logger.error(f"Port {self.port} Rollback incomplete, missing at {original}: {missing}")
+        return False
+
+    def _write_baudrate(self, ids: List[int], baud_code: int) -> None:
+        """
+        Writes the BAUD_RATE register of each servo. The servo switches rate right after answering, so the
+        write is sent once: were its answer lost, a retry at the old rate would go unheard. Whether the
+        servo switched is verified by pinging it at the new rate.
+
+        Args:
+            ids (List[int]): The servo IDs.
+            baud_code (int): The BAUD_RATE register value.
+        """
+        for id_ in ids:
+            cmd = self._get_servo(id_).control_table['BAUD_RATE']
+            with self.retry_as('once'):
+                dxl_comm_result, dxl_error = self._writeTxRx(id_, cmd, baud_code)
+            self._check_communication(id_, 'BAUD_RATE', dxl_comm_result, dxl_error, val=baud_code)
+            self._shadow_update(id_, 'BAUD_RATE', baud_code, dxl_comm_result, dxl_error)
+
+    def _set_host_baudrate(self, baudrate: int) -> bool:
+        """
+        Reopens the serial port at a new baud rate without quitting on failure.
+
+        Args:
+            baudrate (int): The new baud rate.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        if not self.port_handler.setBaudRate(baudrate):
+            self.logger.error(f"Port {self.port} Failed to set baudrate to {baudrate}")
+            return False
+        self.baudrate = baudrate
+        return True
+
+    def _missing_ids(self, ids: List[int]) -> List[int]:
+        """
+        Pings every servo at the current host baud rate.
+
+        Args:
+            ids (List[int]): The servo IDs.
+
+        Returns:
+            List[int]: The IDs that did not respond.
+        """
+        missing = []
+        for id_ in ids:
+            token = self.stats.begin() if self.stats else None
+            _, result, error = self.protocol_handler.ping(self.port_handler, id_)
+            if token: self.stats.record('PING', token, result, error, id_)
+            if result != COMM_SUCCESS:
+                missing.append(id_)
+        return missing
+
+    @retry_class('motion')
     def set_goal_pos(self, id_: int, goal_pos: int = 2047, duration_ms: int = 1000) -> bool:
         """
         Sets the goal position of the servo.
@@ -492,6 +1033,7 @@ class DynamixelSDKWrapper:
         else:
             return False
 
+    @retry_class('motion')
     def set_goal_pos_sync(self, ids: List[int], goal_positions: List[int], durations: List[int]) -> bool:
         """
         Sets the goal positions of multiple servos synchronously.
@@ -502,38 +1044,265 @@ class DynamixelSDKWrapper:
             durations (int or List[int]): The movement durations in milliseconds corresponding to the IDs.
 
         Returns:
-            bool: True if successful, False otherwise.
+            bool: True if every goal was sent, False if any was left out (see send_goal_pos_sync) or the write failed.
         """
-
-        # Check if the data lengths match
-        if len(ids) != len(goal_positions) or len(ids) != len(durations):
+        if len(ids) == 0:
             return False
+        return self.send_goal_pos_sync(ids, goal_positions, durations) == list(ids)
+
+    @retry_class('motion')
+    def send_goal_pos_sync(self, ids: List[int], goal_positions: List[int], durations: List[int]) -> List[int]:
+        """
+        Sets the goal positions of multiple servos synchronously, leaving out the goals that cannot be sent:
+        servos not registered (e.g. missing at startup) or in quarantine, and goals outside the position limits.
 
-        pos_to_send = {}
-        duration_to_send = {}
+        Args:
+            ids (List[int]): The servo IDs.
+            goal_positions (List[int]): The desired positions corresponding to the IDs.
+            durations (List[int]): The movement durations in milliseconds corresponding to the IDs.
 
-        for i in range(len(ids)):
-            id_, pos, duration = ids[i], goal_positions[i], durations[i]
+        Returns:
+            List[int]: The IDs whose goal was written, in ids order; empty if the write failed.
+        """
 
-            # if not self._is_servo_registered(id_):
-            #     return False
-            servo = self._get_servo(id_)
+        # Check if the data lengths match
+        if len(ids) != len(goal_positions) or len(ids) != len(durations):
+            return []
+
+        # Servos not registered (e.g. missing at startup) or in quarantine are left out
+        registered = [id_ for id_ in ids if self._is_servo_registered(id_)]
+        skipped = set(ids) - set(self._available_ids(registered))
+        if len(skipped) > 0:
+            self.logger.debug(f"Goal not sent to unregistered or quarantined servos {sorted(skipped)}")
+
+        goal_positions = np.asarray(goal_positions)
+        durations = np.asarray(durations)
+        if len(registered) < len(ids):
+            known = np.array([self._is_servo_registered(id_) for id_ in ids], dtype=bool)
+            ids, goal_positions, durations = registered, goal_positions[known], durations[known]
+        if len(ids) == 0:
+            return []
 
-            if servo.position_limits['min'] <= pos <= servo.position_limits['max']:
-                # self.set_profile_time(id_, duration)
-                pos_to_send[id_] = self._convert_to_bytes(pos, servo.control_table['GOAL_POSITION']['LEN'])
-            duration_to_send[id_] = self._convert_to_bytes(duration, servo.control_table['PROFILE_VELOCITY']['LEN'])
+        # Goals outside the position limits are not sent
+        limits = np.array([(self._get_servo(id_).position_limits['min'], self._get_servo(id_).position_limits['max'])
+                           for id_ in ids]).reshape(-1, 2)
+        in_limits = (limits[:, 0] <= goal_positions) & (goal_positions <= limits[:, 1])
+        goal_ids = list(ids) if in_limits.all() else [id_ for id_, ok in zip(ids, in_limits) if ok]
+        if len(goal_ids) < len(ids):
+            self.logger.debug(f"Goal outside the position limits not sent to {sorted(set(ids) - set(goal_ids))}")
+
+        # Profile time and goal position in one packet when every servo has the indirect motion block
+        if all('INDIRECT_MOTION' in self._get_servo(id_).indirect for id_ in ids):
+            success = self._set_goal_pos_indirect(goal_ids, goal_positions[in_limits], durations[in_limits])
+            return goal_ids if success else []
 
         # Sync write duration and goal positions
-        result_1 = self._sync_write('PROFILE_VELOCITY', duration_to_send)
-        result_2 = self._sync_write('GOAL_POSITION', pos_to_send)
+        result_1 = self._sync_write_plan(['PROFILE_VELOCITY'], ids, [durations])
+        result_2 = self._sync_write_plan(['GOAL_POSITION'], goal_ids, [goal_positions[in_limits]])
 
         if self._check_communication(id=255, cmd='PROFILE_VELOCITY', dxl_comm_result=result_1) and \
                 self._check_communication(id=255, cmd='GOAL_POSITION', dxl_comm_result=result_2):
-            return True
+            return goal_ids
         else:
+            return []
+
+    @retry_class('safety')
+    def read_states_sync(self, ids: Optional[List[int]] = None,
+                         cmd_names: List[str] = ('PRESENT_POSITION', 'PRESENT_VELOCITY', 'PRESENT_CURRENT')) -> Dict[int, Dict[str, int]]:
+        """
+        Reads several registers of multiple servos in one sync read transaction.
+
+        Args:
+            ids (List[int], optional): The servo IDs. Defaults to every registered servo.
+            cmd_names (List[str], optional): The registers to read. Defaults to present position, velocity and current.
+
+        Returns:
+            Dict[int, Dict[str, int]]: {id: {register: value}} for every servo that responded.
+        """
+        if ids is None:
+            ids = list(self.servos.keys())
+        ids = [id_ for id_ in ids if self._is_servo_registered(id_)]
+        if len(ids) == 0:
+            return {}
+
+        return self._sync_read(list(cmd_names), ids)
+
+    @retry_class('telemetry')
+    def read_realtime_tick(self, ids: Optional[List[int]] = None) -> Tuple[float, float, Dict[int, int]]:
+        """
+        Reads the REALTIME_TICK of multiple servos with one sync read, timed on the host for clock_sync.ClockSync.
+
+        Args:
+            ids (List[int], optional): The servo IDs. Defaults to every registered servo.
+
+        Returns:
+            Tuple[float, float, Dict[int, int]]: (host time at which the servos latched their tick (time.monotonic()),
+                round trip of the read (in s), {id: tick (in ms, wraps at 32768)}) for every servo that responded.
+        """
+        if ids is None:
+            ids = list(self.servos.keys())
+        ids = [id_ for id_ in ids if self._is_servo_registered(id_)]
+        start = time.monotonic()
+        data = self._sync_read(['REALTIME_TICK'], ids) if len(ids) > 0 else {}
+        round_trip = time.monotonic() - start
+        # The servos latch their tick on receiving the instruction packet, 14 bytes + 1 per ID of 10 bits each
+        latched = start + (14 + len(ids)) * 10.0 / self.baudrate
+        return latched, round_trip, {id_: values['REALTIME_TICK'] for id_, values in data.items()}
+
+    @retry_class('safety')
+    def read_block(self, ids: Union[int, List[int], None] = None, block: str = 'STATE') -> Dict[int, NamedTuple]:
+        """
+        Reads a contiguous register block (see REGISTER_BLOCKS) of multiple servos with one sync read
+        (a bulk read when their models place the block differently), each answer decoded at once into a typed record.
+
+        Args:
+            ids (int or List[int], optional): The servo ID or a list of IDs. Defaults to every registered servo.
+            block (str, optional): The register block. Defaults to 'STATE' (PRESENT_PWM .. PRESENT_TEMPERATURE).
+
+        Returns:
+            Dict[int, NamedTuple]: {id: record} for every servo with that block that responded, ServoState records for the 'STATE' block.
+        """
+        if ids is None:
+            ids = list(self.servos.keys())
+        elif isinstance(ids, int):
+            ids = [ids]
+        ids = [id_ for id_ in ids if self._is_servo_registered(id_)
+               and block in self.REGISTER_BLOCKS.get(self._get_servo(id_).model.upper(), {})]
+
+        layouts = {id_: self._register_block(self._get_servo(id_).model, block) for id_ in self._available_ids(ids)}
+        raws = self._read_spans({id_: (layout.start, layout.length) for id_, layout in layouts.items()}, block)
+        return {id_: layouts[id_].decode(raw) for id_, raw in raws.items()}
+
+    def _register_block(self, model: str, block: str) -> RegisterBlock:
+        """
+        Returns the layout of a register block of a model, compiled on first use.
+
+        Args:
+            model (str): The servo model.
+            block (str): The block name, key of REGISTER_BLOCKS[model].
+
+        Returns:
+            RegisterBlock: The block layout.
+        """
+        key = (model.upper(), block)
+        if key not in self._register_blocks:
+            first, last = self.REGISTER_BLOCKS[key[0]][block]
+            self._register_blocks[key] = RegisterBlock(block, self.CONTROL_TABLES[key[0]], first, last, RECORDS.get(block))
+        return self._register_blocks[key]
+
+    def _set_goal_pos_indirect(self, ids: List[int], goal_positions: np.ndarray, durations: np.ndarray) -> bool:
+        """
+        Sets profile time and goal position of multiple servos with a single sync write to the INDIRECT_MOTION block.
+
+        Args:
+            ids (List[int]): The servo IDs, goals within their position limits.
+            goal_positions (np.ndarray): The desired positions corresponding to the IDs.
+            durations (np.ndarray): The movement durations in milliseconds corresponding to the IDs.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        if len(ids) == 0:
             return False
 
+        result = self._sync_write_plan(['PROFILE_VELOCITY', 'GOAL_POSITION'], ids, [durations, goal_positions],
+                                       block='INDIRECT_MOTION')
+        return self._check_communication(id=255, cmd='INDIRECT_MOTION', dxl_comm_result=result)
+
+    @retry_class('safety')
+    def read_indirect_sync(self, block: str = 'INDIRECT_STATE', ids: Optional[List[int]] = None) -> Dict[int, Dict[str, int]]:
+        """
+        Reads an indirect data block of multiple servos in one sync read transaction.
+
+        Args:
+            block (str, optional): The indirect block to read. Defaults to 'INDIRECT_STATE'.
+            ids (List[int], optional): The servo IDs. Defaults to every registered servo with that block.
+
+        Returns:
+            Dict[int, Dict[str, int]]: {id: {register: value}} for every servo that responded.
+        """
+        if ids is None:
+            ids = list(self.servos.keys())
+        ids = [id_ for id_ in ids if self._is_servo_registered(id_) and block in self._get_servo(id_).indirect]
+        if len(ids) == 0:
+            return {}
+
+        cmd_names = list(self._get_servo(ids[0]).indirect[block].keys())
+        return self._sync_read(cmd_names, ids, block=block)
+
+    def configure_indirect(self, id_: int, indirect_map: dict) -> bool:
+        """
+        Points the indirect address registers of the servo at the registers of each block, packed back to back
+        from INDIRECT_DATA_1, so each block can be accessed as one contiguous range.
+
+        Args:
+            id_ (int): The servo ID.
+            indirect_map (dict): {block: [register, ...]}, see control_table.INDIRECT_MAP_XC_330.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        if not self._is_servo_registered(id_):
+            return False
+        servo = self._get_servo(id_)
+
+        # All indirect addresses are written with a single packet
+        address_cmd = servo.control_table['INDIRECT_ADDRESS_1']
+        data, blocks = self._indirect_layout(servo.control_table, indirect_map)
+        dxl_comm_result, dxl_error = self._transact('WRITE', id_, self.protocol_handler.writeTxRx,
+                                                    self.port_handler, id_, address_cmd['ADDR'], len(data), data)
+        if not self._check_communication(id_, 'INDIRECT_ADDRESS', dxl_comm_result, dxl_error, val=list(blocks.keys())):
+            return False
+
+        self._apply_indirect(servo, blocks)
+        self._plans.clear()
+        return True
+
+    def _indirect_layout(self, table: dict, indirect_map: dict):
+        """
+        Computes the indirect address register contents for an indirect map.
+
+        Args:
+            table (dict): The control table of the servo model.
+            indirect_map (dict): {block: [register, ...]}.
+
+        Returns:
+            Tuple[List[int], dict]: (bytes to write from INDIRECT_ADDRESS_1, {block: {register: {'ADDR', 'LEN'}, '_SPAN': {'ADDR', 'LEN'}}}).
+        """
+        address_len = table['INDIRECT_ADDRESS_1']['LEN']
+        data_addr = table['INDIRECT_DATA_1']['ADDR']
+
+        addresses = []
+        blocks = {}
+        for block, cmd_names in indirect_map.items():
+            blocks[block] = {}
+            start = data_addr + len(addresses)
+            for cmd_name in cmd_names:
+                cmd = table[cmd_name]
+                blocks[block][cmd_name] = {'ADDR': data_addr + len(addresses), 'LEN': cmd['LEN']}
+                addresses += [cmd['ADDR'] + i for i in range(cmd['LEN'])]
+            blocks[block]['_SPAN'] = {'ADDR': start, 'LEN': data_addr + len(addresses) - start}
+
+        data = []
+        for addr in addresses:
+            data += self._convert_to_bytes(addr, address_len)
+        return data, blocks
+
+    @staticmethod
+    def _apply_indirect(servo: Servo, blocks: dict) -> None:
+        """
+        Makes indirect blocks regular entries of the servo's own control table.
+
+        Args:
+            servo (Servo): The servo.
+            blocks (dict): The blocks returned by _indirect_layout.
+        """
+        servo.control_table = dict(servo.control_table)
+        for block in blocks:
+            fields = dict(blocks[block])
+            servo.control_table[block] = fields.pop('_SPAN')
+            servo.indirect[block] = fields
+
     def set_operating_mode(self, ids: Union[int, List[int]], op_mode: str = 'position') -> bool:
         """
         Sets the operating mode of the servo(s).
@@ -545,16 +1314,9 @@ class DynamixelSDKWrapper:
         Returns:
             bool: True if successful, False otherwise.
         """
-        mode_mapping = {
-            'current': 0,
-            'velocity': 1,
-            'position': 3,
-            'extended_pos': 4,
-            'current_pos': 5,
-            'pwm': 16
-        }
-        op_mode_value = mode_mapping.get(op_mode)
+        op_mode_value = self.OPERATING_MODES.get(op_mode)
 
+        success = True
         if isinstance(ids, int):
             ids = [ids]
 
@@ -563,15 +1325,20 @@ class DynamixelSDKWrapper:
                 continue
 
             servo = self._get_servo(id_)
+            if self._shadow_matches(id_, 'OPERATING_MODE', op_mode_value):
+                servo.operating_mode = op_mode
+                continue
             dxl_comm_result, dxl_error = self._writeTxRx(id_, servo.control_table['OPERATING_MODE'], op_mode_value)
 
             if self._check_communication(id_, 'OPERATING_MODE', dxl_comm_result, dxl_error, val=op_mode_value):
                 servo.operating_mode = op_mode
+            else:
+                success = False
+            self._shadow_update(id_, 'OPERATING_MODE', op_mode_value, dxl_comm_result, dxl_error)
 
-            servo.operating_mode = op_mode
-
-        return True
+        return success
     
+    @retry_class('motion')
     def set_profile_time(self, id_: int, duration_ms: int = 1000) -> bool:
         """
         Sets the profile time of the servo.
@@ -594,6 +1361,7 @@ class DynamixelSDKWrapper:
         else:
             return False
 
+    @retry_class('safety')
     def set_torque(self, ids: Union[int, List[int]], enable: int = 0) -> bool:
         """
         Enables or disables the torque of the servo(s).
@@ -623,8 +1391,10 @@ class DynamixelSDKWrapper:
             # Construct dict to send
             data[id_] = self._convert_to_bytes(enable, data_len)
 
-        # Sync write data
+        # Sync write data. Always sent: torque may have been dropped by a hardware error since the shadow was
+        # updated, and the sync write is not acknowledged, so the shadow only learns the state from a readback
         result = self._sync_write('TORQUE_ENABLE', data)
+        self.invalidate_shadow(list(data.keys()), ['TORQUE_ENABLE'])
 
         if self._check_communication(id=255, cmd='TORQUE_ENABLE', dxl_comm_result=result, val=enable):
             success &= True
@@ -743,9 +1513,12 @@ class DynamixelSDKWrapper:
             if not self._is_servo_registered(id_): # Check if servo(id) exis
                 continue
             servo = self._get_servo(id_)
+            if self._shadow_matches(id_, 'SECONDARY_ID', secondary_id):
+                continue
             
             dxl_comm_result, dxl_error = self._writeTxRx(id_, servo.control_table['SECONDARY_ID'], secondary_id)
             success &= self._check_communication(id_, 'SECONDARY_ID', dxl_comm_result, dxl_error, val=secondary_id)
+            self._shadow_update(id_, 'SECONDARY_ID', secondary_id, dxl_comm_result, dxl_error)
         return success
 
     def close_port(self):
@@ -777,6 +1550,7 @@ class DynamixelSDKWrapper:
         """
         self.SUPPRESS_ERROR_MSG = suppress
     
+    @retry_class('safety')
     def ping(self, id_):
         """
         Pings the servo to check its existence.
@@ -787,12 +1561,153 @@ class DynamixelSDKWrapper:
         Returns:
             int: The model number if successful, INVALID_INT_VAL otherwise.
         """
-        model_number, result, error = self.protocol_handler.ping(self.port, id_)
+        model_number, result, error = self._transact('PING', id_, self.protocol_handler.ping, self.port_handler, id_)
         if self._check_communication(id_, 'PING', result, error, val=model_number):
             return model_number
         else:
             return self.INVALID_INT_VAL
 
+    @retry_class('config')
+    def discover(self, max_id: int = MAX_ID) -> Dict[int, dict]:
+        """
+        Enumerates the servos on the bus with one broadcast ping: every servo answers with its model number
+        and firmware version, one after another in ID order. Unlike the SDK's broadcastPing, IDs answered
+        by several servos are reported: their packets collide, and a corrupted packet is attributed to the ID
+        it carries when that ID fits the answer order. Since line noise corrupts packets too, such an ID is
+        pinged again alone and only reported as shared if its answers keep arriving corrupted. Identical
+        servos answering in perfect sync cannot be told apart.
+
+        Args:
+            max_id (int, optional): The highest ID answering, a lower value shortens the wait. Defaults to MAX_ID (252).
+
+        Returns:
+            Dict[int, dict]: {id: {'model_number', 'model', 'firmware_ver', 'count'}}, 'model' being None
+                for unsupported model numbers and 'count' above 1 for IDs shared by several servos (at least 2
+                for a collision, whose model number and firmware are None unless another answer was intact).
+        """
+        STATUS_LENGTH = 14  # header, reserved, id, length, instruction, error, model number, firmware, crc
+
+        token = self.stats.begin() if self.stats else None
+        txpacket = [0] * 10
+        txpacket[PKT_ID] = BROADCAST_ID
+        txpacket[PKT_LENGTH_L] = 3
+        txpacket[PKT_LENGTH_H] = 0
+        txpacket[PKT_INSTRUCTION] = INST_PING
+        result = self.protocol_handler.txPacket(self.port_handler, txpacket)
+        if result != COMM_SUCCESS:
+            self.port_handler.is_using = False
+            if token: self.stats.record('BROADCAST_PING', token, result)
+            self._check_communication(id=BROADCAST_ID, cmd='BROADCAST_PING', dxl_comm_result=result)
+            return {}
+
+        # Same answer window as the SDK: the status packets on the wire plus 3 ms per ID
+        wait_length = STATUS_LENGTH * max_id
+        self.port_handler.setPacketTimeoutMillis(wait_length * self.port_handler.tx_time_per_byte + 3.0 * max_id + 16.0)
+        rxpacket = []
+        while not self.port_handler.isPacketTimeout():
+            rxpacket.extend(self.port_handler.readPort(wait_length - len(rxpacket)))
+        self.port_handler.is_using = False
+
+        found, corrupt = {}, 0
+        data, idx, last_id = bytes(rxpacket), 0, -1
+        while True:
+            idx = data.find(b'\xff\xff\xfd', idx)
+            if idx < 0 or len(data) - idx < STATUS_LENGTH:
+                break
+            packet = data[idx:idx + STATUS_LENGTH]
+            crc = DXL_MAKEWORD(packet[STATUS_LENGTH - 2], packet[STATUS_LENGTH - 1])
+            if self.protocol_handler.updateCRC(0, packet, STATUS_LENGTH - 2) != crc or packet[PKT_INSTRUCTION] != 0x55:
+                # Servos sharing an ID answer at the same time, their packets collide. The servos send the
+                # same header and ID, so an ID past the last one answered identifies the slot
+                id_ = packet[PKT_ID]
+                if last_id < id_ <= max_id and id_ not in found:
+                    found[id_] = {'model_number': None, 'model': None, 'firmware_ver': None, 'count': 2}
+                    last_id = id_
+                    idx += STATUS_LENGTH
+                else:
+                    corrupt += 1
+                    idx += 3
+                continue
+            model_number = DXL_MAKEWORD(packet[PKT_PARAMETER0 + 1], packet[PKT_PARAMETER0 + 2])
+            entry = found.setdefault(packet[PKT_ID], {'model_number': None, 'model': None, 'firmware_ver': None, 'count': 0})
+            if entry['model_number'] is None:
+                entry.update(model_number=model_number, model=self.MODEL_NUMBERS.get(model_number),
+                             firmware_ver=packet[PKT_PARAMETER0 + 3])
+            entry['count'] += 1
+            last_id = max(last_id, packet[PKT_ID])
+            idx += STATUS_LENGTH
+
+        result = COMM_SUCCESS if len(found) > 0 else (COMM_RX_CORRUPT if corrupt > 0 else COMM_RX_TIMEOUT)
+        if token: self.stats.record('BROADCAST_PING', token, result, 0, list(found.keys()))
+
+        # A collision garbles every answer of the ID, noise only the odd packet: ping the suspects alone
+        for id_ in [id_ for id_, entry in found.items() if entry['model_number'] is None]:
+            txpacket = [0] * 10
+            txpacket[PKT_ID] = id_
+            txpacket[PKT_LENGTH_L] = 3
+            txpacket[PKT_LENGTH_H] = 0
+            txpacket[PKT_INSTRUCTION] = INST_PING
+            results = []
+            with self.retry_as('once'):
+                for _ in range(self.DUPLICATE_CONFIRM_PINGS):
+                    packet, result, _ = self._transact('PING', id_, self.protocol_handler.txRxPacket, self.port_handler, txpacket)
+                    results.append(result)
+                    if result == COMM_SUCCESS:
+                        break
+            if results[-1] == COMM_SUCCESS:
+                model_number = DXL_MAKEWORD(packet[PKT_PARAMETER0 + 1], packet[PKT_PARAMETER0 + 2])
+                found[id_] = {'model_number': model_number, 'model': self.MODEL_NUMBERS.get(model_number),
+                              'firmware_ver': packet[PKT_PARAMETER0 + 3], 'count': 1}
+                self.logger.debug(f"- Servo {id_} answered intact alone, its corrupted answer to the broadcast ping was noise")
+            elif COMM_RX_CORRUPT not in results:
+                self.logger.warning(f"- No answer from servo {id_} pinged alone, its corrupted answer to the broadcast ping is ignored")
+                del found[id_]
+        if corrupt > 0:
+            self.logger.warning(f"- {corrupt} corrupted answer(s) to the broadcast ping, two servos may share an ID")
+        self.logger.info(f"- Found {len(found)} servo(s): {sorted(found.keys())}")
+        return found
+
+    @retry_class('config')
+    def check_inventory(self, servos: dict, found: Optional[Dict[int, dict]] = None) -> Dict[str, List[int]]:
+        """
+        Cross-checks the servos on the bus against the expected ones and logs every difference,
+        so the configuration can leave out servos that would only time out.
+
+        Args:
+            servos (dict): The expected servos, same format as add_servo ({name: {'id', 'model', ...}}).
+            found (Dict[int, dict], optional): The result of discover(). Defaults to a new discovery up to the
+                highest expected ID, so unexpected servos above it are not reported.
+
+        Returns:
+            Dict[str, List[int]]: {'missing': [...], 'unexpected': [...], 'duplicate': [...], 'wrong_model': [...]},
+                'duplicate' holding the IDs shared by several servos on the bus or by several expected servos.
+        """
+        expected = {}
+        for name, servo in servos.items():
+            expected.setdefault(servo['id'], []).append((name, servo['model'].upper()))
+
+        if found is None:
+            found = self.discover(max(expected.keys()) if len(expected) > 0 else MAX_ID)
+
+        inventory = {'missing': [], 'unexpected': [], 'duplicate': [], 'wrong_model': []}
+        for id_, entries in sorted(expected.items()):
+            if len(entries) > 1:
+                self.logger.error(f"- (ID: {id_}) Assigned to several servos: {[name for name, _ in entries]}")
+                inventory['duplicate'].append(id_)
+            elif id_ not in found:
+                self.logger.error(f"- (ID: {id_}) Missing ({entries[0][0]})")
+                inventory['missing'].append(id_)
+            elif found[id_]['count'] > 1:
+                self.logger.error(f"- (ID: {id_}) Answered by {found[id_]['count']} servos")
+                inventory['duplicate'].append(id_)
+            elif found[id_]['model'] != entries[0][1]:
+                self.logger.error(f"- (ID: {id_}) Expected {entries[0][1]}, found model number {found[id_]['model_number']}")
+                inventory['wrong_model'].append(id_)
+        for id_ in sorted(set(found.keys()) - set(expected.keys())):
+            self.logger.warning(f"- (ID: {id_}) Unexpected servo, model number {found[id_]['model_number']}")
+            inventory['unexpected'].append(id_)
+        return inventory
+
     def _check_communication(self, id, cmd, dxl_comm_result, dxl_error=0, val=None):
         """
         Checks the communication result and handles errors.
@@ -805,15 +1720,70 @@ class DynamixelSDKWrapper:
             val (Optional[Union[int, str]], optional): The value associated with the command. Defaults to None.
 
         Returns:
-            bool: True if communication was successful, False otherwise.
+            bool: True if communication was successful, False otherwise. The hardware alert bit alone is not a failure.
         """
+        success = dxl_comm_result == COMM_SUCCESS and (dxl_error & ~ERRBIT_ALERT) == 0
         if dxl_comm_result != COMM_SUCCESS or dxl_error != 0:
             error_msg = f'[ERROR] ID: {id} CMD: {cmd} VAL: {val}\n'
             error_msg += f'{self.packet_handler.getTxRxResult(dxl_comm_result)}\n'
             error_msg += f'{self.packet_handler.getRxPacketError(dxl_error)}'
             if not self.SUPPRESS_ERROR_MSG:
                 self.logger.error(error_msg)
-        return True
+        if self._is_servo_registered(id):
+            self._update_health(id, success)
+            # A hardware error may have turned torque off: the RAM shadow no longer reflects the servo
+            if dxl_error & ERRBIT_ALERT:
+                self.invalidate_shadow(id, list(control_table.RAM_SHADOW_REGISTERS))
+        return success
+
+    def _update_health(self, id_: int, success: bool) -> None:
+        """
+        Counts the failures of a servo and quarantines it after QUARANTINE_AFTER consecutive ones.
+        Once the quarantine expires the servo is tried again; one more failure quarantines it again.
+
+        Args:
+            id_ (int): The servo ID.
+            success (bool): The outcome of the transaction.
+        """
+        servo = self._get_servo(id_)
+        if success:
+            if servo.quarantined_until > 0:
+                self.logger.info(f"- (ID: {id_}) Responding again, back in group packets")
+            servo.failures = 0
+            servo.quarantined_until = 0.0
+            return
+
+        servo.failures += 1
+        servo.total_failures += 1
+        if servo.failures >= self.QUARANTINE_AFTER:
+            if servo.quarantined_until <= time.monotonic():
+                self.logger.warning(f"- (ID: {id_}) {servo.failures} failures in a row, left out of group packets for {self.QUARANTINE_S} s")
+            servo.quarantined_until = time.monotonic() + self.QUARANTINE_S
+
+    def _available_ids(self, ids) -> List[int]:
+        """
+        Filters out the servos in quarantine.
+
+        Args:
+            ids (Iterable[int]): The servo IDs.
+
+        Returns:
+            List[int]: The IDs that may be addressed by group packets.
+        """
+        now = time.monotonic()
+        return [id_ for id_ in ids if self._get_servo(id_).quarantined_until <= now]
+
+    def servo_health(self) -> Dict[int, dict]:
+        """
+        Returns the failure statistics of every servo.
+
+        Returns:
+            Dict[int, dict]: {id: {'failures', 'total_failures', 'quarantined'}}
+        """
+        now = time.monotonic()
+        return {id_: {'failures': servo.failures, 'total_failures': servo.total_failures,
+                      'quarantined': servo.quarantined_until > now}
+                for id_, servo in self.servos.items()}
 
     def _set_drive_mode(self, id: int=1, mode: str="profile", val: bool=False) -> bool:
         """
@@ -847,17 +1817,150 @@ class DynamixelSDKWrapper:
         else:
             return False
          
-        current_mode, dxl_comm_result, dxl_error = self._readTxRx(id, servo.control_table['DRIVE_MODE'])
+        current_mode = self._shadow_read(id, 'DRIVE_MODE')
+        if current_mode is None:
+            return False
         # new_mode = current_mode & ~(1 << bit_pos) if val else current_mode | (1 << bit_pos) # Set bit pos
         if val:
             new_mode = current_mode | (1 << bit_pos)
         else:
             new_mode = current_mode & ~(1 << bit_pos)
+
+        # Skip the EEPROM write if nothing changes
+        if new_mode == current_mode:
+            return True
             
         dxl_comm_result, dxl_error = self._writeTxRx(id, servo.control_table['DRIVE_MODE'], new_mode)
+        self._shadow_update(id, 'DRIVE_MODE', new_mode, dxl_comm_result, dxl_error)
         self.logger.info(f"{new_mode}")
         return self._check_communication(id, 'DRIVE_MODE', dxl_comm_result, dxl_error, current_mode) 
    
+    def load_shadow(self, file_path: str) -> None:
+        """
+        Loads a register shadow saved by a previous run. Entries are only trusted once a sync read
+        of the same servo returns the same firmware version and register values (see add_servo_batch).
+        The file is also used to save the shadow after configuration.
+
+        Args:
+            file_path (str): Path of the JSON shadow file.
+        """
+        self.shadow_path = file_path
+        try:
+            with open(file_path, 'r') as json_file:
+                self._persisted_shadow = {int(id_): entry for id_, entry in json.load(json_file).items()}
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._persisted_shadow = {}
+
+    def save_shadow(self, file_path: str) -> None:
+        """
+        Saves the EEPROM part of the register shadow, keyed by servo ID and firmware version.
+
+        Args:
+            file_path (str): Path of the JSON shadow file.
+        """
+        data = {
+            str(id_): {
+                'model': servo.model,
+                'firmware': servo.firmware_ver,
+                'registers': {name: val for name, val in servo.shadow.items() if name not in control_table.RAM_SHADOW_REGISTERS},
+            } for id_, servo in self.servos.items()
+        }
+        with open(file_path, 'w') as json_file:
+            json.dump(data, json_file, indent=4)
+        self._persisted_shadow = {int(id_): entry for id_, entry in data.items()}
+
+    def invalidate_shadow(self, ids: Union[int, List[int], None] = None, cmd_names: Optional[List[str]] = None) -> None:
+        """
+        Forgets shadowed register values, e.g. after a hardware error turned torque off.
+
+        Args:
+            ids (int or List[int], optional): The servo ID or a list of IDs. Defaults to every servo.
+            cmd_names (List[str], optional): The registers to forget. Defaults to all.
+        """
+        if ids is None:
+            ids = list(self.servos.keys())
+        if isinstance(ids, int):
+            ids = [ids]
+        for id_ in ids:
+            if not self._is_servo_registered(id_):
+                continue
+            servo = self._get_servo(id_)
+            if cmd_names is None:
+                servo.shadow.clear()
+            else:
+                for cmd_name in cmd_names:
+                    servo.shadow.pop(cmd_name, None)
+
+    def _shadow_verified(self, id_: int) -> bool:
+        """
+        Checks the freshly read shadow of a servo against the persisted one.
+
+        Args:
+            id_ (int): The servo ID.
+
+        Returns:
+            bool: True if the persisted entry has the same firmware and register values.
+        """
+        entry = self._persisted_shadow.get(id_)
+        servo = self._get_servo(id_)
+        if entry is None or entry['firmware'] != servo.shadow.get('FIRMWARE_VERSION'):
+            return False
+        return all(servo.shadow.get(name) == val for name, val in entry['registers'].items() if name in servo.shadow)
+
+    def _shadow_matches(self, id_: int, cmd_name: str, val: int) -> bool:
+        """
+        Checks whether the shadow already holds the value, i.e. the write can be skipped.
+
+        Args:
+            id_ (int): The servo ID.
+            cmd_name (str): The register name.
+            val (int): The value to write.
+
+        Returns:
+            bool: True if the register is known to hold val.
+        """
+        return self._get_servo(id_).shadow.get(cmd_name) == val
+
+    def _shadow_read(self, id_: int, cmd_name: str) -> Optional[int]:
+        """
+        Returns a register value from the shadow, reading it from the servo on a miss.
+
+        Args:
+            id_ (int): The servo ID.
+            cmd_name (str): The register name.
+
+        Returns:
+            int: The register value, or None if it could not be read.
+        """
+        servo = self._get_servo(id_)
+        if cmd_name in servo.shadow:
+            return servo.shadow[cmd_name]
+
+        val, dxl_comm_result, dxl_error = self._readTxRx(id_, servo.control_table[cmd_name])
+        if dxl_comm_result != COMM_SUCCESS or dxl_error != 0:
+            self._check_communication(id_, cmd_name, dxl_comm_result, dxl_error, val=val)
+            return None
+        if cmd_name in control_table.SHADOW_REGISTERS:
+            servo.shadow[cmd_name] = val
+        return val
+
+    def _shadow_update(self, id_: int, cmd_name: str, val: int, dxl_comm_result: int, dxl_error: int = 0) -> None:
+        """
+        Records a written value in the shadow if the write succeeded, forgets the register otherwise.
+
+        Args:
+            id_ (int): The servo ID.
+            cmd_name (str): The register name.
+            val (int): The written value.
+            dxl_comm_result (int): The communication result code.
+            dxl_error (int, optional): The error code from the servo. Defaults to 0.
+        """
+        servo = self._get_servo(id_)
+        if dxl_comm_result == COMM_SUCCESS and dxl_error == 0:
+            servo.shadow[cmd_name] = val
+        else:
+            servo.shadow.pop(cmd_name, None)
+
     def _get_servo(self, id):
         """
         Retrieves the Servo instance for the given ID.
@@ -886,6 +1989,33 @@ class DynamixelSDKWrapper:
         """
         return id_ in self.servos.keys()
 
+    def enable_stats(self, log_interval: Optional[float] = None) -> BusStats:
+        """
+        Starts counting transactions, bytes, latencies and errors of the bus (see bus_stats).
+
+        Args:
+            log_interval (float, optional): Log a summary every log_interval seconds. Defaults to no logging.
+
+        Returns:
+            BusStats: The counters, also available as self.stats.
+        """
+        if self.stats is None:
+            self.stats = BusStats()
+            self.stats.attach(self.port_handler)
+        if log_interval is not None and self._stats_reporter is None:
+            self._stats_reporter = BusStatsReporter(self.stats, log_interval, name=self.port)
+            self._stats_reporter.start()
+        return self.stats
+
+    def disable_stats(self) -> None:
+        """Stops counting and logging, the transactions are no longer timed."""
+        if self._stats_reporter is not None:
+            self._stats_reporter.stop()
+            self._stats_reporter = None
+        if self.stats is not None:
+            self.stats.detach()
+            self.stats = None
+
     # Simplified packet handler for: Read Rx
     def _readRx(self, id_, cmd: dict):
         if cmd['LEN'] == 1:     data_read, result, error = self.protocol_handler.read1ByteRx(self.port_handler, id_)
@@ -900,24 +2030,69 @@ class DynamixelSDKWrapper:
 
     # Simplified packet handler for: Read TX/RX
     def _readTxRx(self, id_, cmd: dict):
-        if cmd['LEN'] == 1:     data_read, result, error = self.protocol_handler.read1ByteTxRx(self.port_handler, id_, cmd['ADDR'])
-        elif cmd['LEN'] == 2:   data_read, result, error = self.protocol_handler.read2ByteTxRx(self.port_handler, id_, cmd['ADDR'])
-        else: data_read, result, error = self.protocol_handler.read4ByteTxRx(self.port_handler, id_, cmd['ADDR'])
-        return data_read, result, error
+        if cmd['LEN'] == 1:     read = self.protocol_handler.read1ByteTxRx
+        elif cmd['LEN'] == 2:   read = self.protocol_handler.read2ByteTxRx
+        else: read = self.protocol_handler.read4ByteTxRx
+        return self._transact('READ', id_, read, self.port_handler, id_, cmd['ADDR'])
 
     # Simplified packet handler for: Write TX Only
     def _writeTx(self, id_, cmd: dict, data):
-        if cmd['LEN'] == 1:     result = self.protocol_handler.write1ByteTxOnly(self.port_handler, id_, cmd['ADDR'], data)
-        elif cmd['LEN'] == 2:   result = self.protocol_handler.write2ByteTxOnly(self.port_handler, id_, cmd['ADDR'], data)
-        else: result = self.protocol_handler.write4ByteTxOnly(self.port_handler, id_, cmd['ADDR'], data)
-        return result
+        if cmd['LEN'] == 1:     write = self.protocol_handler.write1ByteTxOnly
+        elif cmd['LEN'] == 2:   write = self.protocol_handler.write2ByteTxOnly
+        else: write = self.protocol_handler.write4ByteTxOnly
+        return self._transact('WRITE_TX', id_, write, self.port_handler, id_, cmd['ADDR'], data)
 
     # Simplified packet handler for: Write TX/RX
     def _writeTxRx(self, id_, cmd: dict, data):
-        if cmd['LEN'] == 1:     result, error = self.protocol_handler.write1ByteTxRx(self.port_handler, id_, cmd['ADDR'], data)
-        elif cmd['LEN'] == 2:   result, error = self.protocol_handler.write2ByteTxRx(self.port_handler, id_, cmd['ADDR'], data)
-        else: result, error = self.protocol_handler.write4ByteTxRx(self.port_handler, id_, cmd['ADDR'], data)
-        return result, error
+        if cmd['LEN'] == 1:     write = self.protocol_handler.write1ByteTxRx
+        elif cmd['LEN'] == 2:   write = self.protocol_handler.write2ByteTxRx
+        else: write = self.protocol_handler.write4ByteTxRx
+        return self._transact('WRITE', id_, write, self.port_handler, id_, cmd['ADDR'], data)
+
+    @contextmanager
+    def retry_as(self, name: str):
+        """
+        Runs the transactions issued inside the with block under the retry policy of a command class,
+        whatever the class of the methods called, e.g. a read_states_sync() polled as telemetry.
+
+        Args:
+            name (str): The command class, a key of RETRY_POLICIES.
+        """
+        if name not in self.RETRY_POLICIES:
+            raise ValueError(f"Unknown command class {name}")
+        previous, self._retry_class = self._retry_class, name
+        try:
+            yield
+        finally:
+            self._retry_class = previous
+
+    def _retry_policy(self) -> RetryPolicy:
+        # The policy of the call in progress, configuration outside of any classified call
+        return self.RETRY_POLICIES[self._retry_class or 'config']
+
+    def _transact(self, command: str, ids, fn, *args):
+        """
+        Runs one SDK transaction under the retry policy of the active command class (see RETRY_POLICIES),
+        repeating it while the communication fails. Errors reported by the servo are not retried.
+
+        Args:
+            command (str): The command name, for the bus statistics.
+            ids (int or List[int]): The servo(s) addressed, for the bus statistics.
+            fn (Callable): The SDK call, returning result, (result, error) or (data, result, error).
+
+        Returns:
+            The return value of the last call of fn.
+        """
+        policy = self._retry_policy()
+        start, attempt = time.monotonic(), 1
+        while True:
+            token = self.stats.begin() if self.stats else None
+            ret = fn(*args)
+            result, error = (ret, 0) if isinstance(ret, int) else ret[-2:]
+            if token: self.stats.record(command, token, result, error, ids)
+            if result == COMM_SUCCESS or not policy.retry(attempt, start):
+                return ret
+            attempt += 1
 
     def add_bulk_param(self, id_, cmd: dict, data) -> bool:
         return self.groupBulkWrite.addParam(id_, cmd['ADDR'], cmd['LEN'], data)
@@ -939,7 +2114,10 @@ class DynamixelSDKWrapper:
         STARTUP_TORQUE_ON = 0
         RAM_RESTORE = 1
 
-        current_config, del_comm_result, dxl_error = self._readTxRx(id_, servo.control_table['STARTUP_CONFIGURATION'])
+        current_config = self._shadow_read(id_, 'STARTUP_CONFIGURATION')
+        if current_config is None:
+            return False
+        previous_config = current_config
 
         # new_mode = current_mode & ~(1 << bit_pos) if val else current_mode | (1 << bit_pos) # Set bit pos
         if torque_enable:
@@ -952,36 +2130,396 @@ class DynamixelSDKWrapper:
         else:
             current_config = current_config & ~(1 << RAM_RESTORE)
 
+        # Skip the EEPROM write if nothing changes
+        if current_config == previous_config:
+            return True
+
         dxl_comm_result, dxl_error = self._writeTxRx(id_, servo.control_table['STARTUP_CONFIGURATION'], current_config)
+        self._shadow_update(id_, 'STARTUP_CONFIGURATION', current_config, dxl_comm_result, dxl_error)
 
         return self._check_communication(id_, 'DRIVE_MODE', dxl_comm_result, dxl_error, current_config) 
     
-    def _sync_write(self, cmd_name: str, data: dict):
+    def _sync_write(self, cmd_name: str, data: Dict[int, List[int]]):
+        """
+        Writes data from a register on, to multiple servos with one packet: a sync write when the register
+        has the same address on every servo, a bulk write when their models place it differently.
+
+        Args:
+            cmd_name (str): The first register written.
+            data (Dict[int, List[int]]): {id: bytes}
+
+        Returns:
+            int: The communication result.
+        """
+        groups = {}
+        for id_ in self._available_ids(data.keys()):
+            layout = (self._get_servo(id_).control_table[cmd_name]['ADDR'], len(data[id_]))
+            groups.setdefault(layout, []).append(id_)
+        if len(groups) == 0:
+            return COMM_SUCCESS
+
+        if len(groups) > 1:
+            self._groupBulkWrite.clearParam()
+            for (address, length), ids in groups.items():
+                for id_ in ids:
+                    self._groupBulkWrite.addParam(id_, address, length, data[id_])
+            result = self._transact('BULK_WRITE', [id_ for ids in groups.values() for id_ in ids], self._groupBulkWrite.txPacket)
+            self._groupBulkWrite.clearParam()
+            return result
+
+        (address, length), ids = next(iter(groups.items()))
+        self._groupSyncWrite.clearParam()
+        self._groupSyncWrite.start_address = address
+        self._groupSyncWrite.data_length = length
+        for id_ in ids:
+            self._groupSyncWrite.addParam(id_, data[id_])
+        result = self._transact('SYNC_WRITE', ids, self._groupSyncWrite.txPacket)
         self._groupSyncWrite.clearParam()
-        models = {}
-        # モデルごとにデータをグループ化
-        for id_ in data.keys():
+        return result
+
+    def _sync_write_span(self, cmd_names: List[str], values: Dict[int, List[int]]):
+        """
+        Sync writes several adjacent registers at once.
+
+        Args:
+            cmd_names (List[str]): Adjacent registers, in address order.
+            values (Dict[int, List[int]]): {id: [value per register]}
+
+        Returns:
+            int: The communication result.
+        """
+        data = {}
+        for id_ in values.keys():
+            table = self._get_servo(id_).control_table
+            data[id_] = []
+            for cmd_name, val in zip(cmd_names, values[id_]):
+                data[id_] += self._convert_to_bytes(val, table[cmd_name]['LEN'])
+        return self._sync_write(cmd_names[0], data)
+
+    def _write_plan(self, cmd_names: List[str], ids: List[int], block: Optional[str] = None) -> List[Tuple[SyncWritePlan, np.ndarray]]:
+        """
+        Returns the write plans of adjacent registers to a set of servos, one per register layout
+        (bulk write plans when the servos' models place the registers differently), compiled on first use
+        and cached until the servos or their indirect blocks change.
+
+        Args:
+            cmd_names (List[str]): Adjacent registers, in address order.
+            ids (List[int]): The servo IDs.
+            block (str, optional): Write the registers through this indirect block instead of their own addresses.
+
+        Returns:
+            List[Tuple[SyncWritePlan, np.ndarray]]: (plan, index of its servos in ids) per layout.
+        """
+        key = ('write', block, tuple(cmd_names), tuple(ids))
+        plans = self._plans.get(key)
+        if plans is None:
+            # Subsets of servos (quarantine, position limits) get plans of their own, keep the cache bounded
+            if len(self._plans) >= 64:
+                self._plans.clear()
+            layouts = {}
+            for i, id_ in enumerate(ids):
+                servo = self._get_servo(id_)
+                table = servo.indirect[block] if block else servo.control_table
+                cmds = tuple((table[cmd_name]['ADDR'], table[cmd_name]['LEN']) for cmd_name in cmd_names)
+                layouts.setdefault(cmds, []).append(i)
+            bulk = len(layouts) > 1
+            plans = [(SyncWritePlan([ids[i] for i in index], [{'ADDR': addr, 'LEN': len_} for addr, len_ in cmds], bulk=bulk),
+                      np.array(index)) for cmds, index in layouts.items()]
+            self._plans[key] = plans
+        return plans
+
+    def _sync_write_plan(self, cmd_names: List[str], ids: List[int], values: List[np.ndarray], block: Optional[str] = None):
+        """
+        Writes adjacent registers through the cached write plans of the registers and servos, with one
+        sync write, or one bulk write when the servos' models place the registers differently.
+
+        Args:
+            cmd_names (List[str]): Adjacent registers, in address order.
+            ids (List[int]): The servo IDs.
+            values (List[np.ndarray]): One array per register, with one value per servo in ids order.
+            block (str, optional): Write the registers through this indirect block instead of their own addresses.
+
+        Returns:
+            int: The communication result.
+        """
+        available = self._available_ids(ids)
+        if len(available) != len(ids):
+            keep = np.isin(ids, available)
+            ids, values = available, [value[keep] for value in values]
+
+        plans = self._write_plan(cmd_names, ids, block)
+        if len(plans) == 0:
+            return COMM_SUCCESS
+        if len(plans) > 1:
+            param = []
+            for plan, index in plans:
+                param += plan.encode(*(value[index] for value in values))
+            return self._transact('BULK_WRITE', ids, self.protocol_handler.bulkWriteTxOnly, self.port_handler, param, len(param))
+
+        plan, index = plans[0]
+        param = plan.encode(*(value[index] for value in values))
+        return self._transact('SYNC_WRITE', plan.ids, self.protocol_handler.syncWriteTxOnly, self.port_handler,
+                              plan.start_address, plan.data_length, param, plan.param_length)
+
+    def _sync_read(self, cmd_names: List[str], ids: List[int], block: Optional[str] = None) -> Dict[int, Dict[str, int]]:
+        """
+        Sync reads the address span covering all cmd_names and decodes each register.
+
+        Args:
+            cmd_names (List[str]): The registers to read.
+            ids (List[int]): The servo IDs.
+            block (str, optional): Read the registers through this indirect block instead of their own addresses.
+
+        Returns:
+            Dict[int, Dict[str, int]]: {id: {register: value}} for every servo that responded.
+        """
+        cmds, spans = {}, {}
+        for id_ in self._available_ids(ids):
             servo = self._get_servo(id_)
-            model = servo.model
-            if model not in models:
-                models[model] = []
-            models[model].append((id_, data[id_]))
-        # 各モデルグループごとにsync writeを実行
-        for model in models:
-            first_servo = self._get_servo(models[model][0][0])
-            cmd = first_servo.control_table[cmd_name]
-            self._groupSyncWrite.start_address = cmd['ADDR']
-            self._groupSyncWrite.data_length = cmd['LEN']
-            for id_, param_data in models[model]:
-                self._groupSyncWrite.addParam(id_, param_data)
-            result = self._groupSyncWrite.txPacket()
-            self._groupSyncWrite.clearParam()
+            table = servo.indirect[block] if block else servo.control_table
+            cmds[id_] = [table[cmd_name] for cmd_name in cmd_names]
+            start = min(cmd['ADDR'] for cmd in cmds[id_])
+            spans[id_] = (start, max(cmd['ADDR'] + cmd['LEN'] for cmd in cmds[id_]) - start)
+
+        data = {}
+        for id_, raw in self._read_spans(spans, cmd_names).items():
+            data[id_] = self._decode(cmd_names, cmds[id_], spans[id_][0], raw, id_ if block is None else None)
+        return data
+
+    def _read_spans(self, spans: Dict[int, Tuple[int, int]], val=None, group: Optional[GroupBulkRead] = None) -> Dict[int, List[int]]:
+        """
+        Reads an address span of each servo with one instruction packet: a sync read when the span is the
+        same on every servo (a Fast Sync Read where the firmware supports it), a bulk read when their models
+        place it differently. Servos that did not answer are retried under the active retry policy, servos
+        answering with an error are not (as in _transact).
+
+        Args:
+            spans (Dict[int, Tuple[int, int]]): {id: (first address, number of bytes)}
+            val (optional): What is read, for error messages.
+            group (GroupBulkRead, optional): A bulk read already holding the parameters of spans, sent as is on the first try.
+
+        Returns:
+            Dict[int, List[int]]: {id: bytes read} for every servo that responded without error.
+        """
+        prepared = group
+        policy = self._retry_policy()
+        pending, start_time, attempt = list(spans.keys()), time.monotonic(), 1
+        lengths = {id_: length for id_, (_, length) in spans.items()}
+        data = {}
+        if len(pending) == 0:
+            return data
+
+        # All servos in one status packet when their firmware supports it
+        if len(set(spans.values())) == 1 and self._fast_sync_read_supported(pending):
+            statuses, result = self._fast_sync_read(pending, *spans[pending[0]])
+            if result == COMM_SUCCESS:
+                for id_ in pending:
+                    raw, error = statuses[id_]
+                    if self._check_communication(id_, 'FAST_SYNC_READ', result, error, val=val):
+                        data[id_] = raw
+                return data
+            # Incomplete answer, e.g. a servo missing from the chain: fall back to one status packet per servo
+
+        # Servos that did not answer are asked again, alone, while the retry policy allows
+        while True:
+            if prepared is not None and attempt == 1:
+                command = 'BULK_READ'
+            elif len({spans[id_] for id_ in pending}) == 1:
+                command, group = 'SYNC_READ', self._groupSyncRead
+                group.clearParam()
+                group.start_address, group.data_length = spans[pending[0]]
+                for id_ in pending:
+                    group.addParam(id_)
+            else:
+                command, group = 'BULK_READ', self._groupBulkRead
+                group.clearParam()
+                for id_ in pending:
+                    group.addParam(id_, *spans[id_])
+
+            token = self.stats.begin() if self.stats else None
+            result = group.txPacket()
+            if group is not prepared:
+                group.clearParam()
             if result != COMM_SUCCESS:
-                return result
-        return COMM_SUCCESS
+                if token: self.stats.record(command, token, result, 0, pending)
+                self._check_communication(id=255, cmd=command, dxl_comm_result=result, val=val)
+                failed = pending
+            else:
+                statuses, result = self._collect_status(pending, lengths, token)
+                if token: self.stats.record(command, token, result)
+                failed = []
+                for id_ in pending:
+                    raw, error = statuses.get(id_, ([], 0))
+                    if not self._check_communication(id_, command, COMM_SUCCESS if id_ in statuses else result,
+                                                     error, val=val):
+                        # An error reported by the servo is its answer: only the servos that did not answer are retried
+                        if id_ not in statuses:
+                            failed.append(id_)
+                        continue
+                    data[id_] = raw
+
+            if len(failed) == 0 or not policy.retry(attempt, start_time):
+                return data
+            pending, attempt = failed, attempt + 1
+
+    def _fast_sync_read_supported(self, ids: List[int]) -> bool:
+        """
+        Checks whether Fast Sync Read can be used: enabled, and firmware recent enough on every servo.
+
+        Args:
+            ids (List[int]): The servo IDs.
+
+        Returns:
+            bool: True if the servos can answer with one status packet.
+        """
+        if not self.use_fast_sync_read or len(ids) < 2:
+            return False
+        for id_ in ids:
+            servo = self._get_servo(id_)
+            min_fw = self.FAST_SYNC_READ_MIN_FW.get(servo.model.upper())
+            if min_fw is None or servo.firmware_ver < min_fw:
+                return False
+        return True
+
+    def _fast_sync_read(self, ids: List[int], start: int, length: int):
+        """
+        Reads the same address span of several servos with one Fast Sync Read (0x8A). The servos
+        answer with a single broadcast status packet: [error, id, data, crc] per servo, the CRC of
+        the last one being the packet CRC. The SDK's rxPacket rejects the broadcast ID, so the
+        packet is received and parsed here.
+
+        Args:
+            ids (List[int]): The servo IDs, in answer order.
+            start (int): The first address.
+            length (int): The number of bytes read from each servo.
+
+        Returns:
+            Tuple[dict, int]: ({id: (data, error)}, communication result), the dict is empty unless the result is COMM_SUCCESS.
+        """
+        token = self.stats.begin() if self.stats else None
+        param = [DXL_LOBYTE(start), DXL_HIBYTE(start), DXL_LOBYTE(length), DXL_HIBYTE(length)] + list(ids)
+        txpacket = [0] * (len(param) + 10)  # header, reserved, id, length, instruction, params, crc
+        txpacket[PKT_ID] = BROADCAST_ID
+        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(len(param) + 3)
+        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(len(param) + 3)
+        txpacket[PKT_INSTRUCTION] = self.INST_FAST_SYNC_READ
+        txpacket[PKT_PARAMETER0:PKT_PARAMETER0 + len(param)] = param
+
+        result = self.protocol_handler.txPacket(self.port_handler, txpacket)
+        if result != COMM_SUCCESS:
+            self.port_handler.is_using = False
+            if token: self.stats.record('FAST_SYNC_READ', token, result, 0, ids)
+            return {}, result
+
+        piece = length + 4  # error, id, data, crc
+        expected = PKT_INSTRUCTION + 1 + len(ids) * piece
+        self.port_handler.setPacketTimeout(expected)
+        header = [0xFF, 0xFF, 0xFD, 0x00, BROADCAST_ID]
+        rxpacket, total = [], expected
+        result = COMM_RX_TIMEOUT
+        while True:
+            rxpacket.extend(self.port_handler.readPort(total - len(rxpacket)))
+            # Drop anything in front of the broadcast status header
+            while len(rxpacket) >= len(header) and rxpacket[:len(header)] != header:
+                del rxpacket[0]
+            if len(rxpacket) > PKT_LENGTH_H:
+                total = PKT_LENGTH_H + 1 + DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H])
+            if len(rxpacket) >= total:
+                crc = DXL_MAKEWORD(rxpacket[total - 2], rxpacket[total - 1])
+                valid = self.protocol_handler.updateCRC(0, rxpacket, total - 2) == crc
+                result = COMM_SUCCESS if valid and rxpacket[PKT_INSTRUCTION] == 0x55 else COMM_RX_CORRUPT
+                break
+            if self.port_handler.isPacketTimeout():
+                result = COMM_RX_TIMEOUT if len(rxpacket) == 0 else COMM_RX_CORRUPT
+                break
+        self.port_handler.is_using = False
+
+        statuses = {}
+        if result == COMM_SUCCESS:
+            rxpacket = self.protocol_handler.removeStuffing(rxpacket[:total])
+            for i, id_ in enumerate(ids):
+                offset = PKT_ERROR + i * piece
+                if len(rxpacket) < offset + piece or rxpacket[offset + 1] != id_:
+                    result = COMM_RX_CORRUPT
+                    statuses = {}
+                    break
+                statuses[id_] = (rxpacket[offset + 2:offset + 2 + length], rxpacket[offset])
+        if token: self.stats.record('FAST_SYNC_READ', token, result, 0, ids)
+        return statuses, result
+
+    def _collect_status(self, ids: List[int], lengths: Dict[int, int], token=None):
+        """
+        Receives the status packets answering a group read, whatever order they arrive in. Unlike
+        reading them one ID at a time, a missing servo does not swallow the packets of the next ones.
+
+        Args:
+            ids (List[int]): The servo IDs expected to answer.
+            lengths (Dict[int, int]): The number of data bytes in the status packet of each servo.
+            token (tuple, optional): The bus statistics token of the group transaction.
+
+        Returns:
+            Tuple[dict, int]: ({id: (data, error)} for the servos that answered, COMM_SUCCESS or the reason the others did not).
+        """
+        statuses = {}
+        result = COMM_SUCCESS
+        while len(statuses) < len(ids):
+            rxpacket, result = self.protocol_handler.rxPacket(self.port_handler)
+            if result != COMM_SUCCESS:
+                break
+            id_ = rxpacket[PKT_ID]
+            if id_ in ids:
+                statuses[id_] = (rxpacket[PKT_PARAMETER0 + 1:PKT_PARAMETER0 + 1 + lengths[id_]], rxpacket[PKT_ERROR])
+                if token: self.stats.record_servo(id_, token, COMM_SUCCESS, rxpacket[PKT_ERROR])
+        if token:
+            for id_ in ids:
+                if id_ not in statuses:
+                    self.stats.record_servo(id_, token, result)
+        return statuses, result
+
+    def _decode(self, cmd_names: List[str], cmds: List[dict], start: int, raw, shadow_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Decodes registers from the raw bytes of an address span.
+
+        Args:
+            cmd_names (List[str]): The register names.
+            cmds (List[dict]): The register entries ({'ADDR', 'LEN'}) of cmd_names.
+            start (int): The address of raw[0].
+            raw (List[int]): The bytes read.
+            shadow_id (int, optional): Update the register shadow of this servo with the decoded values.
+
+        Returns:
+            Dict[str, int]: {register: value}
+        """
+        values = {}
+        for cmd_name, cmd in zip(cmd_names, cmds):
+            offset = cmd['ADDR'] - start
+            val = int.from_bytes(bytes(raw[offset:offset + cmd['LEN']]), 'little')
+            if cmd_name in control_table.SIGNED_REGISTERS:
+                val = self._to_signed(val, cmd['LEN'])
+            values[cmd_name] = val
+            if shadow_id is not None and cmd_name in control_table.SHADOW_REGISTERS:
+                self._get_servo(shadow_id).shadow[cmd_name] = val
+        return values
+
+    @staticmethod
+    def _to_signed(val: int, data_len: int) -> int:
+        """
+        Interprets an unsigned register value as two's complement.
+
+        Args:
+            val (int): The raw register value.
+            data_len (int): The register length in bytes.
+
+        Returns:
+            int: The signed value.
+        """
+        bits = 8 * data_len
+        if val & (1 << (bits - 1)):
+            val -= 1 << bits
+        return val
 
     def _bulk_write(self) -> bool:
-        return self.groupBulkWrite.txPacket()
+        return self._transact('BULK_WRITE', None, self.groupBulkWrite.txPacket)
         # if self.groupBulkWrite.txPacket(): 
         #     self.clear_bulk_param()
         #     return True
@@ -989,26 +2527,42 @@ class DynamixelSDKWrapper:
         #     return False
         #
     
-    def _bulk_read(self, data: dict):
+    @retry_class('safety')
+    def bulk_read(self, requests: Dict[int, List[str]]) -> Dict[int, Dict[str, int]]:
         """
-        data = {
-                id: cmd
-                }
+        Reads different registers of multiple servos in one transaction, e.g. the wrist current together
+        with the finger positions. Each servo is asked for the address span covering its registers; the
+        bulk read parameters are prepared once per set of requests and reused by the next calls.
+
+        Args:
+            requests (Dict[int, List[str]]): {id: [register, ...]}
+
+        Returns:
+            Dict[int, Dict[str, int]]: {id: {register: value}} for every servo that responded.
         """
-        for id_ in data.keys():
-            cmd = data[id_]
-            add_param_result = self.groupBulkRead.addParam(dxl_id=id_, start_address=cmd["ADDR"], data_length=cmd["LEN"])
-            if add_param_result != True: self.logger.error(f"ID {id_}: Add param failed")
-        
-        dxl_comm_result = self.groupBulkRead.txRxPacket()
-        if dxl_comm_result != True: 
-            self.logger.error(f"Bulk read failed")
-        
-        for id_ in data.keys():
-            cmd = data[id_]
-            if self.groupBulkRead.isAvailable(id, cmd["ADDR"], cmd["LEN"]):
-                result = self.groupBulkRead.getData(id, cmd["ADDR"], cmd["LEN"])
-                print(result)
+        requests = {id_: list(cmd_names) for id_, cmd_names in requests.items() if self._is_servo_registered(id_)}
+        key = ('bulk_read', tuple((id_, tuple(cmd_names)) for id_, cmd_names in requests.items()))
+        plan = self._plans.get(key)
+        if plan is None:
+            if len(self._plans) >= 64:
+                self._plans.clear()
+            plan = BulkReadPlan(cmds={}, spans={})
+            for id_, cmd_names in requests.items():
+                table = self._get_servo(id_).control_table
+                plan.cmds[id_] = [table[cmd_name] for cmd_name in cmd_names]
+                start = min(cmd['ADDR'] for cmd in plan.cmds[id_])
+                plan.spans[id_] = (start, max(cmd['ADDR'] + cmd['LEN'] for cmd in plan.cmds[id_]) - start)
+            if len(set(plan.spans.values())) > 1:
+                plan.group = GroupBulkRead(self.port_handler, self.packet_handler)
+                for id_, (start, length) in plan.spans.items():
+                    plan.group.addParam(id_, start, length)
+            self._plans[key] = plan
+
+        # The prepared parameters only hold while no servo is in quarantine
+        available = self._available_ids(plan.spans.keys())
+        group = plan.group if len(available) == len(plan.spans) else None
+        raws = self._read_spans({id_: plan.spans[id_] for id_ in available}, 'BULK_READ', group)
+        return {id_: self._decode(requests[id_], plan.cmds[id_], plan.spans[id_][0], raw, id_) for id_, raw in raws.items()}
 
     def reboot(self, id):
         """
@@ -1022,7 +2576,10 @@ class DynamixelSDKWrapper:
         """
         if not self._is_servo_registered(id):
             return False
-        result, error = self.packet_handler.reboot(self.port_handler, self.protocol_version, id)
+        token = self.stats.begin() if self.stats else None
+        result, error = self.packet_handler.reboot(self.port_handler, id)
+        if token: self.stats.record('REBOOT', token, result, error, id)
+        self.invalidate_shadow(id)  # RAM (torque) is reset by a reboot
         return self._check_communication(id, 'REBOOT', result, error)
 # dxl = DynamixelSDKWrapper(port='COM4')
 #
@@ -1038,11 +2595,11 @@ class DynamixelSDKWrapper:
 # # # dxl.torque_enable(9, 1)
 # dxl.set_torque([1,3], 1)
 #
-# # data = {1: {'ADDR': 132,  'LEN': 4},
-# #         2: {'ADDR': 132,  'LEN': 4}}
+# # data = {1: ['PRESENT_POSITION'],
+# #         2: ['PRESENT_CURRENT', 'PRESENT_TEMPERATURE']}
 #
 # # for i in range(10):
-# #     print(dxl._bulk_read(data))
+# #     print(dxl.bulk_read(data))
 # #     time.sleep(1)
 # t = 1000
 # # dxl.set_goal_pos_syc(ids=[1, 3], goal_positions=[5000, 5000], durations=[t, t])
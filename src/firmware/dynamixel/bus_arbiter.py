@@ -0,0 +1,206 @@
+
+"""
+This module serializes every transaction on a Dynamixel bus through a single owner thread.
+Requests are queued by priority class (motion > safety > telemetry > configuration) and callers
+receive futures, so several threads can share one DynamixelSDKWrapper safely.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Union
+
+# Priority classes, lower value is served first
+MOTION = 0
+SAFETY = 1
+TELEMETRY = 2
+CONFIG = 3
+
+PRIORITY_NAMES = {MOTION: 'motion', SAFETY: 'safety', TELEMETRY: 'telemetry', CONFIG: 'config'}
+
+# Maximum time a request of each class may wait in the queue (in ms)
+DEFAULT_BUDGETS_MS = {MOTION: 5.0, SAFETY: 20.0, TELEMETRY: 50.0, CONFIG: 1000.0}
+
+# Priority class of DynamixelSDKWrapper methods called through the arbiter, anything else is CONFIG
+METHOD_PRIORITIES = {
+    'set_goal_pos': MOTION,
+    'set_goal_pos_sync': MOTION,
+    'send_goal_pos_sync': MOTION,
+    'set_profile_time': MOTION,
+    'set_torque': SAFETY,
+    'read_states_sync': SAFETY,
+    'read_indirect_sync': SAFETY,
+    'read_block': SAFETY,
+    'bulk_read': SAFETY,
+    'read_realtime_tick': TELEMETRY,
+    'read_current_pos': SAFETY,
+    'read_temperature': SAFETY,
+    'read_voltage': SAFETY,
+    'ping': SAFETY,
+}
+
+_STOP = object()
+
+
+class BusArbiter:
+    """
+    Owner thread of a DynamixelSDKWrapper. Wrapper methods can be called on the arbiter as if it
+    were the wrapper itself; each call is queued with the priority class from METHOD_PRIORITIES and
+    blocks until the owner thread has executed it. Use submit() to get a Future instead.
+
+    Requests waiting longer than their class budget are counted as overruns. Telemetry requests
+    that overrun are dropped (their future is cancelled) since a newer sample will follow.
+
+    Attributes:
+        dxl (DynamixelSDKWrapper): The wrapper owning the bus.
+        budgets_ms (dict): The queueing latency budget of each priority class (in ms).
+    """
+
+    def __init__(self, dxl, budgets_ms: Optional[Dict[int, float]] = None, start: bool = True):
+        """
+        Initializes the BusArbiter.
+
+        Args:
+            dxl (DynamixelSDKWrapper): The wrapper owning the bus.
+            budgets_ms (dict, optional): The latency budget of each priority class. Defaults to DEFAULT_BUDGETS_MS.
+            start (bool, optional): Start the owner thread immediately. Defaults to True.
+        """
+        self.dxl = dxl
+        self.budgets_ms: Dict[int, float] = dict(DEFAULT_BUDGETS_MS)
+        if budgets_ms is not None:
+            self.budgets_ms.update(budgets_ms)
+
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._counter = itertools.count()  # FIFO order within a priority class
+        self._stats_lock = threading.Lock()
+        self._stats = {priority: self._empty_stats() for priority in PRIORITY_NAMES}
+        self._thread = threading.Thread(target=self._run, name=f'BusArbiter({dxl.port})', daemon=True)
+        self.logger = logging.getLogger(__name__)
+
+        if start:
+            self.start()
+
+    def __getattr__(self, name):
+        # Only reached for attributes the arbiter itself does not define
+        attr = getattr(self.dxl, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.submit(METHOD_PRIORITIES.get(name, CONFIG), attr, *args, **kwargs).result()
+        return call
+
+    def start(self) -> None:
+        """Starts the owner thread."""
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the owner thread after the requests already queued ahead of the stop request.
+
+        Args:
+            timeout (float, optional): Maximum time to wait for the thread to finish (in s).
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put((CONFIG + 1, next(self._counter), _STOP))
+        self._thread.join(timeout)
+
+    def submit(self, priority: int, fn: Union[str, Callable], *args, **kwargs) -> Future:
+        """
+        Queues a bus transaction.
+
+        Args:
+            priority (int): MOTION, SAFETY, TELEMETRY or CONFIG.
+            fn (str or Callable): A DynamixelSDKWrapper method name, or any callable touching the bus.
+
+        Returns:
+            Future: Resolves to the return value of fn.
+        """
+        if isinstance(fn, str):
+            fn = getattr(self.dxl, fn)
+
+        future = Future()
+        # Calls made from the owner thread (e.g. nested wrapper calls) run inline to avoid deadlocking
+        if threading.current_thread() is self._thread:
+            self._execute(future, fn, args, kwargs)
+            return future
+
+        with self._stats_lock:
+            self._stats[priority]['submitted'] += 1
+        self._queue.put((priority, next(self._counter), (future, fn, args, kwargs, time.monotonic())))
+        return future
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Returns the queueing statistics of each priority class.
+
+        Returns:
+            Dict[str, dict]: {class name: {'submitted', 'executed', 'dropped', 'overruns', 'max_wait_ms', 'mean_wait_ms', 'max_exec_ms'}}
+        """
+        with self._stats_lock:
+            snapshot = {}
+            for priority, stats in self._stats.items():
+                stats = dict(stats)
+                total_wait_ms = stats.pop('total_wait_ms')
+                stats['mean_wait_ms'] = total_wait_ms / stats['executed'] if stats['executed'] else 0.0
+                snapshot[PRIORITY_NAMES[priority]] = stats
+            return snapshot
+
+    def _run(self):
+        while True:
+            priority, _, item = self._queue.get()
+            if item is _STOP:
+                break
+
+            future, fn, args, kwargs, enqueued = item
+            wait_ms = (time.monotonic() - enqueued) * 1000.0
+            overrun = wait_ms > self.budgets_ms[priority]
+
+            with self._stats_lock:
+                stats = self._stats[priority]
+                stats['overruns'] += overrun
+                stats['max_wait_ms'] = max(stats['max_wait_ms'], wait_ms)
+
+            # Stale telemetry is dropped, a newer sample will follow
+            if overrun and priority == TELEMETRY:
+                future.cancel()
+                with self._stats_lock:
+                    self._stats[priority]['dropped'] += 1
+                continue
+
+            if overrun:
+                self.logger.debug(f"[{PRIORITY_NAMES[priority]}] waited {wait_ms:.1f} ms (budget {self.budgets_ms[priority]} ms)")
+
+            # Transactions of the request are retried according to its class, see DynamixelSDKWrapper.RETRY_POLICIES
+            with self.dxl.retry_as(PRIORITY_NAMES[priority]):
+                exec_ms = self._execute(future, fn, args, kwargs)
+            with self._stats_lock:
+                stats['executed'] += 1
+                stats['total_wait_ms'] += wait_ms
+                stats['max_exec_ms'] = max(stats['max_exec_ms'], exec_ms)
+
+        # Cancel whatever is left so no caller waits forever
+        while not self._queue.empty():
+            _, _, item = self._queue.get()
+            if item is not _STOP:
+                item[0].cancel()
+
+    @staticmethod
+    def _execute(future: Future, fn: Callable, args, kwargs) -> float:
+        if not future.set_running_or_notify_cancel():
+            return 0.0
+        start = time.monotonic()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return (time.monotonic() - start) * 1000.0
+
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {'submitted': 0, 'executed': 0, 'dropped': 0, 'overruns': 0,
+                'max_wait_ms': 0.0, 'total_wait_ms': 0.0, 'max_exec_ms': 0.0}
@@ -0,0 +1,230 @@
+
+"""
+This module records where bus time goes: transactions, bytes on the wire, round-trip latency
+histograms, timeouts and communication errors, per command and per servo. It is opt-in, see
+DynamixelSDKWrapper.enable_stats().
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from dynamixel_sdk import COMM_SUCCESS, COMM_RX_TIMEOUT, COMM_RX_CORRUPT
+
+# Upper edges of the latency histogram buckets (in ms), the last bucket is unbounded
+LATENCY_BUCKETS_MS = [0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0]
+
+
+class BusStats:
+    """
+    Transaction counters of one bus, per command (READ, WRITE, SYNC_READ, ...) and per servo ID.
+
+    Bytes are counted on the port handler, so they include headers, stuffing and CRCs of every
+    instruction and status packet.
+
+    Attributes:
+        start_time (float): When counting started (time.monotonic()).
+        tx_bytes (int): Bytes written to the port.
+        rx_bytes (int): Bytes read from the port.
+    """
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+        self._commands: Dict[str, dict] = {}
+        self._servos: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._port_handler = None
+
+    def attach(self, port_handler) -> None:
+        """
+        Counts the bytes going through a port handler.
+
+        Args:
+            port_handler (PortHandler): The SDK port handler of the bus.
+        """
+        write, read = port_handler.writePort, port_handler.readPort
+
+        def writePort(packet):
+            written = write(packet)
+            self.tx_bytes += written
+            return written
+
+        def readPort(length):
+            data = read(length)
+            self.rx_bytes += len(data)
+            return data
+
+        port_handler.writePort, port_handler.readPort = writePort, readPort
+        self._port_handler = port_handler
+
+    def detach(self) -> None:
+        """Stops counting bytes, restoring the port handler's own methods."""
+        if self._port_handler is not None:
+            del self._port_handler.writePort, self._port_handler.readPort
+            self._port_handler = None
+
+    def begin(self) -> Tuple[float, int, int]:
+        """
+        Marks the start of a transaction.
+
+        Returns:
+            Tuple[float, int, int]: The token to pass to record().
+        """
+        return time.perf_counter(), self.tx_bytes, self.rx_bytes
+
+    def record(self, command: str, token: Tuple[float, int, int], result: int = COMM_SUCCESS, error: int = 0,
+               ids: Union[int, Iterable[int], None] = None) -> None:
+        """
+        Records a finished transaction.
+
+        Args:
+            command (str): The command name, e.g. 'SYNC_WRITE'.
+            token (tuple): The token returned by begin().
+            result (int, optional): The SDK communication result. Defaults to COMM_SUCCESS.
+            error (int, optional): The servo error byte. Defaults to 0.
+            ids (int or Iterable[int], optional): The servo(s) addressed, recorded per servo as well.
+        """
+        start, tx_start, rx_start = token
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            entry = self._commands.setdefault(command, self._empty_entry())
+            self._add(entry, latency_ms, result, error)
+            entry['tx_bytes'] += self.tx_bytes - tx_start
+            entry['rx_bytes'] += self.rx_bytes - rx_start
+            if ids is None:
+                return
+            for id_ in [ids] if isinstance(ids, int) else ids:
+                self._add(self._servos.setdefault(id_, self._empty_entry()), latency_ms, result, error)
+
+    def record_servo(self, id_: int, token: Tuple[float, int, int], result: int = COMM_SUCCESS, error: int = 0) -> None:
+        """
+        Records the status packet of one servo answering a group transaction (e.g. a sync read),
+        latency measured from the instruction packet.
+
+        Args:
+            id_ (int): The servo ID.
+            token (tuple): The token returned by begin() for the group transaction.
+            result (int, optional): The SDK communication result. Defaults to COMM_SUCCESS.
+            error (int, optional): The servo error byte. Defaults to 0.
+        """
+        latency_ms = (time.perf_counter() - token[0]) * 1000.0
+        with self._lock:
+            self._add(self._servos.setdefault(id_, self._empty_entry()), latency_ms, result, error)
+
+    def reset(self) -> None:
+        """Clears every counter."""
+        with self._lock:
+            self._commands.clear()
+            self._servos.clear()
+            self.tx_bytes = self.rx_bytes = 0
+            self.start_time = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of the counters.
+
+        Returns:
+            dict: {'elapsed_s', 'tx_bytes', 'rx_bytes', 'busy_ratio', 'commands': {command: entry}, 'servos': {id: entry}},
+                each entry holding 'transactions', 'timeouts', 'corrupt', 'comm_errors', 'servo_errors',
+                'mean_ms', 'max_ms', 'histogram' ({bucket upper edge in ms: count}) and, per command, 'tx_bytes', 'rx_bytes'.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.start_time
+            commands = {command: self._export(entry) for command, entry in self._commands.items()}
+            servos = {id_: self._export(entry) for id_, entry in sorted(self._servos.items())}
+            busy_ms = sum(entry['total_ms'] for entry in self._commands.values())
+        return {
+            'elapsed_s': elapsed,
+            'tx_bytes': self.tx_bytes,
+            'rx_bytes': self.rx_bytes,
+            'busy_ratio': busy_ms / (elapsed * 1000.0) if elapsed > 0 else 0.0,
+            'commands': commands,
+            'servos': servos,
+        }
+
+    def summary(self) -> str:
+        """
+        Formats the counters as a short multi-line report.
+
+        Returns:
+            str: One line per command, then the servos with failures.
+        """
+        snapshot = self.snapshot()
+        lines = [f"Bus stats over {snapshot['elapsed_s']:.1f} s: {snapshot['tx_bytes']} B tx, "
+                 f"{snapshot['rx_bytes']} B rx, busy {100.0 * snapshot['busy_ratio']:.1f} %"]
+        for command, entry in sorted(snapshot['commands'].items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(f"  {command:<14} n={entry['transactions']:<7} mean={entry['mean_ms']:.2f} ms "
+                         f"max={entry['max_ms']:.2f} ms total={entry['total_ms']:.0f} ms "
+                         f"timeouts={entry['timeouts']} corrupt={entry['corrupt']} "
+                         f"comm_errors={entry['comm_errors']} servo_errors={entry['servo_errors']}")
+        failing = {id_: entry for id_, entry in snapshot['servos'].items()
+                   if entry['timeouts'] + entry['corrupt'] + entry['comm_errors'] + entry['servo_errors'] > 0}
+        for id_, entry in failing.items():
+            lines.append(f"  ID {id_:<3} n={entry['transactions']} timeouts={entry['timeouts']} corrupt={entry['corrupt']} "
+                         f"comm_errors={entry['comm_errors']} servo_errors={entry['servo_errors']}")
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _add(entry: dict, latency_ms: float, result: int, error: int) -> None:
+        entry['transactions'] += 1
+        entry['total_ms'] += latency_ms
+        entry['max_ms'] = max(entry['max_ms'], latency_ms)
+        entry['histogram'][bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        if result == COMM_RX_TIMEOUT:
+            entry['timeouts'] += 1
+        elif result == COMM_RX_CORRUPT:
+            entry['corrupt'] += 1
+        elif result != COMM_SUCCESS:
+            entry['comm_errors'] += 1
+        if error != 0:
+            entry['servo_errors'] += 1
+
+    @staticmethod
+    def _export(entry: dict) -> dict:
+        entry = dict(entry)
+        entry['mean_ms'] = entry['total_ms'] / entry['transactions'] if entry['transactions'] else 0.0
+        edges = LATENCY_BUCKETS_MS + [float('inf')]
+        entry['histogram'] = dict(zip(edges, entry['histogram']))
+        return entry
+
+    @staticmethod
+    def _empty_entry() -> dict:
+        return {'transactions': 0, 'tx_bytes': 0, 'rx_bytes': 0, 'timeouts': 0, 'corrupt': 0, 'comm_errors': 0,
+                'servo_errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+
+
+class BusStatsReporter(threading.Thread):
+    """
+    Thread logging the summary of a BusStats at a fixed interval.
+
+    Attributes:
+        stats (BusStats): The counters to report.
+        interval (float): The time between two reports (in s).
+    """
+
+    def __init__(self, stats: BusStats, interval: float = 60.0, name: Optional[str] = None):
+        """
+        Initializes the BusStatsReporter.
+
+        Args:
+            stats (BusStats): The counters to report.
+            interval (float, optional): The time between two reports (in s). Defaults to 60.
+            name (str, optional): Prefix of each report, e.g. the port name.
+        """
+        super().__init__(daemon=True)
+        self.stats = stats
+        self.interval = interval
+        self.prefix = f"[{name}] " if name else ''
+        self.stop_event = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.logger.info(self.prefix + self.stats.summary())
+
+    def stop(self):
+        self.stop_event.set()  # Signal thread to stop
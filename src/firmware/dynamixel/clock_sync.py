@@ -0,0 +1,248 @@
+
+"""
+This module aligns the servo clocks with the host: the REALTIME_TICK of every servo is sync-read
+periodically, unwrapped, and fitted against time.monotonic() to estimate each servo's offset and
+drift. Servo ticks read along with telemetry can then be converted into host time, free of the
+bus latency a host timestamp taken after the read would include.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from bus_arbiter import BusArbiter, TELEMETRY
+
+# REALTIME_TICK counts milliseconds and wraps at 32768
+TICK_MODULUS = 32768
+
+# Shortest span of readings the drift is fitted over (in s): with 1 ms ticks, 10 s bound the rate error
+# to about 100 ppm. Shorter spans only estimate the offset
+MIN_DRIFT_BASELINE_S = 10.0
+
+
+class ServoClock:
+    """
+    Linear model of one servo clock, host_time = offset + rate * servo_time, fitted by least squares
+    over the last `window` tick readings.
+
+    Attributes:
+        window (int): The number of readings fitted.
+        offset (float): The host time (time.monotonic()) at servo time 0, None before the first reading.
+        rate (float): Host seconds per servo second, 1 until the readings span MIN_DRIFT_BASELINE_S.
+        residual_ms (float): The RMS error of the fit (in ms).
+    """
+
+    def __init__(self, window: int = 64, reset_ms: float = 50.0):
+        """
+        Initializes the ServoClock.
+
+        Args:
+            window (int, optional): The number of readings fitted. Defaults to 64.
+            reset_ms (float, optional): Error above which a reading restarts the fit, e.g. after a reboot
+                of the servo. Defaults to 50 ms.
+        """
+        self.window = window
+        self.reset_ms = reset_ms
+        self.offset: Optional[float] = None
+        self.rate: float = 1.0
+        self.residual_ms: float = 0.0
+        self._host = deque(maxlen=window)
+        self._servo = deque(maxlen=window)
+
+    def __len__(self):
+        return len(self._host)
+
+    @property
+    def drift_ppm(self) -> float:
+        """Drift of the servo clock relative to the host clock, positive when the servo runs fast."""
+        return (1.0 / self.rate - 1.0) * 1e6
+
+    def servo_time(self, tick: int, host_time: float) -> float:
+        """
+        Unwraps a tick into servo time, taking the wrap closest to the model's prediction at host_time.
+
+        Args:
+            tick (int): The REALTIME_TICK reading (in ms).
+            host_time (float): About when the tick was read (time.monotonic()).
+
+        Returns:
+            float: The servo time (in s).
+        """
+        expected_ms = 0.0 if self.offset is None else (host_time - self.offset) / self.rate * 1000.0
+        wraps = round((expected_ms - tick) / TICK_MODULUS)
+        # The tick counts whole milliseconds, the middle of the millisecond is the best estimate
+        return (tick + wraps * TICK_MODULUS + 0.5) / 1000.0
+
+    def to_host(self, tick: int, host_time: float) -> Optional[float]:
+        """
+        Converts a tick into the host time at which the servo's clock showed it.
+
+        Args:
+            tick (int): The REALTIME_TICK reading (in ms).
+            host_time (float): About when the tick was read (time.monotonic()), to unwrap it.
+
+        Returns:
+            float: The host time (time.monotonic()), None before the first reading.
+        """
+        if self.offset is None:
+            return None
+        return self.offset + self.rate * self.servo_time(tick, host_time)
+
+    def add(self, tick: int, host_time: float) -> None:
+        """
+        Adds a reading and fits the model again.
+
+        Args:
+            tick (int): The REALTIME_TICK reading (in ms).
+            host_time (float): The host time at which the servo latched the tick (time.monotonic()).
+        """
+        servo_time = self.servo_time(tick, host_time)
+        if self.offset is not None and abs(self.offset + self.rate * servo_time - host_time) * 1000.0 > self.reset_ms:
+            self.reset()
+            servo_time = self.servo_time(tick, host_time)
+        self._host.append(host_time)
+        self._servo.append(servo_time)
+
+        host, servo = np.array(self._host), np.array(self._servo)
+        # Drift is only observable over a baseline far longer than the 1 ms tick resolution
+        if servo[-1] - servo[0] >= MIN_DRIFT_BASELINE_S:
+            servo_mean, host_mean = servo.mean(), host.mean()
+            centered = servo - servo_mean
+            self.rate = float(np.dot(centered, host - host_mean) / np.dot(centered, centered))
+            self.offset = float(host_mean - self.rate * servo_mean)
+        else:
+            self.rate = 1.0
+            self.offset = float(np.mean(host - servo))
+        self.residual_ms = float(np.sqrt(np.mean((self.offset + self.rate * servo - host) ** 2)) * 1000.0)
+
+    def reset(self) -> None:
+        """Drops every reading."""
+        self._host.clear()
+        self._servo.clear()
+        self.offset = None
+        self.rate = 1.0
+        self.residual_ms = 0.0
+
+
+class ClockSync(threading.Thread):
+    """
+    Thread reading the REALTIME_TICK of all servos with one sync read per bus at a fixed interval,
+    keeping a ServoClock per servo.
+
+    Readings whose round trip is well above the fastest seen (retries, a busy host) are discarded,
+    since the time the servos latched their tick is only known as well as the read is short.
+
+    Attributes:
+        buses (list): Every synchronized bus.
+        ids (List[int]): The synchronized servos.
+        clocks (Dict[int, ServoClock]): The clock model of each servo.
+        interval (float): The time between two readings (in s).
+    """
+
+    def __init__(self, dxl, ids: Optional[List[int]] = None, interval: float = 1.0, window: int = 64,
+                 max_round_trip_ratio: float = 2.0):
+        """
+        Initializes the ClockSync.
+
+        Args:
+            dxl (DynamixelSDKWrapper, BusArbiter or list of them): The bus(es) to read. Through a BusArbiter,
+                reads are queued as TELEMETRY.
+            ids (List[int], optional): The servo IDs. Defaults to every registered servo.
+            interval (float, optional): The time between two readings (in s), below the 32.8 s tick wrap. Defaults to 1 s.
+            window (int, optional): The number of readings fitted per servo. Defaults to 64.
+            max_round_trip_ratio (float, optional): Readings with a round trip above this multiple of the
+                fastest one are discarded. Defaults to 2.
+        """
+        super().__init__(daemon=True)
+        self.buses = list(dxl) if isinstance(dxl, (list, tuple)) else [dxl]
+        self.ids = [id_ for bus in self.buses for id_ in bus.servos.keys()] if ids is None else list(ids)
+        self._bus_ids = [[id_ for id_ in self.ids if id_ in bus.servos] for bus in self.buses]
+        self.clocks: Dict[int, ServoClock] = {id_: ServoClock(window) for id_ in self.ids}
+        self.interval = interval
+        self.max_round_trip_ratio = max_round_trip_ratio
+        self._min_round_trip = [float('inf')] * len(self.buses)
+        self.stop_event = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def sync(self) -> None:
+        """Reads the ticks of every bus once and updates the clock models."""
+        for i, (bus, ids) in enumerate(zip(self.buses, self._bus_ids)):
+            if len(ids) == 0:
+                continue
+            try:
+                if isinstance(bus, BusArbiter):
+                    latched, round_trip, ticks = bus.submit(TELEMETRY, 'read_realtime_tick', ids).result()
+                else:
+                    latched, round_trip, ticks = bus.read_realtime_tick(ids)
+            except CancelledError:
+                continue  # Dropped by the arbiter, bus busy with higher priority work
+
+            self._min_round_trip[i] = min(self._min_round_trip[i], round_trip)
+            if round_trip > self.max_round_trip_ratio * self._min_round_trip[i]:
+                continue
+            for id_, tick in ticks.items():
+                self.clocks[id_].add(tick, latched)
+
+    def to_host(self, id_: int, tick: int, host_time: Optional[float] = None) -> Optional[float]:
+        """
+        Converts a servo's tick into host time.
+
+        Args:
+            id_ (int): The servo ID.
+            tick (int): The REALTIME_TICK reading (in ms).
+            host_time (float, optional): About when the tick was read (time.monotonic()). Defaults to now.
+
+        Returns:
+            float: The host time (time.monotonic()) at which the servo's clock showed the tick, None if not synchronized yet.
+        """
+        clock = self.clocks.get(id_)
+        if clock is None:
+            return None
+        return clock.to_host(tick, time.monotonic() if host_time is None else host_time)
+
+    def stamp(self, readings: Dict[int, Dict[str, int]], host_time: Optional[float] = None) -> Optional[float]:
+        """
+        Time of a sample read with the servos' REALTIME_TICK: the median of the host times of each servo's tick.
+
+        Args:
+            readings (Dict[int, Dict[str, int]]): {id: {register: value}}, including 'REALTIME_TICK'.
+            host_time (float, optional): About when the sample was read (time.monotonic()). Defaults to now.
+
+        Returns:
+            float: The host time (time.monotonic()) of the sample, None if no servo is synchronized.
+        """
+        if host_time is None:
+            host_time = time.monotonic()
+        times = [self.to_host(id_, values['REALTIME_TICK'], host_time)
+                 for id_, values in readings.items() if 'REALTIME_TICK' in values]
+        times = [t for t in times if t is not None]
+        return float(np.median(times)) if len(times) > 0 else None
+
+    def status(self) -> Dict[int, dict]:
+        """
+        Returns the clock model of each servo.
+
+        Returns:
+            Dict[int, dict]: {id: {'offset', 'drift_ppm', 'residual_ms', 'readings'}} of the synchronized servos.
+        """
+        return {id_: {'offset': clock.offset, 'drift_ppm': clock.drift_ppm, 'residual_ms': clock.residual_ms,
+                      'readings': len(clock)}
+                for id_, clock in self.clocks.items() if clock.offset is not None}
+
+    def run(self):
+        self.logger.info(f"Clock sync started: {len(self.ids)} servos on {len(self.buses)} bus(es) every {self.interval} s")
+        while not self.stop_event.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                self.logger.error(f"Clock sync failed: {e}")
+            self.stop_event.wait(self.interval)
+        self.logger.info("Clock sync stopped")
+
+    def stop(self):
+        self.stop_event.set()  # Signal thread to stop
@@ -0,0 +1,97 @@
+
+"""
+This module decodes contiguous register ranges in one step: the layout of a range is compiled once
+from the control table into a struct format, and every read is unpacked into a typed record.
+"""
+
+import struct
+from collections import namedtuple
+from typing import List, NamedTuple, Optional, Type
+
+import control_table
+
+# struct format character of an unsigned register, by length (lower case for signed registers)
+_FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+
+
+class ServoState(NamedTuple):
+    """Present state of a servo, the 'STATE' block (PRESENT_PWM .. PRESENT_TEMPERATURE), in register units."""
+    present_pwm: int            # 0.113 %
+    present_current: int        # 1.0 mA
+    present_velocity: int       # 0.229 rev/min
+    present_position: int       # 1 pulse
+    velocity_trajectory: int    # 0.229 rev/min
+    position_trajectory: int    # 1 pulse
+    present_input_voltage: int  # 0.1 V
+    present_temperature: int    # °C
+
+
+# Record type of each block, other blocks get a namedtuple of their register names
+RECORDS = {
+    'STATE': ServoState,
+}
+
+
+class RegisterBlock:
+    """
+    Layout of a contiguous register range, decoded with a single struct unpack. Gaps between
+    registers are skipped, signed registers (control_table.SIGNED_REGISTERS) are unpacked as such.
+
+    Attributes:
+        name (str): The block name.
+        cmd_names (List[str]): The registers of the block, in address order.
+        start (int): The address of the first register.
+        length (int): The number of bytes of the block.
+        record (type): The NamedTuple returned by decode(), one field per register in lower case.
+    """
+
+    def __init__(self, name: str, table: dict, first: str, last: str, record: Optional[Type[NamedTuple]] = None):
+        """
+        Initializes the RegisterBlock.
+
+        Args:
+            name (str): The block name.
+            table (dict): The control table of the servo model.
+            first (str): The first register of the block.
+            last (str): The last register of the block.
+            record (type, optional): The NamedTuple to decode into. Defaults to a namedtuple of the register names.
+
+        Raises:
+            ValueError: If registers overlap or the record fields do not match the registers.
+        """
+        self.name = name
+        self.start = table[first]['ADDR']
+        end = table[last]['ADDR'] + table[last]['LEN']
+        self.length = end - self.start
+
+        cmds = sorted(((cmd_name, cmd) for cmd_name, cmd in table.items()
+                       if self.start <= cmd['ADDR'] and cmd['ADDR'] + cmd['LEN'] <= end), key=lambda item: item[1]['ADDR'])
+        fmt, address = '<', self.start
+        for cmd_name, cmd in cmds:
+            if cmd['ADDR'] < address:
+                raise ValueError(f"{cmd_name} overlaps the previous register of block {name}")
+            if cmd['ADDR'] > address:
+                fmt += f"{cmd['ADDR'] - address}x"
+            fmt += _FORMATS[cmd['LEN']].lower() if cmd_name in control_table.SIGNED_REGISTERS else _FORMATS[cmd['LEN']]
+            address = cmd['ADDR'] + cmd['LEN']
+        self.cmd_names: List[str] = [cmd_name for cmd_name, _ in cmds]
+        self._struct = struct.Struct(fmt)
+
+        fields = [cmd_name.lower() for cmd_name in self.cmd_names]
+        if record is None:
+            record = namedtuple(name.title().replace('_', ''), fields)
+        elif list(record._fields) != fields:
+            raise ValueError(f"{record.__name__} fields do not match the registers of block {name}: {fields}")
+        self.record = record
+
+    def decode(self, raw) -> NamedTuple:
+        """
+        Decodes the bytes read from the block.
+
+        Args:
+            raw (List[int] or bytes): The block bytes, starting at `start`.
+
+        Returns:
+            NamedTuple: The record, one field per register.
+        """
+        return self.record._make(self._struct.unpack(bytes(raw)))
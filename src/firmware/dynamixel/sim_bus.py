@@ -0,0 +1,597 @@
+
+"""
+This module simulates a chain of Dynamixel servos speaking Protocol 2.0, so the wrapper and the Hand
+can run, be measured and be regression tested without the physical hand attached.
+
+A SimulatedPortHandler replaces the SDK's PortHandler in process: instruction packets written to it
+are parsed by a SimulatedBus holding one register file per servo (laid out after the control table),
+and the status packets become readable after the time the real bus would need to carry them
+(baud rate, return delay). Goal positions are tracked with first-order dynamics.
+
+Ports named 'sim://<name>' are opened on the simulated bus of that name by DynamixelSDKWrapper:
+
+    dxl = DynamixelSDKWrapper(port='sim://hand', baudrate=1000000)
+    hand = Hand(ports={'sim://a': ['thumb', 'index'], 'sim://b': ['middle', 'ring', 'pinky', 'abduction', 'wrist']})
+"""
+
+import collections
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dynamixel_sdk import PortHandler, Protocol2PacketHandler
+from dynamixel_sdk.robotis_def import (
+    BROADCAST_ID,
+    INST_PING,
+    INST_READ,
+    INST_WRITE,
+    INST_REBOOT,
+    INST_STATUS,
+    INST_SYNC_READ,
+    INST_SYNC_WRITE,
+    INST_BULK_READ,
+    INST_BULK_WRITE,
+)
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+import control_table
+
+SIM_PREFIX = 'sim://'
+
+# Servo IDs of the hand, see README
+DEFAULT_IDS = list(range(1, 25))
+
+# Status packet error codes
+ERR_RESULT_FAIL = 0x01
+ERR_INSTRUCTION = 0x02
+ERR_CRC = 0x03
+ERR_DATA_RANGE = 0x04
+ERR_DATA_LENGTH = 0x05
+ERR_ACCESS = 0x07
+ERR_ALERT = 0x80
+
+# (first indirect address, first indirect data, count) of each indirect address range
+INDIRECT_RANGES = [
+    (control_table.CONTROL_TABLE_XC_330['INDIRECT_ADDRESS_1']['ADDR'], control_table.CONTROL_TABLE_XC_330['INDIRECT_DATA_1']['ADDR'], 20),
+    (control_table.CONTROL_TABLE_XC_330['INDIRECT_ADDRESS_21']['ADDR'], control_table.CONTROL_TABLE_XC_330['INDIRECT_DATA_21']['ADDR'], 8),
+]
+
+
+# Factory values of an XC330-T288, anything not listed is 0
+XC330_DEFAULTS = {
+    'MODEL_NUMBER': 1220,
+    'FIRMWARE_VERSION': 52,
+    'RETURN_DELAY_TIME': 250,
+    'OPERATING_MODE': DynamixelSDKWrapper.OPERATING_MODES['position'],
+    'SECONDARY_ID': 255,
+    'PROTOCOL_TYPE': 2,
+    'MOVING_THRESHOLD': 10,
+    'TEMPERATURE_LIMIT': 70,
+    'MAX_VOLTAGE_LIMIT': 70,
+    'MIN_VOLTAGE_LIMIT': 35,
+    'PWM_LIMIT': 885,
+    'CURRENT_LIMIT': 910,
+    'VELOCITY_LIMIT': 445,
+    'MAX_POSITION_LIMIT': 4095,
+    'MIN_POSITION_LIMIT': 0,
+    'PWM_SLOPE': 140,
+    'SHUTDOWN': 52,
+    'STATUS_RETURN_LEVEL': 2,
+    'PRESENT_INPUT_VOLTAGE': 50,
+    'PRESENT_TEMPERATURE': 30,
+}
+
+_crc = Protocol2PacketHandler().updateCRC
+
+
+def _add_stuffing(body: bytes) -> bytes:
+    # FF FF FD inside the packet body becomes FF FF FD FD
+    return body.replace(b'\xff\xff\xfd', b'\xff\xff\xfd\xfd')
+
+
+def _remove_stuffing(body: bytes) -> bytes:
+    return body.replace(b'\xff\xff\xfd\xfd', b'\xff\xff\xfd')
+
+
+def make_packet(id_: int, instruction: int, params: bytes = b'') -> bytes:
+    """
+    Builds a Protocol 2.0 packet (header, byte stuffing and CRC included).
+
+    Args:
+        id_ (int): The packet ID.
+        instruction (int): The instruction (INST_STATUS for status packets).
+        params (bytes, optional): The parameters, the error byte first for status packets.
+
+    Returns:
+        bytes: The packet as sent on the wire.
+    """
+    body = _add_stuffing(bytes([instruction]) + bytes(params))
+    packet = bytearray(b'\xff\xff\xfd\x00') + bytes([id_]) + (len(body) + 2).to_bytes(2, 'little') + body
+    packet += _crc(0, packet, len(packet)).to_bytes(2, 'little')
+    return bytes(packet)
+
+
+def parse_packet(packet: bytes) -> Tuple[Optional[Tuple[int, int, bytes]], int]:
+    """
+    Parses an instruction packet.
+
+    Args:
+        packet (bytes): The packet as received on the wire.
+
+    Returns:
+        Tuple: ((id, instruction, params), 0), (None, ERR_CRC) with a bad CRC, or (None, -1) if malformed.
+    """
+    if len(packet) < 10 or packet[:4] != b'\xff\xff\xfd\x00':
+        return None, -1
+    length = int.from_bytes(packet[5:7], 'little')
+    if len(packet) < 7 + length:
+        return None, -1
+    packet = packet[:7 + length]
+    if _crc(0, packet, len(packet) - 2) != int.from_bytes(packet[-2:], 'little'):
+        return (packet[4], packet[7], b''), ERR_CRC
+    body = _remove_stuffing(bytes(packet[7:-2]))
+    return (packet[4], body[0], body[1:]), 0
+
+
+class SimulatedServo:
+    """
+    Register file and motion model of one servo.
+
+    Attributes:
+        table (dict): The control table the register file is laid out after.
+        registers (bytearray): The register file.
+        time_constant (float): Time constant of the first-order position response (in s).
+        drift_ppm (float): Drift of the servo clock (REALTIME_TICK) relative to the host clock.
+    """
+
+    def __init__(self, id_: int, baudrate: int = 57600, table: dict = control_table.CONTROL_TABLE_XC_330,
+                 defaults: dict = XC330_DEFAULTS, time_constant: float = 0.1, drift_ppm: float = 0.0,
+                 position: int = 2048):
+        """
+        Initializes the SimulatedServo.
+
+        Args:
+            id_ (int): The servo ID.
+            baudrate (int, optional): The baud rate the servo listens at. Defaults to 57600 (factory setting).
+            table (dict, optional): The control table. Defaults to the XC330 one.
+            defaults (dict, optional): Factory register values. Defaults to XC330_DEFAULTS.
+            time_constant (float, optional): Time constant of the position response (in s). Defaults to 0.1.
+            drift_ppm (float, optional): Drift of the servo clock. Defaults to 0.
+            position (int, optional): The initial present position. Defaults to 2048.
+        """
+        self.table = table
+        self.defaults = defaults
+        # Registers the host cannot write (REALTIME_TICK up to BACKUP_READY), besides the model and firmware below ID
+        self.read_only = (table['REALTIME_TICK']['ADDR'], table['BACKUP_READY']['ADDR'] + 1)
+        self.time_constant = time_constant
+        self.drift_ppm = drift_ppm
+        size = max(max(cmd['ADDR'] + cmd['LEN'] for cmd in table.values()),
+                   max(data + count for _, data, count in INDIRECT_RANGES))
+        self.registers = bytearray(size)
+
+        self._indirect = {}  # indirect data address -> indirect address register
+        for address, data, count in INDIRECT_RANGES:
+            for i in range(count):
+                self._indirect[data + i] = address + 2 * i
+
+        for name, val in defaults.items():
+            if name in table:  # models without some registers, e.g. PWM_SLOPE
+                self.set(name, val)
+        self.set('ID', id_)
+        self.set('BAUD_RATE', DynamixelSDKWrapper.BAUD_RATE_CODES[baudrate])
+        for data, address in self._indirect.items():
+            self.registers[address:address + 2] = data.to_bytes(2, 'little')  # factory setting: no redirection
+
+        self._clock_start = time.monotonic()
+        self._last_update = self._clock_start
+        self._position = float(position)
+        self._velocity = 0.0
+        self.reset_ram()
+
+    @property
+    def id_(self) -> int:
+        return self.get('ID')
+
+    @property
+    def baudrate(self) -> int:
+        code = self.get('BAUD_RATE')
+        return next((baud for baud, val in DynamixelSDKWrapper.BAUD_RATE_CODES.items() if val == code), 0)
+
+    @property
+    def return_delay(self) -> float:
+        """The delay before the servo answers (in s)."""
+        return self.get('RETURN_DELAY_TIME') * 2e-6
+
+    def reset_ram(self) -> None:
+        """Restores the RAM area to its power-on state, the EEPROM area is kept."""
+        ram_start = self.table['TORQUE_ENABLE']['ADDR']
+        for name, cmd in self.table.items():
+            if ram_start <= cmd['ADDR'] < self.read_only[0]:
+                self.set(name, self.defaults.get(name, 0))
+        self._velocity = 0.0
+        self.set('GOAL_POSITION', round(self._position))
+        self.update()
+
+    def get(self, name: str) -> int:
+        cmd = self.table[name]
+        signed = name in control_table.SIGNED_REGISTERS
+        return int.from_bytes(self.registers[cmd['ADDR']:cmd['ADDR'] + cmd['LEN']], 'little', signed=signed)
+
+    def set(self, name: str, val: int) -> None:
+        cmd = self.table[name]
+        self.registers[cmd['ADDR']:cmd['ADDR'] + cmd['LEN']] = int(val).to_bytes(cmd['LEN'], 'little', signed=val < 0)
+
+    def update(self, now: Optional[float] = None) -> None:
+        """
+        Advances the motion model and refreshes the read-only registers.
+
+        Args:
+            now (float, optional): The current time.monotonic(). Defaults to now.
+        """
+        now = time.monotonic() if now is None else now
+        dt = now - self._last_update
+        self._last_update = now
+
+        mode = self.get('OPERATING_MODE')
+        tracking = self.get('TORQUE_ENABLE') and mode in (DynamixelSDKWrapper.OPERATING_MODES['position'],
+                                                          DynamixelSDKWrapper.OPERATING_MODES['extended_pos'],
+                                                          DynamixelSDKWrapper.OPERATING_MODES['current_pos'])
+        if tracking and dt > 0:
+            goal = self.get('GOAL_POSITION')
+            if mode == DynamixelSDKWrapper.OPERATING_MODES['position']:
+                goal = min(max(goal, self.get('MIN_POSITION_LIMIT')), self.get('MAX_POSITION_LIMIT'))
+            self._position = goal + (self._position - goal) * math.exp(-dt / self.time_constant)
+            self._velocity = (goal - self._position) / self.time_constant
+        elif not tracking:
+            self._velocity = 0.0
+
+        # pulse/s -> 0.229 rev/min
+        velocity = round(self._velocity / 4096 * 60 / 0.229)
+        self.set('PRESENT_POSITION', round(self._position))
+        self.set('PRESENT_VELOCITY', velocity)
+        self.set('VELOCITY_TRAJECTORY', velocity)
+        self.set('POSITION_TRAJECTORY', self.get('GOAL_POSITION'))
+        self.set('PRESENT_CURRENT', max(-self.get('CURRENT_LIMIT'), min(self.get('CURRENT_LIMIT'), velocity * 5)))
+        self.set('MOVING', int(abs(velocity) > self.get('MOVING_THRESHOLD')))
+        elapsed_ms = (now - self._clock_start) * 1000.0 * (1.0 + self.drift_ppm * 1e-6)
+        self.set('REALTIME_TICK', int(elapsed_ms) % 32768)
+
+    def read(self, address: int, length: int) -> Tuple[bytes, int]:
+        """
+        Reads registers.
+
+        Returns:
+            Tuple[bytes, int]: (data, error), data is empty on error.
+        """
+        if length == 0 or address + length > len(self.registers):
+            return b'', ERR_DATA_RANGE
+        self.update()
+        return bytes(self._load(addr) for addr in range(address, address + length)), 0
+
+    def write(self, address: int, data: bytes) -> int:
+        """
+        Writes registers, EEPROM writes are refused while the torque is on.
+
+        Returns:
+            int: The status error.
+        """
+        if len(data) == 0 or address + len(data) > len(self.registers):
+            return ERR_DATA_RANGE
+        targets = [self._resolve(addr) for addr in range(address, address + len(data))]
+        eeprom_end = self.table['TORQUE_ENABLE']['ADDR']
+        if self.get('TORQUE_ENABLE') and any(addr < eeprom_end for addr in targets):
+            return ERR_ACCESS
+        if any(self.read_only[0] <= addr < self.read_only[1] or addr < self.table['ID']['ADDR'] for addr in targets):
+            return ERR_ACCESS
+
+        self.update()
+        for addr, val in zip(targets, data):
+            self.registers[addr] = val
+        return 0
+
+    def _resolve(self, address: int) -> int:
+        # Indirect data bytes stand for the register their indirect address points at
+        if address in self._indirect:
+            pointer = self._indirect[address]
+            target = int.from_bytes(self.registers[pointer:pointer + 2], 'little')
+            if target not in self._indirect and target < len(self.registers):
+                return target
+        return address
+
+    def _load(self, address: int) -> int:
+        return self.registers[self._resolve(address)]
+
+    def status_error(self, error: int = 0) -> int:
+        return error | (ERR_ALERT if self.get('HARDWARE_ERROR_STATUS') else 0)
+
+
+class SimulatedBus:
+    """
+    A chain of simulated servos on one serial line.
+
+    Attributes:
+        servos (List[SimulatedServo]): The servos on the line.
+        realtime (bool): Model the time the real bus needs to carry each byte.
+    """
+
+    def __init__(self, ids: List[int] = DEFAULT_IDS, baudrate: int = 57600, realtime: bool = True, **servo_kwargs):
+        """
+        Initializes the SimulatedBus.
+
+        Args:
+            ids (List[int], optional): The IDs of the servos on the line. Defaults to DEFAULT_IDS.
+            baudrate (int, optional): The baud rate the servos listen at. Defaults to 57600.
+            realtime (bool, optional): Model wire and return delay timing. Defaults to True.
+            **servo_kwargs: Passed to every SimulatedServo.
+        """
+        self.servos: List[SimulatedServo] = [SimulatedServo(id_, baudrate=baudrate, **servo_kwargs) for id_ in ids]
+        self.realtime = realtime
+        self.lock = threading.Lock()
+
+    def add_servo(self, servo: SimulatedServo) -> None:
+        with self.lock:
+            self.servos.append(servo)
+
+    def remove_servo(self, id_: int) -> None:
+        """Unplugs the servo(s) with the given ID."""
+        with self.lock:
+            self.servos = [servo for servo in self.servos if servo.id_ != id_]
+
+    def servo(self, id_: int) -> Optional[SimulatedServo]:
+        return next((servo for servo in self.servos if servo.id_ == id_), None)
+
+    def process(self, packet: bytes, baudrate: int) -> List[Tuple[float, bytes]]:
+        """
+        Executes an instruction packet.
+
+        Args:
+            packet (bytes): The instruction packet.
+            baudrate (int): The baud rate the host transmitted at, servos listening at another rate ignore it.
+
+        Returns:
+            List[Tuple[float, bytes]]: The status packets in the order they are sent, each with its return delay (in s).
+        """
+        parsed, error = parse_packet(packet)
+        if parsed is None:
+            return []
+        id_, instruction, params = parsed
+
+        with self.lock:
+            listening = [servo for servo in self.servos if servo.baudrate == baudrate]
+            if error:
+                return [(servo.return_delay, make_packet(servo.id_, INST_STATUS, bytes([servo.status_error(error)])))
+                        for servo in listening if servo.id_ == id_]
+
+            handler = {
+                INST_PING: self._ping,
+                INST_READ: self._read,
+                INST_WRITE: self._write,
+                INST_REBOOT: self._reboot,
+                INST_SYNC_READ: self._sync_read,
+                INST_SYNC_WRITE: self._sync_write,
+                INST_BULK_READ: self._bulk_read,
+                INST_BULK_WRITE: self._bulk_write,
+                DynamixelSDKWrapper.INST_FAST_SYNC_READ: self._fast_sync_read,
+            }.get(instruction)
+            if handler is None:
+                return [self._status(servo, ERR_INSTRUCTION) for servo in listening if servo.id_ == id_]
+            return handler(listening, id_, params)
+
+    @staticmethod
+    def _status(servo: SimulatedServo, error: int = 0, data: bytes = b'') -> Tuple[float, bytes]:
+        return servo.return_delay, make_packet(servo.id_, INST_STATUS, bytes([servo.status_error(error)]) + (b'' if error else data))
+
+    @staticmethod
+    def _addressed(listening: List[SimulatedServo], id_: int) -> List[SimulatedServo]:
+        # Packets to a SECONDARY_ID are executed by every servo sharing it, without status packets
+        return [servo for servo in listening if servo.id_ == id_ or (id_ != BROADCAST_ID and servo.get('SECONDARY_ID') == id_)]
+
+    @staticmethod
+    def _replies(servo: SimulatedServo, id_: int, level: int = 2) -> bool:
+        return servo.id_ == id_ and servo.get('STATUS_RETURN_LEVEL') >= level
+
+    def _ping(self, listening, id_, params):
+        servos = sorted(listening, key=lambda servo: servo.id_) if id_ == BROADCAST_ID else [s for s in listening if s.id_ == id_]
+        replies = []
+        for servo in servos:
+            data = servo.get('MODEL_NUMBER').to_bytes(2, 'little') + bytes([servo.get('FIRMWARE_VERSION')])
+            replies.append(self._status(servo, data=data))
+        return replies
+
+    def _read(self, listening, id_, params):
+        if len(params) != 4:
+            return [self._status(servo, ERR_DATA_LENGTH) for servo in listening if servo.id_ == id_]
+        address, length = int.from_bytes(params[0:2], 'little'), int.from_bytes(params[2:4], 'little')
+        replies = []
+        for servo in listening:
+            if self._replies(servo, id_, 1):
+                data, error = servo.read(address, length)
+                replies.append(self._status(servo, error, data))
+        return replies
+
+    def _write(self, listening, id_, params):
+        if len(params) < 3:
+            return [self._status(servo, ERR_DATA_LENGTH) for servo in listening if servo.id_ == id_]
+        address = int.from_bytes(params[0:2], 'little')
+        replies = []
+        for servo in self._addressed(listening, id_):
+            replying = self._replies(servo, id_)  # ID may be changed by the write
+            error = servo.write(address, params[2:])
+            if replying:
+                replies.append(self._status(servo, error))
+        return replies
+
+    def _reboot(self, listening, id_, params):
+        replies = []
+        for servo in self._addressed(listening, id_):
+            if self._replies(servo, id_):
+                replies.append(self._status(servo))
+            servo.reset_ram()
+        return replies
+
+    def _sync_read(self, listening, id_, params):
+        address, length = int.from_bytes(params[0:2], 'little'), int.from_bytes(params[2:4], 'little')
+        replies = []
+        for target in params[4:]:
+            for servo in listening:
+                if self._replies(servo, target, 1):
+                    data, error = servo.read(address, length)
+                    replies.append(self._status(servo, error, data))
+        return replies
+
+    def _fast_sync_read(self, listening, id_, params):
+        # One broadcast status packet, each servo appending [error, id, data, crc] to it in turn.
+        # The chain stops at the first servo not answering, leaving the packet incomplete.
+        address, length = int.from_bytes(params[0:2], 'little'), int.from_bytes(params[2:4], 'little')
+        targets = list(params[4:])
+        pieces, delay = b'', None
+        for target in targets:
+            servo = next((servo for servo in listening if self._replies(servo, target, 1)), None)
+            model = DynamixelSDKWrapper.MODEL_NUMBERS.get(servo.get('MODEL_NUMBER')) if servo is not None else None
+            if model is None or servo.get('FIRMWARE_VERSION') < DynamixelSDKWrapper.FAST_SYNC_READ_MIN_FW.get(model, 256):
+                break
+            if delay is None:
+                delay = servo.return_delay
+            data, error = servo.read(address, length)
+            piece = bytes([servo.status_error(error), target]) + (data if not error else bytes(length))
+            pieces += piece + _crc(0, piece, len(piece)).to_bytes(2, 'little')
+        if delay is None:
+            return []
+
+        # The last CRC is the packet CRC
+        packet = make_packet(BROADCAST_ID, INST_STATUS, pieces[:-2] if len(pieces) else b'')
+        complete = len(pieces) == len(targets) * (length + 4)
+        if not complete:
+            length_field = 1 + len(targets) * (length + 4)
+            packet = packet[:5] + length_field.to_bytes(2, 'little') + packet[7:-2]
+        return [(delay, packet)]
+
+    def _sync_write(self, listening, id_, params):
+        address, length = int.from_bytes(params[0:2], 'little'), int.from_bytes(params[2:4], 'little')
+        for offset in range(4, len(params) - length, length + 1):
+            for servo in self._addressed(listening, params[offset]):
+                servo.write(address, params[offset + 1:offset + 1 + length])
+        return []
+
+    def _bulk_read(self, listening, id_, params):
+        replies = []
+        for offset in range(0, len(params) - 4, 5):
+            target = params[offset]
+            address = int.from_bytes(params[offset + 1:offset + 3], 'little')
+            length = int.from_bytes(params[offset + 3:offset + 5], 'little')
+            for servo in listening:
+                if self._replies(servo, target, 1):
+                    data, error = servo.read(address, length)
+                    replies.append(self._status(servo, error, data))
+        return replies
+
+    def _bulk_write(self, listening, id_, params):
+        offset = 0
+        while offset + 5 <= len(params):
+            target = params[offset]
+            address = int.from_bytes(params[offset + 1:offset + 3], 'little')
+            length = int.from_bytes(params[offset + 3:offset + 5], 'little')
+            for servo in self._addressed(listening, target):
+                servo.write(address, params[offset + 5:offset + 5 + length])
+            offset += 5 + length
+        return []
+
+
+class SimulatedPortHandler(PortHandler):
+    """
+    In-process stand-in for the SDK's PortHandler, connected to a SimulatedBus instead of a serial port.
+    Writing blocks for the time the packet takes on the wire; status bytes become readable when the
+    real bus would have delivered them.
+    """
+
+    def __init__(self, port_name: str, bus: Optional[SimulatedBus] = None):
+        """
+        Initializes the SimulatedPortHandler.
+
+        Args:
+            port_name (str): The port name, 'sim://<name>'.
+            bus (SimulatedBus, optional): The bus to connect to. Defaults to get_bus(port_name).
+        """
+        super().__init__(port_name)
+        self.bus = get_bus(port_name) if bus is None else bus
+        self._rx = collections.deque()  # (arrival time, byte)
+        self._line_free = 0.0
+
+    def setupPort(self, cflag_baud):
+        self.is_open = True
+        self._rx.clear()
+        self.tx_time_per_byte = (1000.0 / self.baudrate) * 10.0
+        return True
+
+    def closePort(self):
+        self.is_open = False
+
+    def clearPort(self):
+        pass
+
+    def getBytesAvailable(self):
+        now = time.monotonic()
+        return sum(1 for arrival, _ in self._rx if arrival <= now)
+
+    def readPort(self, length):
+        now = time.monotonic()
+        data = bytearray()
+        while self._rx and len(data) < length and self._rx[0][0] <= now:
+            data.append(self._rx.popleft()[1])
+        return bytes(data)
+
+    def writePort(self, packet):
+        packet = bytes(packet)
+        byte_time = self.tx_time_per_byte / 1000.0 if self.bus.realtime else 0.0
+        now = time.monotonic()
+        tx_end = max(now, self._line_free) + len(packet) * byte_time
+        if tx_end > now:
+            time.sleep(tx_end - now)
+
+        # Status packets follow each other on the line, each after its servo's return delay
+        arrival = tx_end
+        for delay, reply in self.bus.process(packet, self.baudrate):
+            arrival += delay if self.bus.realtime else 0.0
+            for val in reply:
+                arrival += byte_time
+                self._rx.append((arrival, val))
+        self._line_free = arrival
+        return len(packet)
+
+
+_buses: Dict[str, SimulatedBus] = {}
+
+
+def get_bus(name: str, **kwargs) -> SimulatedBus:
+    """
+    Returns the simulated bus of that name, creating it on first use.
+
+    Args:
+        name (str): The bus name, with or without the 'sim://' prefix.
+        **kwargs: Passed to SimulatedBus when the bus is created.
+
+    Returns:
+        SimulatedBus: The bus.
+    """
+    if name.startswith(SIM_PREFIX):
+        name = name[len(SIM_PREFIX):]
+    if name not in _buses:
+        _buses[name] = SimulatedBus(**kwargs)
+    return _buses[name]
+
+
+def create_bus(name: str, **kwargs) -> SimulatedBus:
+    """
+    Creates (or replaces) the simulated bus of that name, e.g. to choose its servo IDs before opening it.
+
+    Args:
+        name (str): The bus name, with or without the 'sim://' prefix.
+        **kwargs: Passed to SimulatedBus.
+
+    Returns:
+        SimulatedBus: The bus.
+    """
+    if name.startswith(SIM_PREFIX):
+        name = name[len(SIM_PREFIX):]
+    _buses[name] = SimulatedBus(**kwargs)
+    return _buses[name]
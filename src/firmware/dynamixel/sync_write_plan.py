@@ -0,0 +1,75 @@
+
+"""
+This module precompiles sync writes: the packet parameters of a fixed set of servos and registers are
+laid out once in a preallocated buffer, so each command only packs its new values into it.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+class SyncWritePlan:
+    """
+    Sync write of adjacent registers to a fixed set of servos sharing their register layout, or the part
+    of a bulk write addressing them.
+
+    The parameter buffer holds one row per servo, [id, data of the first register, data of the next, ...],
+    bulk write rows also holding the start address and data length after the ID. These columns are
+    filled once; encode() converts each register's values of all servos in a single vectorized
+    little-endian pack.
+
+    Attributes:
+        ids (List[int]): The servo IDs, in packet order.
+        start_address (int): The address of the first register.
+        data_length (int): The number of bytes written to each servo.
+        param_length (int): The number of parameter bytes of the packet.
+        bulk (bool): Rows are bulk write parameters.
+    """
+
+    def __init__(self, ids: List[int], cmds: List[dict], bulk: bool = False):
+        """
+        Initializes the SyncWritePlan.
+
+        Args:
+            ids (List[int]): The servo IDs.
+            cmds (List[dict]): The registers ({'ADDR', 'LEN'}), adjacent and in address order.
+            bulk (bool, optional): Lay the rows out as bulk write parameters. Defaults to False.
+
+        Raises:
+            ValueError: If the registers are not adjacent.
+        """
+        self.ids = list(ids)
+        self.bulk = bulk
+        self.start_address = cmds[0]['ADDR']
+        self._columns = []
+        prefix = 5 if bulk else 1  # id (, start address, data length)
+        offset = prefix
+        for cmd in cmds:
+            if cmd['ADDR'] != self.start_address + offset - prefix:
+                raise ValueError(f"Registers are not adjacent at address {cmd['ADDR']}")
+            self._columns.append((offset, cmd['LEN']))
+            offset += cmd['LEN']
+        self.data_length = offset - prefix
+
+        self._params = np.zeros((len(self.ids), prefix + self.data_length), dtype=np.uint8)
+        self._params[:, 0] = self.ids
+        if bulk:
+            self._params[:, 1:5] = list(self.start_address.to_bytes(2, 'little') + self.data_length.to_bytes(2, 'little'))
+        self.param_length = self._params.size
+
+    def encode(self, *values) -> List[int]:
+        """
+        Packs the values of each register into the parameter buffer.
+
+        Args:
+            *values (array_like): One array per register, with one value per servo in packet order.
+
+        Returns:
+            List[int]: The packet parameters.
+        """
+        for (offset, length), column in zip(self._columns, values):
+            # Two's complement little-endian bytes, the low `length` of them fit signed and unsigned registers
+            packed = np.ascontiguousarray(column, dtype='<i8').view(np.uint8).reshape(-1, 8)
+            self._params[:, offset:offset + length] = packed[:, :length]
+        return self._params.ravel().tolist()
@@ -0,0 +1,232 @@
+
+"""
+This module polls servo telemetry on a background thread and keeps a history of it in a
+preallocated ring buffer, so readers never have to touch the serial port themselves.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import CancelledError
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bus_arbiter import BusArbiter, TELEMETRY
+from clock_sync import ClockSync
+
+TELEMETRY_FIELDS = [
+    'PRESENT_POSITION',
+    'PRESENT_VELOCITY',
+    'PRESENT_CURRENT',
+    'PRESENT_TEMPERATURE',
+    'PRESENT_INPUT_VOLTAGE',
+]
+
+
+class TelemetryBuffer:
+    """
+    Lock-protected ring buffer holding the last `capacity` telemetry samples of a set of servos.
+
+    Attributes:
+        ids (List[int]): The servo IDs, in buffer order.
+        fields (List[str]): The control table registers stored for each servo, in buffer order.
+        capacity (int): The number of samples kept.
+    """
+
+    def __init__(self, ids: List[int], fields: List[str] = TELEMETRY_FIELDS, capacity: int = 1000):
+        """
+        Initializes the TelemetryBuffer.
+
+        Args:
+            ids (List[int]): The servo IDs.
+            fields (List[str], optional): The registers stored per servo. Defaults to TELEMETRY_FIELDS.
+            capacity (int, optional): The number of samples kept. Defaults to 1000.
+        """
+        self.ids: List[int] = list(ids)
+        self.fields: List[str] = list(fields)
+        self.capacity: int = capacity
+        self.id_index: Dict[int, int] = {id_: i for i, id_ in enumerate(self.ids)}
+        self.field_index: Dict[str, int] = {field: i for i, field in enumerate(self.fields)}
+
+        # Missing responses are stored as NaN
+        self._data = np.full((capacity, len(self.ids), len(self.fields)), np.nan)
+        self._timestamps = np.zeros(capacity)
+        self._sample = np.full((len(self.ids), len(self.fields)), np.nan)
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp: float, readings: Dict[int, Dict[str, int]]) -> None:
+        """
+        Stores one sample.
+
+        Args:
+            timestamp (float): The sample time (time.monotonic()), aligned on the servo clocks when synchronized.
+            readings (Dict[int, Dict[str, int]]): {id: {register: value}} as returned by the sync read.
+        """
+        sample = self._sample
+        sample.fill(np.nan)
+        for id_, values in readings.items():
+            row = self.id_index.get(id_)
+            if row is None:
+                continue
+            for field, val in values.items():
+                col = self.field_index.get(field)
+                if col is not None:
+                    sample[row, col] = val
+
+        with self._lock:
+            self._data[self._head] = sample
+            self._timestamps[self._head] = timestamp
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def latest(self) -> Tuple[Optional[float], Optional[np.ndarray]]:
+        """
+        Returns the most recent sample.
+
+        Returns:
+            Tuple[float, np.ndarray]: (timestamp, array of shape (len(ids), len(fields))), or (None, None) if empty.
+        """
+        with self._lock:
+            if self._count == 0:
+                return None, None
+            idx = (self._head - 1) % self.capacity
+            return float(self._timestamps[idx]), self._data[idx].copy()
+
+    def latest_dict(self) -> Dict[int, Dict[str, float]]:
+        """
+        Returns the most recent sample as {id: {register: value}}.
+
+        Returns:
+            Dict[int, Dict[str, float]]: The latest values, empty if no sample was stored yet.
+        """
+        _, data = self.latest()
+        if data is None:
+            return {}
+        return {
+            id_: {field: data[row, col] for field, col in self.field_index.items()}
+            for id_, row in self.id_index.items()
+        }
+
+    def window(self, duration: Optional[float] = None, end: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the samples of a time window, oldest first.
+
+        Args:
+            duration (float, optional): The window length in seconds. Defaults to the whole buffer.
+            end (float, optional): The end of the window (time.monotonic()). Defaults to the latest sample.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (timestamps of shape (N,), data of shape (N, len(ids), len(fields))).
+        """
+        with self._lock:
+            order = (np.arange(self._count) + self._head - self._count) % self.capacity
+            timestamps = self._timestamps[order]
+            data = self._data[order]
+
+        if len(timestamps) == 0:
+            return timestamps, data
+        if end is None:
+            end = timestamps[-1]
+        start = -np.inf if duration is None else end - duration
+        mask = (timestamps >= start) & (timestamps <= end)
+        return timestamps[mask], data[mask]
+
+    def clear(self) -> None:
+        """Drops all samples."""
+        with self._lock:
+            self._head = 0
+            self._count = 0
+
+
+class TelemetryPoller(threading.Thread):
+    """
+    Thread polling telemetry registers of all servos with one sync read per bus and cycle at a fixed rate.
+
+    Attributes:
+        dxl (DynamixelSDKWrapper): The first polled bus.
+        buses (list): Every polled bus.
+        buffer (TelemetryBuffer): Where the samples are stored.
+        rate_hz (float): The polling rate.
+        clock (ClockSync): The servo clock models stamping the samples, None to stamp them on reception.
+    """
+
+    def __init__(self, dxl, ids: Optional[List[int]] = None, fields: List[str] = TELEMETRY_FIELDS,
+                 rate_hz: float = 20.0, capacity: int = 1000, clock: Optional[ClockSync] = None):
+        """
+        Initializes the TelemetryPoller.
+
+        Args:
+            dxl (DynamixelSDKWrapper, BusArbiter or list of them): The bus(es) to poll. Through a BusArbiter, polls are
+                queued as TELEMETRY. Several buses are read concurrently and merged into one sample.
+            ids (List[int], optional): The servo IDs to poll. Defaults to every registered servo.
+            fields (List[str], optional): The registers to poll. Defaults to TELEMETRY_FIELDS.
+            rate_hz (float, optional): The polling rate. Defaults to 20 Hz.
+            capacity (int, optional): The number of samples kept. Defaults to 1000.
+            clock (ClockSync, optional): Stamp each sample with the REALTIME_TICK read along with it, converted
+                into host time, instead of the time it is received. Defaults to None.
+        """
+        super().__init__(daemon=True)
+        self.buses = list(dxl) if isinstance(dxl, (list, tuple)) else [dxl]
+        self.dxl = self.buses[0]
+        self.ids = [id_ for bus in self.buses for id_ in bus.servos.keys()] if ids is None else list(ids)
+        self._bus_ids = [[id_ for id_ in self.ids if id_ in bus.servos] for bus in self.buses]
+        self.fields = list(fields)
+        self.rate_hz = rate_hz
+        self.buffer = TelemetryBuffer(self.ids, self.fields, capacity)
+        self.clock = clock
+        self._read_fields = self.fields + ['REALTIME_TICK'] if clock is not None and 'REALTIME_TICK' not in self.fields else self.fields
+        self.stop_event = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def poll(self) -> None:
+        """Reads one sample from the bus(es) and stores it."""
+        readings, futures = {}, []
+        for bus, ids in zip(self.buses, self._bus_ids):
+            if len(ids) == 0:
+                continue
+            if isinstance(bus, BusArbiter):
+                futures.append(bus.submit(TELEMETRY, 'read_states_sync', ids, self._read_fields))
+            else:
+                with bus.retry_as('telemetry'):
+                    readings.update(bus.read_states_sync(ids, self._read_fields))
+
+        dropped = 0
+        for future in futures:
+            try:
+                readings.update(future.result())
+            except CancelledError:
+                dropped += 1  # Dropped by the arbiter, bus busy with higher priority work
+        if futures and dropped == len(futures) and len(readings) == 0:
+            return
+        received = time.monotonic()
+        timestamp = self.clock.stamp(readings, received) if self.clock is not None else None
+        self.buffer.append(received if timestamp is None else timestamp, readings)
+
+    def run(self):
+        self.logger.info(f"Telemetry started: {len(self.ids)} servos on {len(self.buses)} bus(es) @ {self.rate_hz} Hz")
+        period = 1.0 / self.rate_hz
+        next_time = time.monotonic()
+
+        while not self.stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                self.logger.error(f"Telemetry poll failed: {e}")
+
+            # Fixed rate: skip missed cycles instead of bursting to catch up
+            next_time += period
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now
+            self.stop_event.wait(next_time - now)
+
+        self.logger.info("Telemetry stopped")
+
+    def stop(self):
+        self.stop_event.set()  # Signal thread to stop
@@ -0,0 +1,106 @@
+"""
+Shared fixtures: every test runs against the in-process simulated bus (sim_bus), each on its own
+sim:// port so the register files of one test never leak into another.
+"""
+
+import itertools
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src', 'control'), os.path.join(ROOT, 'src', 'firmware', 'dynamixel')]
+
+import sim_bus  # noqa: E402
+from DynamixelSDKWrapper import DynamixelSDKWrapper  # noqa: E402
+from Hand import Hand  # noqa: E402
+
+BAUDRATE = 1000000
+
+_port_numbers = itertools.count()
+
+
+def new_port() -> str:
+    return f'sim://test{next(_port_numbers)}'
+
+
+def servo_specs(ids, model: str = 'XC330') -> dict:
+    """add_servo_batch() specs of servos in extended position mode (no position limits needed)."""
+    return {f'servo{id_}': {'id': id_, 'model': model, 'op_mode': 'extended_pos', 'reverse_mode': False} for id_ in ids}
+
+
+def transactions(stats) -> dict:
+    """{command: number of transactions} of a BusStats snapshot."""
+    return {command: entry['transactions'] for command, entry in stats.snapshot()['commands'].items()}
+
+
+def joint_params(id_: int) -> dict:
+    return {'id': id_, 'min': 2000, 'int': 2000, 'max': 4000, 'min_deg': 0, 'max_deg': 90, 'reverse': False, 'offset': 0}
+
+
+# Two fingers of two joints, enough to split the hand across two ports
+FINGER_PARAMS = {
+    'index': {'mcp': joint_params(1), 'pip': joint_params(2)},
+    'ring': {'mcp': joint_params(3), 'pip': joint_params(4)},
+}
+
+
+@pytest.fixture
+def sim_dxl():
+    """
+    Factory of (SimulatedBus, DynamixelSDKWrapper) pairs on a new simulated port.
+
+    make(ids, baudrate=BAUDRATE, configure=True) creates the bus with the servos ids, opens a wrapper
+    at baudrate and, unless configure is False, registers and configures every servo.
+    """
+    opened = []
+
+    def make(ids, baudrate: int = BAUDRATE, configure: bool = True):
+        port = new_port()
+        bus = sim_bus.create_bus(port, ids=list(ids), baudrate=baudrate)
+        dxl = DynamixelSDKWrapper(port=port, baudrate=baudrate)
+        opened.append(dxl)
+        if configure:
+            assert dxl.add_servo_batch(servo_specs(ids)) == list(ids)
+        return bus, dxl
+
+    yield make
+    for dxl in opened:
+        dxl.close_port()
+    opened.clear()
+
+
+def close_hand(hand: Hand) -> None:
+    hand.stop_telemetry()
+    for bus in hand.buses.values():
+        bus.stop()
+        bus.dxl.close_port()
+
+
+@pytest.fixture
+def make_hand(tmp_path, monkeypatch):
+    """
+    Factory of Hands with the fingers of FINGER_PARAMS, parameters and shadows kept in tmp_path.
+
+    make(ports) opens a Hand on {port: [finger names]}; the simulated buses must exist beforehand.
+    """
+    param_file = tmp_path / 'finger_params.json'
+    param_file.write_text(json.dumps(FINGER_PARAMS))
+    monkeypatch.setattr(Hand, 'finger_names', list(FINGER_PARAMS.keys()))
+    monkeypatch.setattr(Hand, 'fingers', {})
+    monkeypatch.setattr(Hand, 'baudrate', BAUDRATE)
+    monkeypatch.setattr(Hand, 'param_file_path', str(param_file))
+    monkeypatch.setattr(Hand, 'shadow_file_path', str(tmp_path / 'servo_shadow.json'))
+    hands = []
+
+    def make(ports: dict) -> Hand:
+        hand = Hand(ports=ports)
+        hands.append(hand)
+        return hand
+
+    yield make
+    for hand in hands:
+        close_hand(hand)
+    hands.clear()
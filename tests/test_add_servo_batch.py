@@ -0,0 +1,37 @@
+"""Batched servo configuration."""
+
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+
+from conftest import servo_specs, transactions
+
+
+def test_configuration_does_not_grow_with_the_servo_count(sim_dxl):
+    counts = []
+    for ids in ([1, 2], [1, 2, 3, 4, 5, 6]):
+        bus, dxl = sim_dxl(ids, configure=False)
+        stats = dxl.enable_stats()
+        assert dxl.add_servo_batch(servo_specs(ids)) == ids
+        counts.append(sum(transactions(stats).values()))
+        assert [bus.servo(id_).get('OPERATING_MODE') for id_ in ids] == [DynamixelSDKWrapper.OPERATING_MODES['extended_pos']] * len(ids)
+        assert all(bus.servo(id_).get('SECONDARY_ID') == 252 for id_ in ids)
+    assert counts[0] == counts[1]
+
+
+def test_servos_without_op_mode_get_position_mode_and_limits(sim_dxl):
+    bus, dxl = sim_dxl([1, 2], configure=False)
+    specs = {'servo1': {'id': 1, 'model': 'XC330', 'pos_limit': [100, 3000]},
+             'servo2': {'id': 2, 'model': 'XC330', 'op_mode': 'position', 'pos_limit': [200, 2500]}}
+
+    assert dxl.add_servo_batch(specs) == [1, 2]
+    assert dxl.servos[1].operating_mode == 'position'
+    assert bus.servo(1).get('OPERATING_MODE') == DynamixelSDKWrapper.OPERATING_MODES['position']
+    assert [(bus.servo(id_).get('MIN_POSITION_LIMIT'), bus.servo(id_).get('MAX_POSITION_LIMIT')) for id_ in (1, 2)] == \
+        [(100, 3000), (200, 2500)]
+    assert dxl.servos[1].position_limits == {'min': 100, 'max': 3000}
+
+
+def test_servos_in_position_mode_need_limits(sim_dxl):
+    _, dxl = sim_dxl([1, 2], configure=False)
+    specs = {'servo1': {'id': 1, 'model': 'XC330'}, 'servo2': {'id': 2, 'model': 'XC330', 'op_mode': 'extended_pos'}}
+    assert dxl.add_servo_batch(specs) == [2]
+    assert sorted(dxl.servos.keys()) == [2]
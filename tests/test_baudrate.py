@@ -0,0 +1,95 @@
+"""Baud rate migration and discovery."""
+
+import time
+
+from dynamixel_sdk.robotis_def import INST_WRITE
+
+import control_table
+import sim_bus
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+from Hand import Hand
+
+from conftest import BAUDRATE, close_hand, new_port
+
+BAUD_RATE_ADDR = control_table.CONTROL_TABLE_XC_330['BAUD_RATE']['ADDR']
+
+
+def test_migrate_baudrate(sim_dxl):
+    bus, dxl = sim_dxl([1, 2, 3])
+    assert dxl.migrate_baudrate(2000000)
+    assert dxl.baudrate == 2000000
+    assert [servo.baudrate for servo in bus.servos] == [2000000] * 3
+    assert sorted(dxl.read_states_sync().keys()) == [1, 2, 3]
+
+
+def test_migrate_baudrate_rolls_back_when_a_servo_is_lost(sim_dxl):
+    bus, dxl = sim_dxl([1, 2, 3])
+    bus.servo(2).read_only = (BAUD_RATE_ADDR, BAUD_RATE_ADDR + 1)  # refuses the new rate
+
+    assert not dxl.migrate_baudrate(2000000)
+    assert dxl.baudrate == BAUDRATE
+    assert [servo.baudrate for servo in bus.servos] == [BAUDRATE] * 3
+    assert sorted(dxl.read_states_sync().keys()) == [1, 2, 3]
+
+
+def test_baud_rate_write_is_not_repeated_when_its_answer_is_lost(sim_dxl, monkeypatch):
+    bus, dxl = sim_dxl([1, 2, 3])
+    process = bus.process
+    writes = []
+
+    # The servos switch rate, but their answers to the BAUD_RATE write never arrive
+    def lossy_process(packet, baudrate):
+        replies = process(packet, baudrate)
+        parsed, _ = sim_bus.parse_packet(packet)
+        if parsed is not None and parsed[1] == INST_WRITE and parsed[2][:2] == BAUD_RATE_ADDR.to_bytes(2, 'little'):
+            writes.append(parsed[0])
+            return []
+        return replies
+
+    monkeypatch.setattr(bus, 'process', lossy_process)
+    assert dxl.migrate_baudrate(2000000)
+    assert writes == [1, 2, 3]
+    assert [servo.baudrate for servo in bus.servos] == [2000000] * 3
+
+
+def test_discover_baudrate_gathers_a_split_chain(sim_dxl):
+    bus, dxl = sim_dxl([1, 2], configure=False)
+    bus.add_servo(sim_bus.SimulatedServo(3, baudrate=57600))
+
+    assert dxl.discover_baudrate([1, 2, 3]) == BAUDRATE
+    assert dxl.baudrate == BAUDRATE
+    assert [servo.baudrate for servo in bus.servos] == [BAUDRATE] * 3
+
+
+def test_discover_baudrate_finds_servos_at_another_rate():
+    port = new_port()
+    bus = sim_bus.create_bus(port, ids=[1, 2], baudrate=57600)
+    dxl = DynamixelSDKWrapper(port=port, baudrate=BAUDRATE)
+    try:
+        assert dxl.discover_baudrate([1, 2]) == 57600
+        assert dxl.baudrate == 57600
+
+        bus.remove_servo(2)
+        start = time.monotonic()
+        assert dxl.discover_baudrate([1, 2]) == DynamixelSDKWrapper.INVALID_INT_VAL
+        assert dxl.baudrate == 57600  # left where servo 1 answered
+        assert time.monotonic() - start < 30.0
+    finally:
+        dxl.close_port()
+
+
+def test_hand_follows_its_migrated_servos(make_hand):
+    port = new_port()
+    bus = sim_bus.create_bus(port, ids=[1, 2, 3, 4], baudrate=BAUDRATE)
+    ports = {port: ['index', 'ring']}
+    hand = make_hand(ports)
+    assert hand.migrate_baudrate(2000000)
+    assert hand.baudrate == 2000000 and Hand.baudrate == BAUDRATE
+    assert [servo.baudrate for servo in bus.servos] == [2000000] * 4
+    close_hand(hand)
+
+    # Opened at the rate of the code, the next hand searches the servos at every rate
+    hand = make_hand(ports)
+    assert hand.dxl.baudrate == 2000000
+    assert hand.unconfigured == {port: set()}
+    assert sorted(hand.dxl.servos.keys()) == [1, 2, 3, 4]
@@ -0,0 +1,73 @@
+"""Bulk writes and reads of servos whose models lay their registers out differently."""
+
+import pytest
+
+import control_table
+import sim_bus
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+
+from conftest import BAUDRATE, servo_specs, transactions
+
+# The XC330 table with every RAM register two bytes further, so no register shares its XC330 address
+CONTROL_TABLE_SHIFTED = {name: dict(entry, ADDR=entry['ADDR'] + 2 if entry['ADDR'] > 20 else entry['ADDR'])
+                         for name, entry in control_table.CONTROL_TABLE_XC_330.items()}
+
+
+@pytest.fixture
+def mixed_dxl(sim_dxl, monkeypatch):
+    """XC330 servos 1 and 2 with servo 3 of a model whose registers sit at other addresses."""
+    monkeypatch.setitem(DynamixelSDKWrapper.CONTROL_TABLES, 'XTEST', CONTROL_TABLE_SHIFTED)
+    monkeypatch.setitem(DynamixelSDKWrapper.MODEL_NUMBERS, 9999, 'XTEST')
+    monkeypatch.setitem(DynamixelSDKWrapper.REGISTER_BLOCKS, 'XTEST', control_table.REGISTER_BLOCKS_XC_330)
+    bus, dxl = sim_dxl([1, 2])
+    defaults = dict(sim_bus.XC330_DEFAULTS, MODEL_NUMBER=9999)
+    bus.add_servo(sim_bus.SimulatedServo(3, baudrate=BAUDRATE, table=CONTROL_TABLE_SHIFTED, defaults=defaults,
+                                         position=3000))
+    assert dxl.add_servo_batch(servo_specs([3], 'XTEST')) == [3]
+    return bus, dxl
+
+
+def test_mixed_addresses_are_written_with_bulk_writes(mixed_dxl):
+    bus, dxl = mixed_dxl
+    stats = dxl.enable_stats()
+    assert dxl.set_torque([1, 2, 3], 1)
+    assert dxl.set_goal_pos_sync([1, 2, 3], [100, 200, 300], [0, 0, 0])
+    assert 'SYNC_WRITE' not in transactions(stats) and transactions(stats)['BULK_WRITE'] >= 2
+
+    assert [bus.servo(id_).get('TORQUE_ENABLE') for id_ in (1, 2, 3)] == [1, 1, 1]
+    assert [bus.servo(id_).get('GOAL_POSITION') for id_ in (1, 2, 3)] == [100, 200, 300]
+
+
+def test_mixed_addresses_are_read_with_bulk_reads(mixed_dxl):
+    bus, dxl = mixed_dxl
+    for id_ in (1, 2, 3):
+        bus.servo(id_).set('PRESENT_TEMPERATURE', 30 + id_)
+    stats = dxl.enable_stats()
+
+    states = dxl.read_states_sync([1, 2, 3])
+    block = dxl.read_block([1, 2, 3], 'STATE')
+    assert transactions(stats) == {'BULK_READ': 2}
+    for id_ in (1, 2, 3):
+        assert states[id_]['PRESENT_POSITION'] == block[id_].present_position == (3000 if id_ == 3 else 2048)
+        assert block[id_].present_temperature == 30 + id_
+
+
+def test_bulk_read_mixed_models(sim_dxl):
+    bus, dxl = sim_dxl([1, 2])
+    defaults = dict(sim_bus.XC330_DEFAULTS, MODEL_NUMBER=1020)
+    bus.add_servo(sim_bus.SimulatedServo(5, baudrate=BAUDRATE, table=control_table.CONTROL_TABLE_XM_430, defaults=defaults))
+    assert dxl.add_servo_batch(servo_specs([5], 'XM430')) == [5]
+    stats = dxl.enable_stats()
+
+    requests = {1: ['PRESENT_POSITION'], 5: ['PRESENT_CURRENT', 'PRESENT_TEMPERATURE']}
+    for _ in range(2):
+        readings = dxl.bulk_read(requests)
+        assert readings == {1: {'PRESENT_POSITION': bus.servo(1).get('PRESENT_POSITION')},
+                            5: {'PRESENT_CURRENT': bus.servo(5).get('PRESENT_CURRENT'),
+                                'PRESENT_TEMPERATURE': bus.servo(5).get('PRESENT_TEMPERATURE')}}
+    assert transactions(stats) == {'BULK_READ': 2}
+    assert len([key for key in dxl._plans if key[0] == 'bulk_read']) == 1
+
+    # A servo not answering is left out, the others are still read
+    bus.remove_servo(5)
+    assert sorted(dxl.bulk_read(requests).keys()) == [1]
@@ -0,0 +1,66 @@
+"""BusArbiter scheduling."""
+
+import threading
+
+import pytest
+
+import sim_bus
+from bus_arbiter import BusArbiter, CONFIG, MOTION, SAFETY, TELEMETRY
+
+
+@pytest.fixture
+def arbiter(sim_dxl):
+    _, dxl = sim_dxl([1, 2])
+    arbiter = BusArbiter(dxl)
+    yield arbiter
+    arbiter.stop()
+
+
+def hold(arbiter: BusArbiter) -> threading.Event:
+    """Keeps the owner thread busy until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+    arbiter.submit(CONFIG, lambda: started.set() or release.wait(5.0))
+    assert started.wait(5.0)
+    return release
+
+
+def test_higher_classes_run_first(arbiter):
+    order = []
+    release = hold(arbiter)
+    futures = [arbiter.submit(priority, order.append, name)
+               for priority, name in ((CONFIG, 'config'), (TELEMETRY, 'telemetry'), (SAFETY, 'safety'),
+                                      (MOTION, 'motion'), (SAFETY, 'safety 2'))]
+    release.set()
+    for future in futures:
+        future.result(5.0)
+    assert order == ['motion', 'safety', 'safety 2', 'telemetry', 'config']
+
+
+def test_telemetry_over_budget_is_dropped(arbiter):
+    arbiter.budgets_ms[TELEMETRY] = 10.0
+    release = hold(arbiter)
+    telemetry = arbiter.submit(TELEMETRY, 'read_states_sync', [1, 2])
+    safety = arbiter.submit(SAFETY, 'read_states_sync', [1, 2])
+    threading.Event().wait(0.05)
+    release.set()
+
+    assert sorted(safety.result(5.0).keys()) == [1, 2]
+    assert telemetry.cancelled()
+    stats = arbiter.stats()
+    assert stats['telemetry']['dropped'] == 1 and stats['telemetry']['executed'] == 0
+    assert stats['safety']['overruns'] == 1 and stats['safety']['executed'] == 1
+
+
+def test_calls_from_the_owner_thread_run_inline(arbiter):
+    # Waiting on a queued request from the owner thread would deadlock
+    nested = arbiter.submit(CONFIG, lambda: arbiter.ping(1))
+    assert nested.result(5.0) == sim_bus.XC330_DEFAULTS['MODEL_NUMBER']
+
+
+def test_wrapper_methods_are_called_through_the_owner_thread(arbiter):
+    threads = []
+    arbiter.dxl.read_states_sync = lambda *args: threads.append(threading.current_thread()) or {}
+    assert arbiter.read_states_sync([1, 2]) == {}
+    assert threads == [arbiter._thread]
+    assert arbiter.stats()['safety']['executed'] == 1
+
@@ -0,0 +1,84 @@
+"""Bus instrumentation."""
+
+import logging
+import time
+
+from dynamixel_sdk import COMM_RX_CORRUPT, COMM_RX_TIMEOUT, COMM_TX_FAIL
+
+from bus_stats import BusStats
+
+
+def test_bytes_on_the_wire_are_counted(sim_dxl):
+    _, dxl = sim_dxl([1, 2])
+    stats = dxl.enable_stats()
+    assert dxl.ping(1) > 0
+    assert dxl.set_torque([1, 2], 1)
+
+    snapshot = stats.snapshot()
+    ping, sync_write = snapshot['commands']['PING'], snapshot['commands']['SYNC_WRITE']
+    assert (ping['tx_bytes'], ping['rx_bytes']) == (10, 14)  # instruction packet, status with model and firmware
+    assert (sync_write['tx_bytes'], sync_write['rx_bytes']) == (18, 0)  # address, length, two (ID, value) pairs
+    assert (snapshot['tx_bytes'], snapshot['rx_bytes']) == (28, 14)
+
+
+def test_timeouts_are_counted_per_command_and_servo(sim_dxl):
+    bus, dxl = sim_dxl([1, 2])
+    dxl.use_fast_sync_read = False
+    stats = dxl.enable_stats()
+    assert dxl.ping(9) == dxl.INVALID_INT_VAL
+
+    snapshot = stats.snapshot()
+    attempts = snapshot['commands']['PING']['transactions']
+    assert attempts >= 1 and snapshot['commands']['PING']['timeouts'] == attempts
+    assert snapshot['servos'][9]['timeouts'] == attempts
+
+    bus.remove_servo(2)
+    stats.reset()
+    assert sorted(dxl.read_states_sync([1, 2]).keys()) == [1]
+    servos = stats.snapshot()['servos']
+    assert servos[1]['transactions'] == 1 and servos[1]['timeouts'] == 0
+    assert servos[2]['timeouts'] >= 1
+
+
+def test_latency_histogram_and_error_counters():
+    stats = BusStats()
+    stats.record('READ', (time.perf_counter() - 0.003, 0, 0), ids=1)
+    stats.record('READ', (time.perf_counter() - 0.0001, 0, 0), COMM_RX_CORRUPT, ids=1)
+    stats.record('READ', stats.begin(), COMM_TX_FAIL, ids=[1, 2])
+    stats.record('READ', stats.begin(), error=0x07, ids=2)
+    stats.record_servo(3, (time.perf_counter() - 0.02, 0, 0), COMM_RX_TIMEOUT)
+
+    snapshot = stats.snapshot()
+    read = snapshot['commands']['READ']
+    assert read['transactions'] == 4
+    assert (read['corrupt'], read['comm_errors'], read['servo_errors'], read['timeouts']) == (1, 1, 1, 0)
+    assert read['histogram'][4.0] == 1 and read['histogram'][0.25] >= 2
+    assert sum(read['histogram'].values()) == 4
+    assert 3.0 <= read['max_ms'] < 4.0
+    assert snapshot['servos'][1]['transactions'] == 3 and snapshot['servos'][2]['transactions'] == 2
+    assert snapshot['servos'][3]['timeouts'] == 1 and snapshot['servos'][3]['histogram'][32.0] == 1
+
+
+def test_detached_port_handler_is_restored(sim_dxl):
+    _, dxl = sim_dxl([1])
+    write_port = dxl.port_handler.writePort
+    stats = dxl.enable_stats()
+    assert dxl.port_handler.writePort != write_port
+    dxl.disable_stats()
+    assert dxl.port_handler.writePort == write_port and dxl.stats is None
+
+    dxl.ping(1)
+    assert stats.snapshot()['tx_bytes'] == 0
+
+
+def test_reporter_logs_the_summary(sim_dxl, caplog):
+    _, dxl = sim_dxl([1])
+    with caplog.at_level(logging.INFO, logger='bus_stats'):
+        stats = dxl.enable_stats(log_interval=0.02)
+        dxl.ping(9)
+        time.sleep(0.1)
+        dxl.disable_stats()
+    reports = [record.getMessage() for record in caplog.records if record.name == 'bus_stats']
+    assert len(reports) >= 1
+    assert reports[-1].startswith(f'[{dxl.port}] Bus stats')
+    assert 'ID 9' in stats.summary()
@@ -0,0 +1,36 @@
+"""ServoClock drift fitting."""
+
+import pytest
+
+from clock_sync import MIN_DRIFT_BASELINE_S, ServoClock
+
+
+def feed(clock: ServoClock, drift_ppm: float, interval: float, count: int, start: float = 1000.0) -> None:
+    # Readings of a servo clock started at host time start, ticking whole milliseconds
+    for i in range(count):
+        host_time = start + i * interval
+        clock.add(int((host_time - start) * (1.0 + drift_ppm * 1e-6) * 1000.0), host_time)
+
+
+def test_short_baseline_keeps_the_nominal_rate():
+    clock = ServoClock()
+    feed(clock, drift_ppm=200.0, interval=0.1, count=50)
+    assert clock.rate == 1.0 and clock.drift_ppm == 0.0
+    assert clock.to_host(2500, 1002.5) == pytest.approx(1002.5, abs=1e-3)
+
+
+def test_drift_is_fitted_over_a_long_baseline():
+    clock = ServoClock()
+    interval = 0.5
+    feed(clock, drift_ppm=200.0, interval=interval, count=64)
+    assert 63 * interval >= MIN_DRIFT_BASELINE_S
+    assert clock.drift_ppm == pytest.approx(200.0, abs=20.0)
+    assert clock.residual_ms < 1.0
+
+
+def test_a_jump_of_the_servo_clock_restarts_the_fit():
+    clock = ServoClock()
+    feed(clock, drift_ppm=0.0, interval=0.1, count=10)
+    clock.add(0, 1001.0)  # rebooted
+    assert len(clock) == 1
+    assert clock.to_host(100, 1001.1) == pytest.approx(1001.1, abs=1e-3)
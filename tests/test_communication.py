@@ -0,0 +1,105 @@
+"""Retry classes and the outcome reported by the wrapper commands."""
+
+import numpy as np
+import pytest
+
+import sim_bus
+from bus_arbiter import BusArbiter, TELEMETRY
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+
+from conftest import BAUDRATE, new_port, transactions
+
+
+@pytest.fixture
+def retry_classes(monkeypatch):
+    """Records the command class each transaction was retried under."""
+    classes = []
+    retry_policy = DynamixelSDKWrapper._retry_policy
+
+    def spy(self):
+        classes.append(self._retry_class)
+        return retry_policy(self)
+
+    monkeypatch.setattr(DynamixelSDKWrapper, '_retry_policy', spy)
+    return classes
+
+
+def test_retry_class_follows_the_command(sim_dxl, retry_classes):
+    _, dxl = sim_dxl([1, 2])
+    for call, expected in ((lambda: dxl.set_goal_pos_sync([1, 2], [100, 200], [0, 0]), 'motion'),
+                           (lambda: dxl.read_states_sync([1, 2]), 'safety'),
+                           (lambda: dxl.read_realtime_tick([1, 2]), 'telemetry'),
+                           (lambda: dxl.set_pos_limits(1, 0, 4095), None)):
+        retry_classes.clear()
+        call()
+        assert len(retry_classes) > 0 and set(retry_classes) == {expected}
+    assert dxl._retry_class is None
+
+
+def test_retry_class_chosen_by_the_caller(sim_dxl, retry_classes):
+    _, dxl = sim_dxl([1, 2])
+    retry_classes.clear()
+    with dxl.retry_as('telemetry'):
+        dxl.read_states_sync([1, 2])
+    assert set(retry_classes) == {'telemetry'}
+
+    retry_classes.clear()
+    arbiter = BusArbiter(dxl)
+    try:
+        arbiter.submit(TELEMETRY, 'read_states_sync', [1, 2]).result()
+    finally:
+        arbiter.stop()
+    assert set(retry_classes) == {'telemetry'}
+    assert dxl._retry_class is None
+
+
+def test_servo_errors_are_not_retried(sim_dxl, monkeypatch):
+    bus, dxl = sim_dxl([1, 2, 3])
+    dxl.use_fast_sync_read = False
+    stats = dxl.enable_stats()
+    monkeypatch.setattr(bus.servo(2), 'read', lambda address, length: (b'', sim_bus.ERR_DATA_RANGE))
+
+    states = dxl.read_states_sync([1, 2, 3])
+    assert sorted(states.keys()) == [1, 3]
+    assert transactions(stats) == {'SYNC_READ': 1}
+
+
+def test_set_operating_mode_reports_failed_writes(sim_dxl):
+    bus, dxl = sim_dxl([1, 2])
+    bus.remove_servo(2)
+
+    assert not dxl.set_operating_mode([1, 2], 'position')
+    assert dxl.servos[1].operating_mode == 'position'
+    assert dxl.servos[2].operating_mode == 'extended_pos'
+    assert bus.servo(1).get('OPERATING_MODE') == DynamixelSDKWrapper.OPERATING_MODES['position']
+
+
+def test_goals_outside_the_position_limits_are_reported(sim_dxl):
+    bus, dxl = sim_dxl([1, 2])
+    dxl.servos[2].position_limits = {'min': 0, 'max': 4095}
+    goal = bus.servo(2).get('GOAL_POSITION')
+
+    assert dxl.send_goal_pos_sync([1, 2], [5000, 5000], [0, 0]) == [1]
+    assert not dxl.set_goal_pos_sync([1, 2], [6000, 6000], [0, 0])
+    assert [bus.servo(id_).get('GOAL_POSITION') for id_ in (1, 2)] == [6000, goal]
+    assert dxl.set_goal_pos_sync([1, 2], [100, 200], [0, 0])
+
+
+def test_move_hand_acknowledges_only_the_goals_sent(make_hand):
+    port = new_port()
+    bus = sim_bus.create_bus(port, ids=[1, 2, 3, 4], baudrate=BAUDRATE)
+    hand = make_hand({port: ['index', 'ring']})
+    hand.dxl.servos[4].position_limits = {'min': 0, 'max': 3500}
+    goal = bus.servo(4).get('GOAL_POSITION')
+
+    hand.update_hand_joints(np.full(len(hand.mapper), 90.0))
+    assert not hand.move_hand(t_exec=0)
+    assert [bus.servo(id_).get('GOAL_POSITION') for id_ in (1, 2, 3, 4)] == [4000, 4000, 4000, goal]
+    assert list(hand.fingers['index'].get_dirty_joints()) == []
+    assert list(hand.fingers['ring'].get_dirty_joints()) == ['pip']
+
+    # The goal left out is sent again once it fits
+    hand.dxl.servos[4].position_limits = {'min': 0, 'max': 4095}
+    assert hand.move_hand(t_exec=0)
+    assert bus.servo(4).get('GOAL_POSITION') == 4000
+    assert list(hand.fingers['ring'].get_dirty_joints()) == []
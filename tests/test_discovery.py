@@ -0,0 +1,84 @@
+"""Servo discovery, inventory and servos missing from the bus."""
+
+import numpy as np
+
+import control_table
+import sim_bus
+
+from conftest import BAUDRATE, new_port, servo_specs
+
+
+def garble_replies_of(bus, monkeypatch, id_: int, count: int = None) -> None:
+    """Corrupts the CRC of the status packets of a servo ID, all of them or only the first `count`."""
+    process = bus.process
+    garbled = [0]
+
+    def noisy_process(packet, baudrate):
+        replies = []
+        for delay, reply in process(packet, baudrate):
+            if reply[4] == id_ and (count is None or garbled[0] < count):
+                reply = reply[:-1] + bytes([reply[-1] ^ 0x5A])
+                garbled[0] += 1
+            replies.append((delay, reply))
+        return replies
+
+    monkeypatch.setattr(bus, 'process', noisy_process)
+
+
+def test_check_inventory_reports_every_difference(sim_dxl):
+    bus, dxl = sim_dxl([1, 2, 5, 6], configure=False)
+    bus.add_servo(sim_bus.SimulatedServo(2, baudrate=BAUDRATE))
+    defaults = dict(sim_bus.XC330_DEFAULTS, MODEL_NUMBER=1020)
+    bus.add_servo(sim_bus.SimulatedServo(3, baudrate=BAUDRATE, table=control_table.CONTROL_TABLE_XM_430, defaults=defaults))
+
+    inventory = dxl.check_inventory(servo_specs([1, 2, 3, 4, 6]))
+    assert inventory == {'missing': [4], 'unexpected': [5], 'duplicate': [2], 'wrong_model': [3]}
+
+
+def test_discover_attributes_colliding_answers_to_their_id(sim_dxl, monkeypatch):
+    # Two servos sharing ID 3 answer at the same time: every status packet of ID 3 arrives garbled
+    bus, dxl = sim_dxl([1, 2, 3, 5], configure=False)
+    garble_replies_of(bus, monkeypatch, 3)
+
+    found = dxl.discover(max_id=5)
+    assert {id_: entry['count'] for id_, entry in found.items()} == {1: 1, 2: 1, 3: 2, 5: 1}
+    assert found[3]['model_number'] is None
+
+
+def test_discover_tells_line_noise_from_a_collision(sim_dxl, monkeypatch):
+    bus, dxl = sim_dxl([1, 2, 3, 5], configure=False)
+    garble_replies_of(bus, monkeypatch, 3, count=1)
+
+    found = dxl.discover(max_id=5)
+    assert {id_: entry['count'] for id_, entry in found.items()} == {1: 1, 2: 1, 3: 1, 5: 1}
+    assert found[3]['model_number'] == bus.servo(3).get('MODEL_NUMBER')
+    assert dxl.check_inventory(servo_specs([1, 2, 3, 5]), found)['duplicate'] == []
+
+
+def test_check_inventory_pings_up_to_the_highest_expected_id(sim_dxl, monkeypatch):
+    _, dxl = sim_dxl([1, 2], configure=False)
+    max_ids = []
+    discover = dxl.discover
+    monkeypatch.setattr(dxl, 'discover', lambda max_id: max_ids.append(max_id) or discover(max_id))
+    dxl.check_inventory(servo_specs([1, 2, 7]))
+    assert max_ids == [7]
+
+
+def test_goals_to_unregistered_servos_are_skipped(sim_dxl):
+    bus, dxl = sim_dxl([1, 2])
+    assert not dxl.set_goal_pos_sync([1, 2, 6], [100, 200, 300], [0, 0, 0])
+    assert [bus.servo(id_).get('GOAL_POSITION') for id_ in (1, 2)] == [100, 200]
+
+    assert not dxl.set_goal_pos_sync([6], [300], [0])
+    assert dxl.set_goal_pos_sync([1, 2], [150, 250], [0, 0])
+
+
+def test_servos_missing_at_startup_are_left_out(make_hand):
+    port = new_port()
+    sim_bus.create_bus(port, ids=[1, 2, 4], baudrate=BAUDRATE)
+    hand = make_hand({port: ['index', 'ring']})
+    assert hand.unconfigured == {port: {3}}
+    assert sorted(hand.dxl.servos.keys()) == [1, 2, 4]
+
+    hand.update_hand_joints(np.full(len(hand.mapper), 45.0))
+    assert hand.move_hand(t_exec=0)
@@ -0,0 +1,33 @@
+"""Fast Sync Read of the servo states."""
+
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+
+from conftest import transactions
+
+
+def test_fast_sync_read_falls_back_to_sync_read(sim_dxl):
+    bus, dxl = sim_dxl([1, 2, 3, 4])
+    stats = dxl.enable_stats()
+    fast = dxl.read_states_sync()
+    assert sorted(fast.keys()) == [1, 2, 3, 4]
+    assert transactions(stats) == {'FAST_SYNC_READ': 1}
+    assert fast[3]['PRESENT_POSITION'] == bus.servo(3).get('PRESENT_POSITION')
+
+    dxl.use_fast_sync_read = False
+    assert dxl.read_states_sync() == fast
+    assert transactions(stats) == {'FAST_SYNC_READ': 1, 'SYNC_READ': 1}
+
+    dxl.use_fast_sync_read = True
+    bus.remove_servo(3)
+    stats.reset()
+    readings = dxl.read_states_sync()
+    assert sorted(readings.keys()) == [1, 2, 4]
+    assert transactions(stats)['FAST_SYNC_READ'] == 1 and transactions(stats)['SYNC_READ'] >= 1
+
+
+def test_fast_sync_read_needs_a_supporting_firmware(sim_dxl):
+    _, dxl = sim_dxl([1, 2])
+    stats = dxl.enable_stats()
+    dxl.servos[2].firmware_ver = DynamixelSDKWrapper.FAST_SYNC_READ_MIN_FW['XC330'] - 1
+    assert sorted(dxl.read_states_sync().keys()) == [1, 2]
+    assert transactions(stats) == {'SYNC_READ': 1}
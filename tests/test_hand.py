@@ -0,0 +1,110 @@
+"""Hand against simulated buses."""
+
+import time
+
+import numpy as np
+
+import sim_bus
+from bus_arbiter import MOTION
+
+from conftest import BAUDRATE, new_port, transactions
+
+
+def sent_goals(hand, monkeypatch) -> list:
+    """Records the {port: (ids, goals, t_exec)} of every motion command sent by the hand."""
+    sent = []
+    on_buses = hand.on_buses
+
+    def spy(priority, method, calls):
+        if priority == MOTION:
+            sent.append(calls)
+        return on_buses(priority, method, calls)
+
+    monkeypatch.setattr(hand, 'on_buses', spy)
+    return sent
+
+
+def test_move_hand_sends_every_finger_in_one_sync_write(make_hand):
+    port = new_port()
+    bus = sim_bus.create_bus(port, ids=[1, 2, 3, 4], baudrate=BAUDRATE)
+    hand = make_hand({port: ['index', 'ring']})
+    stats = hand.dxl.enable_stats()
+
+    hand.update_hand_joints([0.0, 45.0, 90.0, 45.0])
+    assert hand.move_hand(t_exec=0)
+    assert transactions(stats) == {'SYNC_WRITE': 1}
+    assert [bus.servo(id_).get('GOAL_POSITION') for id_ in (1, 2, 3, 4)] == [2000, 3000, 4000, 3000]
+
+
+def test_get_joint_states_follows_the_servos(make_hand):
+    port = new_port()
+    sim_bus.create_bus(port, ids=[1, 2, 3, 4], baudrate=BAUDRATE)
+    hand = make_hand({port: ['index', 'ring']})
+    hand.set_torque(True)
+    commanded = np.array([10.0, 20.0, 30.0, 40.0])
+    hand.update_hand_joints(commanded)
+    assert hand.move_hand(t_exec=0)
+
+    deadline = time.monotonic() + 2.0
+    while True:
+        states = hand.get_joint_states()
+        if np.allclose(hand.state.measured_angle, commanded, atol=1.0) or time.monotonic() > deadline:
+            break
+        time.sleep(0.1)
+    assert np.allclose(hand.state.measured_angle, commanded, atol=1.0)
+    assert abs(states['ring']['pip']['joint_angle'] - 40.0) <= 1.0
+    assert not np.isnan(hand.state.timestamp).any()
+
+
+def test_get_joint_states_reads_every_servo_at_once(make_hand):
+    port = new_port()
+    sim_bus.create_bus(port, ids=[1, 2, 3, 4], baudrate=BAUDRATE)
+    hand = make_hand({port: ['index', 'ring']})
+    stats = hand.dxl.enable_stats()
+    hand.get_joint_states()
+    assert sum(transactions(stats).values()) == 1
+
+
+def test_move_hand_sends_only_changed_joints(make_hand, monkeypatch):
+    port = new_port()
+    bus = sim_bus.create_bus(port, ids=[1, 2, 3, 4], baudrate=BAUDRATE)
+    hand = make_hand({port: ['index', 'ring']})
+    sent = sent_goals(hand, monkeypatch)
+
+    hand.update_hand_joints(np.full(len(hand.mapper), 45.0))
+    assert hand.move_hand(t_exec=0)
+    assert [sorted(calls[port][0]) for calls in sent] == [[1, 2, 3, 4]]
+
+    sent.clear()
+    assert hand.move_hand(t_exec=0)
+    assert sent == []
+
+    hand.update_finger_joint('ring', {'pip': 90.0})
+    assert hand.move_hand(t_exec=0)
+    assert [calls[port][0] for calls in sent] == [[4]]
+    assert bus.servo(4).get('GOAL_POSITION') == 4000
+
+    # Forgotten goals, e.g. after a servo reboot, are all sent again
+    sent.clear()
+    hand.fingers['index'].mark_all_dirty()
+    assert hand.move_hand(t_exec=0)
+    assert [sorted(calls[port][0]) for calls in sent] == [[1, 2]]
+
+
+def test_hand_split_across_two_ports(make_hand, monkeypatch):
+    port_a, port_b = new_port(), new_port()
+    bus_a = sim_bus.create_bus(port_a, ids=[1, 2], baudrate=BAUDRATE)
+    bus_b = sim_bus.create_bus(port_b, ids=[3, 4], baudrate=BAUDRATE)
+    hand = make_hand({port_a: ['index'], port_b: ['ring']})
+    assert {port: sorted(bus.dxl.servos.keys()) for port, bus in hand.buses.items()} == {port_a: [1, 2], port_b: [3, 4]}
+    sent = sent_goals(hand, monkeypatch)
+
+    hand.set_torque(True)
+    hand.update_hand_joints(np.full(len(hand.mapper), 90.0))
+    assert hand.move_hand(t_exec=0)
+    assert {port: sorted(ids) for port, (ids, _, _) in sent[0].items()} == {port_a: [1, 2], port_b: [3, 4]}
+    assert [bus.servo(id_).get('GOAL_POSITION') for bus, id_ in ((bus_a, 1), (bus_a, 2), (bus_b, 3), (bus_b, 4))] == [4000] * 4
+
+    hand.get_joint_states()
+    assert not np.isnan(hand.state.measured_pos).any()
+    assert hand.get_shadow_file_path(port_a) != hand.get_shadow_file_path(port_b)
@@ -0,0 +1,56 @@
+"""Array-backed hand state and its dict views."""
+
+import numpy as np
+import pytest
+
+from hand_state import FIELDS, HandState
+
+JOINTS = [('index', 'mcp'), ('index', 'pip'), ('thumb', 'abd')]
+
+
+def make_state() -> HandState:
+    return HandState(JOINTS, [1, 2, 3])
+
+
+def test_views_write_through_to_the_arrays():
+    state = make_state()
+    state.finger('index')['pip']['joint_angle'] = 45.0
+    state.as_dict()['thumb']['abd']['servo_pos'] = 2100
+    assert state.joint_angle[1] == 45.0 and state.data[FIELDS.index('joint_angle'), 1] == 45.0
+    assert state.servo_pos[2] == 2100.0
+
+    state.servo_pos[0] = 1500
+    view = state.finger('index')['mcp']
+    assert view['servo_pos'] == 1500 and isinstance(view['servo_pos'], int)
+    assert list(state.finger('index').keys()) == ['mcp', 'pip'] and len(view) == 2
+
+    with pytest.raises(KeyError):
+        view['current'] = 1.0
+    with pytest.raises(TypeError):
+        del view['joint_angle']
+
+
+def test_update_measured_keeps_the_joints_not_read():
+    state = make_state()
+    state.update_measured([10.0, 20.0, 30.0], [1000.0, 2000.0, 3000.0], [1, 2, 3], [4, 5, 6], 1.0)
+    state.update_measured([11.0, np.nan, 31.0], [1100.0, np.nan, 3100.0], [7, 8, 9], [10, 11, 12], 2.0)
+
+    assert state.measured_angle.tolist() == [11.0, 20.0, 31.0]
+    assert state.measured_pos.tolist() == [1100.0, 2000.0, 3100.0]
+    assert state.velocity.tolist() == [7.0, 2.0, 9.0]
+    assert state.current.tolist() == [10.0, 5.0, 12.0]
+    assert state.timestamp.tolist() == [2.0, 1.0, 2.0]
+    assert np.isnan(state.joint_angle).all()
+
+
+def test_snapshot_is_decoupled_from_later_updates():
+    state = make_state()
+    state.update_measured([10.0, 20.0, 30.0], [1000.0, 2000.0, 3000.0], 0, 0, 1.0)
+    snapshot = state.snapshot()
+    state.update_measured([0.0, 0.0, 0.0], [0.0, 0.0, 0.0], 0, 0, 2.0)
+    state.finger('index')['mcp']['joint_angle'] = 5.0
+
+    assert snapshot[FIELDS.index('measured_angle')].tolist() == [10.0, 20.0, 30.0]
+    assert snapshot[FIELDS.index('timestamp')].tolist() == [1.0, 1.0, 1.0]
+    assert np.isnan(snapshot[FIELDS.index('joint_angle')]).all()
+    assert state.measured_angle.tolist() == [0.0, 0.0, 0.0]
@@ -0,0 +1,143 @@
+"""Joint angle to servo position mapping."""
+
+import numpy as np
+
+from joint_mapping import JointMapper, _lookup, calibration_points, evaluate_curve
+
+
+def joint(id_, min_, max_, min_deg, max_deg, **extra) -> dict:
+    return dict({'id': id_, 'min': min_, 'max': max_, 'int': -1, 'min_deg': min_deg, 'max_deg': max_deg,
+                 'reverse': False, 'offset': 0}, **extra)
+
+
+# Linear and curved joints, each rising and falling with the angle
+FINGER_PARAMETERS = {
+    'index': {
+        'mcp': joint(1, 1000, 3000, 0, 90),
+        'pip': joint(2, 3000, 1000, 0, 90, reverse=True),
+    },
+    'thumb': {
+        'abd': joint(3, 1500, 2500, -30, 30, int=2100, int_deg=0),
+        'cmc': joint(4, 3500, 500, -45, 45, int=2200, int_deg=10, curve=[[30, 1200]], interpolation='pchip', reverse=True),
+    },
+}
+
+
+def test_curves_are_compiled_for_joints_with_more_points():
+    mapper = JointMapper(FINGER_PARAMETERS)
+    assert mapper.names == ['index#mcp', 'index#pip', 'thumb#abd', 'thumb#cmc']
+    assert mapper.curved.tolist() == [2, 3]
+
+
+def test_lookup_tables_round_trip_within_one_servo_count():
+    mapper = JointMapper(FINGER_PARAMETERS)
+    angles = np.column_stack([np.linspace(0, 90, 500), np.linspace(0, 90, 500),
+                              np.linspace(-30, 30, 500), np.linspace(-45, 45, 500)])
+    positions = mapper.to_servo(angles)
+    assert np.abs(mapper.to_servo(mapper.to_joint(positions)) - positions).max() <= 1
+
+
+def test_pchip_curve_is_monotonic_between_calibration_points():
+    # Steep and flat stretches in a row, where an unconstrained cubic would overshoot
+    x, y = np.array([0.0, 10.0, 20.0, 30.0, 40.0]), np.array([0.0, 100.0, 105.0, 400.0, 410.0])
+    t = np.linspace(0.0, 40.0, 4001)
+    curve = evaluate_curve(x, y, t, 'pchip')
+    assert np.all(np.diff(curve) >= 0)
+    k = np.clip(np.searchsorted(x, t, side='right') - 1, 0, len(x) - 2)
+    assert np.all((y[k] <= curve + 1e-9) & (curve <= y[k + 1] + 1e-9))
+    assert np.allclose(evaluate_curve(x, y, x, 'pchip'), y)
+
+    mapper = JointMapper(FINGER_PARAMETERS)
+    positions = mapper.to_servo(np.tile(np.linspace(-45, 45, 1000)[:, None], (1, len(mapper))))[:, 3]
+    assert np.all(np.diff(positions) <= 0)
+
+
+def test_intermediate_point_only_strictly_inside_both_ranges():
+    def count(**extra) -> int:
+        return len(calibration_points('test', joint(1, 1000, 3000, 0, 90, **extra))[0])
+
+    assert count(int=2000, int_deg=45) == 3
+    assert count(int=2000) == 2                 # int_deg 0 is min_deg
+    assert count(int=2000, int_deg=90) == 2
+    assert count(int=1000, int_deg=45) == 2     # int equal to min
+    assert count(int=3000, int_deg=45) == 2
+    assert count(int=3500, int_deg=45) == 2     # outside the servo range
+    assert count(int=-1, int_deg=45) == 2
+    assert count(int=2000, int_deg=120) == 2    # outside the angle range
+
+
+def test_angles_outside_the_range_are_clamped():
+    mapper = JointMapper(FINGER_PARAMETERS)
+    low = mapper.to_servo([-100.0, -100.0, -100.0, -100.0], offset=False)
+    high = mapper.to_servo([200.0, 200.0, 200.0, 200.0], offset=False)
+    assert low.tolist() == [1000, 3000, 1500, 3500]
+    assert high.tolist() == [3000, 1000, 2500, 500]
+    assert mapper.joint_to_servo('thumb', 'cmc', 200.0) == 500
+    assert mapper.joint_to_servo('index', 'pip', -100.0) == 3000
+
+
+def test_nan_propagates_through_the_lookup_tables():
+    mapper = JointMapper(FINGER_PARAMETERS)
+    assert np.isnan(_lookup(mapper._inverse, np.array([np.nan, np.nan]), extrapolate=True)).all()
+    angles = mapper.to_joint([np.nan, 2000.0, np.nan, 2000.0])
+    assert np.isnan(angles[[0, 2]]).all() and not np.isnan(angles[[1, 3]]).any()
+    assert np.isnan(mapper.servo_to_joint('thumb', 'abd', np.nan))
+
+
+def calibrated_mapper() -> JointMapper:
+    mapper = JointMapper(FINGER_PARAMETERS)
+    for (finger_name, joint_name), offset in zip(mapper.joints, (25, -40, 7, -13)):
+        mapper.set_offset(finger_name, joint_name, offset)
+    return mapper
+
+
+def test_to_joint_matches_servo_to_joint_for_every_joint():
+    mapper = calibrated_mapper()
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(300, 3700, size=(50, len(mapper)))  # beyond the limits too
+    angles = mapper.to_joint(positions)
+    assert angles.shape == positions.shape
+    for i, (finger_name, joint_name) in enumerate(mapper.joints):
+        expected = [mapper.servo_to_joint(finger_name, joint_name, pos - mapper.offset[i]) for pos in positions[:, i]]
+        assert np.allclose(angles[:, i], expected, rtol=0, atol=1e-9)
+        assert np.allclose(mapper.to_joint(positions[7])[i], expected[7], rtol=0, atol=1e-9)
+
+
+def test_servo_vector_feeds_to_joint_in_joint_order():
+    mapper = calibrated_mapper()
+    readings = {4: {'PRESENT_POSITION': 1800}, 1: {'PRESENT_POSITION': 2100}, 2: {'PRESENT_POSITION': 1500}}
+    positions = mapper.servo_vector(readings)
+    assert positions[:2].tolist() == [2100.0, 1500.0] and positions[3] == 1800.0 and np.isnan(positions[2])
+
+    angles = mapper.to_joint(positions)
+    for i, (finger_name, joint_name) in enumerate(mapper.joints):
+        id_ = mapper.ids[i]
+        if id_ in readings:
+            expected = mapper.servo_to_joint(finger_name, joint_name, readings[id_]['PRESENT_POSITION'] - mapper.offset[i])
+            assert angles[i] == expected
+        else:
+            assert np.isnan(angles[i])
+
+
+def test_to_servo_matches_joint_to_servo_for_every_joint():
+    mapper = calibrated_mapper()
+    rng = np.random.default_rng(1)
+    trajectory = rng.uniform(-60, 120, size=(50, len(mapper)))  # N x J, beyond the limits too
+    positions = mapper.to_servo(trajectory)
+    assert positions.shape == trajectory.shape and positions.dtype == np.int64
+    for i, (finger_name, joint_name) in enumerate(mapper.joints):
+        expected = [mapper.joint_to_servo(finger_name, joint_name, angle) + mapper.offset[i] for angle in trajectory[:, i]]
+        assert positions[:, i].tolist() == expected
+        assert mapper.to_servo(trajectory[7])[i] == expected[7]
+        assert mapper.to_servo(trajectory[7], offset=False)[i] == expected[7] - mapper.offset[i]
+
+
+def test_vector_feeds_to_servo_in_joint_order():
+    mapper = calibrated_mapper()
+    values = {'thumb': {'cmc': {'joint_angle': 20.0}, 'abd': -10.0}, 'index': {'pip': {'joint_angle': 30.0}}}
+    angles = mapper.vector(values)
+    assert np.isnan(angles[0]) and angles[1:].tolist() == [30.0, -10.0, 20.0]
+
+    positions = mapper.to_servo(np.nan_to_num(angles))[1:]
+    for i, (finger_name, joint_name), angle in zip(range(1, 4), mapper.joints[1:], (30.0, -10.0, 20.0)):
+        assert positions[i - 1] == mapper.joint_to_servo(finger_name, joint_name, angle) + mapper.offset[i]
@@ -0,0 +1,65 @@
+"""Register shadow of the servo configuration."""
+
+from dynamixel_sdk import COMM_TX_FAIL
+
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+
+from conftest import servo_specs, transactions
+
+
+def test_second_startup_skips_the_eeprom_writes(sim_dxl, tmp_path):
+    shadow_file = str(tmp_path / 'servo_shadow.json')
+    bus, dxl = sim_dxl([1, 2, 3], configure=False)
+    dxl.load_shadow(shadow_file)
+    stats = dxl.enable_stats()
+    assert dxl.add_servo_batch(servo_specs([1, 2, 3])) == [1, 2, 3]
+    assert 'SYNC_WRITE' in transactions(stats)
+    dxl.close_port()
+
+    dxl = DynamixelSDKWrapper(port=dxl.port, baudrate=dxl.baudrate)
+    try:
+        dxl.load_shadow(shadow_file)
+        stats = dxl.enable_stats()
+        assert dxl.add_servo_batch(servo_specs([1, 2, 3])) == [1, 2, 3]
+        writes = {command: count for command, count in transactions(stats).items() if 'WRITE' in command}
+        assert writes == {'SYNC_WRITE': 1}  # the indirect addresses, RAM
+    finally:
+        dxl.close_port()
+
+
+def test_set_torque_restores_torque_dropped_by_the_servo(sim_dxl):
+    bus, dxl = sim_dxl([1, 2])
+    assert dxl.set_torque([1, 2], 1)
+    bus.servo(1).set('TORQUE_ENABLE', 0)  # e.g. an overload shutdown
+
+    assert dxl.set_torque([1, 2], 1)
+    assert bus.servo(1).get('TORQUE_ENABLE') == 1
+
+
+def test_set_torque_off_is_sent_again_after_a_lost_write(sim_dxl, monkeypatch):
+    bus, dxl = sim_dxl([1, 2])
+    dxl.set_torque([1, 2], 1)
+    sync_write = dxl._sync_write
+    monkeypatch.setattr(dxl, '_sync_write', lambda cmd_name, data: COMM_TX_FAIL)
+    assert not dxl.set_torque([1, 2], 0)
+    monkeypatch.setattr(dxl, '_sync_write', sync_write)
+
+    assert dxl.set_torque([1, 2], 0)
+    assert [bus.servo(id_).get('TORQUE_ENABLE') for id_ in (1, 2)] == [0, 0]
+
+
+def test_set_torque_does_not_record_the_unacknowledged_value(sim_dxl):
+    _, dxl = sim_dxl([1, 2])
+    dxl.set_torque([1, 2], 1)
+    assert 'TORQUE_ENABLE' not in dxl.servos[1].shadow
+
+
+def test_hardware_alert_clears_the_ram_shadow(sim_dxl):
+    bus, dxl = sim_dxl([1, 2])
+    shadow = dxl.servos[1].shadow
+    shadow['TORQUE_ENABLE'] = 1
+    bus.servo(1).set('HARDWARE_ERROR_STATUS', 0x04)  # overheating
+
+    assert 1 in dxl.read_states_sync([1, 2])
+    assert 'TORQUE_ENABLE' not in shadow
+    assert shadow['OPERATING_MODE'] == DynamixelSDKWrapper.OPERATING_MODES['extended_pos']
@@ -0,0 +1,52 @@
+"""The simulated Protocol 2.0 bus."""
+
+import time
+
+from dynamixel_sdk.robotis_def import INST_PING, INST_STATUS
+
+import control_table
+import sim_bus
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+
+
+def test_packets_round_trip_through_byte_stuffing():
+    params = b'\x01\xff\xff\xfd\x02'
+    packet = sim_bus.make_packet(7, INST_STATUS, params)
+    assert b'\xff\xff\xfd\xfd' in packet
+
+    assert sim_bus.parse_packet(packet) == ((7, INST_STATUS, params), 0)
+    garbled = packet[:-1] + bytes([packet[-1] ^ 0xFF])
+    assert sim_bus.parse_packet(garbled)[1] == sim_bus.ERR_CRC
+
+
+def test_only_servos_at_the_host_rate_answer():
+    bus = sim_bus.SimulatedBus(ids=[1, 2], baudrate=1000000, realtime=False)
+    bus.add_servo(sim_bus.SimulatedServo(3, baudrate=57600))
+    ping = sim_bus.make_packet(0xFE, INST_PING)
+
+    assert [reply[4] for _, reply in bus.process(ping, 1000000)] == [1, 2]
+    assert [reply[4] for _, reply in bus.process(ping, 57600)] == [3]
+
+
+def test_servo_refuses_writes_to_protected_registers():
+    servo = sim_bus.SimulatedServo(1)
+    baud_rate = control_table.CONTROL_TABLE_XC_330['BAUD_RATE']['ADDR']
+    torque_enable = control_table.CONTROL_TABLE_XC_330['TORQUE_ENABLE']['ADDR']
+    model_number = control_table.CONTROL_TABLE_XC_330['MODEL_NUMBER']['ADDR']
+
+    assert servo.write(model_number, b'\x00\x00') == sim_bus.ERR_ACCESS
+    assert servo.write(torque_enable, b'\x01') == 0
+    assert servo.write(baud_rate, b'\x03') == sim_bus.ERR_ACCESS  # EEPROM, torque on
+    assert servo.read(len(servo.registers), 1) == (b'', sim_bus.ERR_DATA_RANGE)
+
+
+def test_servo_tracks_its_goal_once_torque_is_on():
+    servo = sim_bus.SimulatedServo(1, time_constant=0.01, position=1000)
+    servo.set('OPERATING_MODE', DynamixelSDKWrapper.OPERATING_MODES['extended_pos'])
+    servo.set('GOAL_POSITION', 3000)
+    servo.update(time.monotonic() + 1.0)
+    assert servo.get('PRESENT_POSITION') == 1000
+
+    servo.set('TORQUE_ENABLE', 1)
+    servo.update(time.monotonic() + 2.0)
+    assert servo.get('PRESENT_POSITION') == 3000
@@ -0,0 +1,63 @@
+"""Precompiled sync write parameters."""
+
+import pytest
+
+import control_table
+from DynamixelSDKWrapper import DynamixelSDKWrapper
+from sync_write_plan import SyncWritePlan
+
+# A 1-, a 2- and a 4-byte register, adjacent
+CMDS = [{'ADDR': 100, 'LEN': 1}, {'ADDR': 101, 'LEN': 2}, {'ADDR': 103, 'LEN': 4}]
+
+
+def reference_params(ids, cmds, values, bulk=False) -> list:
+    """The packet parameters built one servo and one register at a time, as the SDK group writes are filled."""
+    params = []
+    for i, id_ in enumerate(ids):
+        params.append(id_)
+        if bulk:
+            length = sum(cmd['LEN'] for cmd in cmds)
+            params += [cmds[0]['ADDR'] & 0xFF, cmds[0]['ADDR'] >> 8, length & 0xFF, length >> 8]
+        for cmd, column in zip(cmds, values):
+            params += DynamixelSDKWrapper._convert_to_bytes(None, int(column[i]), cmd['LEN'])
+    return params
+
+
+def test_encode_matches_convert_to_bytes():
+    ids = [1, 7, 3]
+    values = [[0, 1, 255], [0, 513, 65535], [0, 70000, 2 ** 31 - 1]]
+    plan = SyncWritePlan(ids, CMDS)
+    assert plan.data_length == 7 and plan.param_length == 24
+    assert plan.encode(*values) == reference_params(ids, CMDS, values)
+
+
+def test_encode_negative_goals():
+    table = control_table.CONTROL_TABLE_XC_330
+    cmds = [table['PROFILE_VELOCITY'], table['GOAL_POSITION']]
+    ids = [1, 2, 3]
+    values = [[0, 500, 1000], [-1, -4096, -1048575]]
+    plan = SyncWritePlan(ids, cmds)
+    assert plan.encode(*values) == reference_params(ids, cmds, values)
+    assert plan.encode(*values)[5:9] == [0xFF] * 4
+
+
+def test_encode_bulk_rows_start_with_id_address_and_length():
+    ids = [4, 9]
+    values = [[200, 1], [-2, 300], [-70000, 5]]
+    plan = SyncWritePlan(ids, CMDS, bulk=True)
+    params = plan.encode(*values)
+    assert params[:5] == [4, 100, 0, 7, 0]
+    assert params[12:17] == [9, 100, 0, 7, 0]
+    assert params == reference_params(ids, CMDS, values, bulk=True)
+
+
+def test_encode_reuses_the_buffer():
+    plan = SyncWritePlan([1, 2], CMDS)
+    plan.encode([1, 2], [3, 4], [5, 6])
+    values = [[9, 8], [-7, 6], [5, -4]]
+    assert plan.encode(*values) == reference_params([1, 2], CMDS, values)
+
+
+def test_registers_must_be_adjacent():
+    with pytest.raises(ValueError):
+        SyncWritePlan([1], [{'ADDR': 100, 'LEN': 1}, {'ADDR': 102, 'LEN': 2}])
@@ -0,0 +1,81 @@
+"""TelemetryBuffer and TelemetryPoller."""
+
+import math
+
+import numpy as np
+
+from bus_arbiter import BusArbiter
+from telemetry import TelemetryBuffer, TelemetryPoller
+
+
+def fill(buffer: TelemetryBuffer, count: int) -> None:
+    # Sample i stamped i, servo 1 reading i and servo 2 reading 10 * i
+    for i in range(count):
+        buffer.append(float(i), {1: {'PRESENT_POSITION': i}, 2: {'PRESENT_POSITION': 10 * i}})
+
+
+def test_buffer_wraps_at_capacity():
+    buffer = TelemetryBuffer([1, 2], ['PRESENT_POSITION', 'PRESENT_CURRENT'], capacity=4)
+    fill(buffer, 6)
+    assert len(buffer) == 4
+
+    timestamps, data = buffer.window()
+    assert timestamps.tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert data[:, 0, 0].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert data[:, 1, 0].tolist() == [20.0, 30.0, 40.0, 50.0]
+    assert np.isnan(data[:, :, 1]).all()
+
+
+def test_window_selects_a_time_range_oldest_first():
+    buffer = TelemetryBuffer([1, 2], ['PRESENT_POSITION'], capacity=8)
+    fill(buffer, 6)
+    assert buffer.window(duration=2.0)[0].tolist() == [3.0, 4.0, 5.0]
+    assert buffer.window(duration=1.0, end=2.0)[0].tolist() == [1.0, 2.0]
+
+    buffer.clear()
+    timestamps, data = buffer.window()
+    assert len(timestamps) == 0 and data.shape == (0, 2, 1)
+
+
+def test_latest_dict_returns_the_last_sample():
+    buffer = TelemetryBuffer([1, 2], ['PRESENT_POSITION', 'PRESENT_CURRENT'], capacity=4)
+    assert buffer.latest() == (None, None) and buffer.latest_dict() == {}
+
+    fill(buffer, 5)
+    buffer.append(5.0, {1: {'PRESENT_CURRENT': 7}, 9: {'PRESENT_POSITION': 1}})  # servo 2 missing, 9 unknown
+    assert buffer.latest()[0] == 5.0
+    latest = buffer.latest_dict()
+    assert latest[1]['PRESENT_CURRENT'] == 7 and math.isnan(latest[1]['PRESENT_POSITION'])
+    assert all(math.isnan(val) for val in latest[2].values())
+
+
+def test_poller_stores_one_sample_per_poll(sim_dxl):
+    bus, dxl = sim_dxl([1, 2, 3])
+    poller = TelemetryPoller(dxl, rate_hz=50.0, capacity=10)
+    poller.poll()
+    poller.poll()
+
+    assert len(poller.buffer) == 2
+    latest = poller.buffer.latest_dict()
+    assert sorted(latest.keys()) == [1, 2, 3]
+    assert latest[2]['PRESENT_POSITION'] == bus.servo(2).get('PRESENT_POSITION')
+    assert latest[3]['PRESENT_TEMPERATURE'] == bus.servo(3).get('PRESENT_TEMPERATURE')
+
+
+def test_poller_merges_buses_polled_through_arbiters(sim_dxl):
+    _, dxl_a = sim_dxl([1, 2])
+    _, dxl_b = sim_dxl([3])
+    arbiters = [BusArbiter(dxl_a), BusArbiter(dxl_b)]
+    try:
+        poller = TelemetryPoller(arbiters, rate_hz=50.0, capacity=10)
+        poller.start()
+        poller.stop_event.wait(0.2)
+        poller.stop()
+        poller.join()
+    finally:
+        for arbiter in arbiters:
+            arbiter.stop()
+
+    assert len(poller.buffer) >= 2
+    _, data = poller.buffer.window()
+    assert not np.isnan(data[-1]).any()
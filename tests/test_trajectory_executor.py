@@ -0,0 +1,112 @@
+"""Fixed-rate trajectory execution against a stub hand."""
+
+import time
+
+import numpy as np
+import pytest
+
+from trajectory_executor import TrajectoryExecutor
+
+JOINTS = 3
+
+
+class StubHand:
+    """Records the setpoints sent; the first send can be slowed down to make the next tick late."""
+
+    def __init__(self, first_send_delay: float = 0.0):
+        self.sent = []
+        self.first_send_delay = first_send_delay
+
+    def update_hand_joints(self, setpoint):
+        self.sent.append(np.array(setpoint))
+
+    def move_hand(self, t_exec):
+        if len(self.sent) == 1:
+            time.sleep(self.first_send_delay)
+        return True
+
+
+def ramp(count: int) -> np.ndarray:
+    # Setpoint i holds i on every joint
+    return np.repeat(np.arange(count, dtype=float)[:, None], JOINTS, axis=1)
+
+
+def test_late_tick_skips_ahead_to_the_setpoint_due():
+    hand = StubHand(first_send_delay=0.07)
+    executor = TrajectoryExecutor(hand, rate_hz=50.0)
+    executor.play(ramp(10))
+    executor.start()
+    try:
+        assert executor.wait(timeout=5.0)
+    finally:
+        executor.stop()
+        executor.join()
+
+    indices = [int(setpoint[0]) for setpoint in hand.sent]
+    missed = executor.stats()['missed']
+    assert indices[0] == 0 and indices[-1] == 9
+    assert missed >= 2 and indices[1] == 1 + missed
+    assert np.all(np.diff(indices) >= 1) and sum(np.diff(indices) - 1) == missed
+
+
+def test_play_starts_after_the_tick_in_flight():
+    executor = TrajectoryExecutor(StubHand())
+    assert executor._due_setpoint(0) is None
+    executor._due_setpoint(5)  # tick 5 took its setpoint and is being sent
+    executor.play(ramp(3))
+    assert executor._due_setpoint(6)[0] == 0.0
+    assert executor._due_setpoint(9) is None  # 3 ticks later: past the end
+
+
+def test_iterable_trajectory_is_consumed_one_setpoint_per_tick():
+    executor = TrajectoryExecutor(StubHand())
+    executor.play(iter(ramp(6)))
+    assert executor._due_setpoint(0)[0] == 0.0
+    assert executor._due_setpoint(3)[0] == 3.0  # ticks 1 and 2 skipped
+    assert executor._due_setpoint(5)[0] == 5.0
+    assert not executor.done_event.is_set()
+    assert executor._due_setpoint(6) is None
+    assert executor.done_event.is_set()
+
+
+def test_stream_holds_its_setpoint_and_stops_the_trajectory():
+    executor = TrajectoryExecutor(StubHand())
+    executor.play(ramp(5))
+    assert not executor.wait(timeout=0)
+    assert executor._due_setpoint(0)[0] == 0.0
+
+    executor.stream([7.0] * JOINTS)
+    assert executor.wait(timeout=0)
+    for tick in (1, 2, 10):
+        assert executor._due_setpoint(tick).tolist() == [7.0] * JOINTS
+
+
+def test_wait_returns_once_the_trajectory_is_sent():
+    executor = TrajectoryExecutor(StubHand())
+    executor.play(ramp(3))
+    for tick in range(3):
+        executor._due_setpoint(tick)
+        assert not executor.wait(timeout=0)
+    executor._due_setpoint(3)
+    assert executor.wait(timeout=0)
+
+
+def test_stats_and_reset():
+    executor = TrajectoryExecutor(StubHand(), rate_hz=100.0)
+    executor._record(wake=1.0, lateness=0.001, send_time=0.002, missed=0, success=True)
+    executor._record(wake=1.01, lateness=0.003, send_time=0.02, missed=2, success=False)
+
+    stats = executor.stats()
+    assert (stats['ticks'], stats['missed'], stats['overruns'], stats['failed']) == (2, 2, 1, 1)
+    assert stats['mean_period_ms'] == pytest.approx(10.0) and stats['jitter_ms'] == pytest.approx(0.0, abs=1e-6)
+    assert stats['mean_lateness_ms'] == pytest.approx(2.0) and stats['max_lateness_ms'] == pytest.approx(3.0)
+    assert stats['max_send_ms'] == pytest.approx(20.0)
+
+    executor.reset_stats()
+    stats = executor.stats()
+    assert stats['ticks'] == 0 and stats['missed'] == 0 and stats['mean_period_ms'] == 0.0 and stats['min_period_ms'] == 0.0
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TrajectoryExecutor(StubHand(), rate_hz=0.0)